@@ -0,0 +1,47 @@
+from datetime import date
+from django.db.models import Max, Q
+from .models import CustomerOrder, PurchaseOrder, UserActivity
+from .snapshots import as_date
+
+# Per-user latest order dates. The UserActivity row is created from a single
+# aggregate the first time it is needed and then moved forward by signals,
+# so reading the default end date of a date filter is a primary key lookup.
+
+ACTIVITY_FIELDS = {
+    CustomerOrder: 'latest_customer_order_date',
+    PurchaseOrder: 'latest_purchase_order_date',
+}
+
+
+def _latest_order_date(model, user_id):
+    return model.objects.filter(user_id=user_id).aggregate(latest=Max('date'))['latest']
+
+
+def get_user_activity(user):
+    try:
+        return UserActivity.objects.get(user=user)
+    except UserActivity.DoesNotExist:
+        activity, created = UserActivity.objects.get_or_create(user=user, defaults={
+            field: _latest_order_date(model, user.pk) for model, field in ACTIVITY_FIELDS.items()})
+        return activity
+
+
+def latest_activity_date(user):
+    return get_user_activity(user).latest_date or date.today()
+
+
+def record_order_date(model, user_id, day):
+    field = ACTIVITY_FIELDS[model]
+    day = as_date(day)
+    UserActivity.objects.filter(
+        Q(**{f'{field}__lt': day}) | Q(**{f'{field}__isnull': True}),
+        user_id=user_id,
+        ).update(**{field: day})
+
+
+def forget_order_date(model, user_id, day):
+    #only a removed order dated on the user's latest day can move it back
+    field = ACTIVITY_FIELDS[model]
+    if UserActivity.objects.filter(user_id=user_id, **{field: as_date(day)}).exists():
+        UserActivity.objects.filter(user_id=user_id).update(
+            **{field: _latest_order_date(model, user_id)})
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Product, PurchaseOrder, Customer, CustomerOrder, InventoryRecord, ParStockRecord
+from .models import (
+    Product, PurchaseOrder, Customer, CustomerOrder, InventoryRecord,
+    ParStockRecord, ProductStockBalance, StockSnapshot, UserActivity)
 
 admin.site.register(Product)
 admin.site.register(PurchaseOrder)
@@ -7,3 +9,6 @@ admin.site.register(CustomerOrder)
 admin.site.register(Customer)
 admin.site.register(InventoryRecord)
 admin.site.register(ParStockRecord)
+admin.site.register(ProductStockBalance)
+admin.site.register(StockSnapshot)
+admin.site.register(UserActivity)
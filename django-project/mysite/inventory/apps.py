@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class InventoryConfig(AppConfig):
     name = 'inventory'
+
+    def ready(self):
+        import inventory.signals
+        from django.db.backends.signals import connection_created
+        from inventory.metrics import install_query_recorder
+        connection_created.connect(install_query_recorder)
@@ -0,0 +1,128 @@
+import asyncio
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import PermissionDenied
+from django.db import close_old_connections
+from django.http import Http404
+from django.shortcuts import render
+from .models import (
+    CustomerOrder, PurchaseOrder, Product, Customer, InventoryRecord,
+    ParStockRecord)
+from .ledger import with_stock_balances
+from .snapshots import stock_as_of
+from .activity import latest_activity_date
+from .page_cache import async_cached_page_data
+from .views import (
+    index_context, product_rows, related_orders, first_order_page, product_orders_data,
+    latest_amount, date_filter_context)
+
+# Async versions of the dashboard and product order pages, used instead of the
+# sync views when INVENTORY_ASYNC_VIEWS is set (the ASGI deployment). Queries
+# that do not depend on each other run at the same time, each on a pool thread
+# with its own database connection, so a page waits about one round trip per
+# dependent step instead of one per query. They build the same context as the
+# sync views and share their cache entries.
+
+
+def _query(function):
+    def run():
+        try:
+            return function()
+        finally:
+            #pool threads never see request_finished, so their connections are
+            #closed here unless CONN_MAX_AGE allows keeping them
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)()
+
+
+async def gather_queries(*functions):
+    return await asyncio.gather(*[_query(function) for function in functions])
+
+
+async def _is_authenticated(request):
+    #loads the session and user on the request thread like the sync views do
+    return await sync_to_async(lambda: request.user.is_authenticated)()
+
+
+async def _render(request, template_name, context):
+    return await sync_to_async(render)(request, template_name, context)
+
+
+async def _owned_product(request, label):
+    product = await _query(
+        lambda: with_stock_balances(Product.objects.filter(label=label)).first())
+    if product is None:
+        raise Http404
+    if product.user_id != request.user.pk:
+        raise PermissionDenied
+    return product
+
+
+async def index(request):
+    if not await _is_authenticated(request):
+        return redirect_to_login(request.get_full_path())
+    user = request.user
+
+    async def build():
+        product_list, has_customers = await gather_queries(
+            lambda: list(with_stock_balances(Product.objects.filter(user=user))),
+            lambda: Customer.objects.filter(user=user).exists())
+        return index_context(product_list, has_customers)
+
+    context = await async_cached_page_data('index', [('user', user.pk)], build)
+    context['product_rows'] = await sync_to_async(product_rows)(context['product_inventories'])
+    return await _render(request, 'inventory/index.html', context)
+
+
+async def product_orders(request, product):
+    if not await _is_authenticated(request):
+        return redirect_to_login(request.get_full_path())
+    user = request.user
+    product = await _owned_product(request, product)
+
+    async def build():
+        return product_orders_data(*await gather_queries(
+            lambda: first_order_page(CustomerOrder, product),
+            lambda: first_order_page(PurchaseOrder, product),
+            lambda: Customer.objects.filter(user=user).exists()))
+
+    context = {
+        'object': product,
+        'product': product,
+        'available': product.available,
+        'customer_orders_total': product.customer_orders_total,
+        'purchase_orders_total': product.purchase_orders_total,
+        'inventory': product.recent_inventory,
+        'par_stock': product.recent_par_stock,
+        'stock_error': product.stock_error,
+    }
+    context.update(await async_cached_page_data(
+        'product_orders', [('product', product.pk), ('customers', user.pk)], build))
+    context['has_purchase_orders'] = product.purchase_order_count
+    context['has_customer_orders'] = product.customer_order_count
+    return await _render(request, 'inventory/product_order_detail.html', context)
+
+
+async def product_orders_date_filter(request, product, date, end_date=None):
+    if not await _is_authenticated(request):
+        return redirect_to_login(request.get_full_path())
+    user = request.user
+    context = {}
+    if end_date is None:
+        product, end_date = await asyncio.gather(
+            _owned_product(request, product), _query(lambda: latest_activity_date(user)))
+        context['end_date_unset'] = True
+    else:
+        product = await _owned_product(request, product)
+
+    dates = [date, end_date]
+    figures = await gather_queries(
+        lambda: related_orders(CustomerOrder, product, date__range=dates),
+        lambda: related_orders(PurchaseOrder, product, date__range=dates),
+        lambda: latest_amount(InventoryRecord, product),
+        lambda: latest_amount(ParStockRecord, product),
+        lambda: stock_as_of(product, end_date),
+        lambda: Customer.objects.filter(user=user).exists())
+    context['object'] = product
+    context.update(date_filter_context(product, date, end_date, *figures))
+    return await _render(request, 'inventory/product_order_detail.html', context)
@@ -0,0 +1,75 @@
+from django.db import transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from .models import Product, ProductStockBalance
+from .ledger import with_stock_totals
+
+# Maintenance of the materialized ProductStockBalance rows. Order changes are
+# applied as F() deltas so concurrent writers never overwrite each other, and
+# the latest inventory/par stock amounts are re-read inside the UPDATE itself.
+# Every change also increments the row's version in the same statement.
+
+BALANCE_FIELDS = [
+    'purchase_orders_total', 'customer_orders_total', 'purchase_order_count',
+    'customer_order_count', 'recent_inventory', 'recent_par_stock',
+]
+
+
+def apply_deltas(product_id, **deltas):
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if not changes:
+        return
+    changes['version'] = F('version') + 1
+    with transaction.atomic():
+        updated = ProductStockBalance.objects.filter(product_id=product_id).update(**changes)
+        if not updated:
+            #no balance row yet, so build it from history (which already
+            #includes the change being applied)
+            rebuild_balances(Product.objects.filter(pk=product_id))
+
+
+def refresh_latest(product_id, model, field):
+    latest = model.objects.filter(
+        product=OuterRef('product_id')).order_by('-date', '-pk').values('amount')[:1]
+    with transaction.atomic():
+        updated = ProductStockBalance.objects.filter(product_id=product_id).update(**{
+            field: Coalesce(Subquery(latest, output_field=IntegerField()), Value(0)),
+            'version': F('version') + 1})
+        if not updated:
+            rebuild_balances(Product.objects.filter(pk=product_id))
+
+
+def rebuild_balances(products, batch_size=500):
+    existing = dict(ProductStockBalance.objects.filter(
+        product__in=products.values('pk')).values_list('product_id', 'pk'))
+    to_create = []
+    to_update = []
+    for product in with_stock_totals(products.order_by()).iterator(chunk_size=batch_size):
+        balance = ProductStockBalance(
+            pk=existing.get(product.pk), product_id=product.pk,
+            **{field: getattr(product, field) for field in BALANCE_FIELDS})
+        if balance.pk is None:
+            to_create.append(balance)
+        else:
+            balance.version = F('version') + 1
+            to_update.append(balance)
+    with transaction.atomic():
+        ProductStockBalance.objects.bulk_create(to_create, batch_size=batch_size)
+        ProductStockBalance.objects.bulk_update(
+            to_update, BALANCE_FIELDS + ['version'], batch_size=batch_size)
+    return len(to_create), len(to_update)
+
+
+def verify_balances(products, batch_size=500):
+    stored = {
+        balance.product_id: balance for balance in
+        ProductStockBalance.objects.filter(product__in=products.values('pk'))}
+    mismatches = []
+    for product in with_stock_totals(products.order_by()).iterator(chunk_size=batch_size):
+        balance = stored.get(product.pk)
+        for field in BALANCE_FIELDS:
+            expected = getattr(product, field)
+            actual = getattr(balance, field) if balance else None
+            if actual is None or abs(actual - expected) > 1e-6:
+                mismatches.append((product, field, actual, expected))
+    return mismatches
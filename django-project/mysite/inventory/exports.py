@@ -0,0 +1,70 @@
+import csv
+import json
+from django.db.models import Q
+from .models import CustomerOrder, PurchaseOrder, InventoryRecord, ParStockRecord
+
+# Streaming exports. Rows are read in keyset chunks ordered by (date, pk), each
+# chunk starting after the last row of the previous one, so only one chunk is
+# ever held in memory whatever the database driver does with the result set.
+# Order columns match the upload format, so an export can be uploaded again.
+
+EXPORTS = {
+    'customer_orders': (CustomerOrder, 'user', [
+        ('order_number', 'order_number'), ('product', 'product__label'),
+        ('customer', 'customer__label'), ('date', 'date'), ('quantity', 'quantity')]),
+    'purchase_orders': (PurchaseOrder, 'user', [
+        ('order_number', 'order_number'), ('product', 'product__label'),
+        ('runs', 'runs'), ('run_quantity', 'run_quantity'), ('date', 'date')]),
+    'inventory_records': (InventoryRecord, 'product__user', [
+        ('product', 'product__label'), ('date', 'date'), ('amount', 'amount')]),
+    'par_stock_records': (ParStockRecord, 'product__user', [
+        ('product', 'product__label'), ('date', 'date'), ('amount', 'amount')]),
+}
+
+
+class Echo:
+    #file-like object that hands each written line straight back to csv.writer
+    def write(self, value):
+        return value
+
+
+def export_queryset(kind, user, start_date=None, end_date=None, product=None):
+    model, owner_lookup, columns = EXPORTS[kind]
+    queryset = model.objects.filter(**{owner_lookup: user})
+    if product is not None:
+        queryset = queryset.filter(product=product)
+    if start_date is not None:
+        queryset = queryset.filter(date__gte=start_date)
+    if end_date is not None:
+        queryset = queryset.filter(date__lte=end_date)
+    return queryset
+
+
+def iter_rows(queryset, columns, chunk_size=2000):
+    lookups = ['pk'] + [lookup for name, lookup in columns]
+    date_index = lookups.index('date')
+    queryset = queryset.order_by('date', 'pk').values_list(*lookups)
+    chunk = list(queryset[:chunk_size])
+    while chunk:
+        for row in chunk:
+            yield row[1:]
+        last = chunk[-1]
+        day, pk = last[date_index], last[0]
+        chunk = list(queryset.filter(Q(date__gt=day) | Q(date=day, pk__gt=pk))[:chunk_size])
+
+
+def stream_csv(queryset, columns):
+    writer = csv.writer(Echo())
+    yield writer.writerow([name for name, lookup in columns])
+    for row in iter_rows(queryset, columns):
+        yield writer.writerow(row)
+
+
+def stream_json(queryset, columns):
+    names = [name for name, lookup in columns]
+    separator = '\n'
+    yield '['
+    for row in iter_rows(queryset, columns):
+        yield separator + json.dumps(dict(zip(names, row)), default=str)
+        separator = ',\n'
+    yield '\n]\n'
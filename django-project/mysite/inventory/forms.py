@@ -0,0 +1,40 @@
+from django import forms
+from django.core.exceptions import ValidationError
+
+class OrderUploadForm(forms.Form):
+    ORDER_TYPES = [
+        ('customer', 'Customer Orders'),
+        ('purchase', 'Purchase Orders'),
+    ]
+    order_type = forms.ChoiceField(choices=ORDER_TYPES)
+    file = forms.FileField(label='CSV file')
+
+
+class AutocompleteSelect(forms.Widget):
+    #a text box that looks rows up through an autocomplete endpoint and posts
+    #the chosen row's id, so the page no longer lists every choice
+    template_name = 'inventory/widgets/autocomplete.html'
+
+    class Media:
+        js = ['inventory/autocomplete.js']
+
+    def __init__(self, url, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+        #set to the field's ModelChoiceIterator along with its queryset
+        self.choices = ()
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['url'] = self.url
+        context['widget']['display'] = self.display(context['widget']['value'])
+        return context
+
+    def display(self, value):
+        if not value or not hasattr(self.choices, 'queryset'):
+            return ''
+        try:
+            selected = self.choices.queryset.filter(pk=value).values('name', 'label').first()
+        except (TypeError, ValueError, ValidationError):
+            return ''
+        return f'{selected["name"]} ({selected["label"]})' if selected else ''
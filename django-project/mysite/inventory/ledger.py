@@ -0,0 +1,102 @@
+from collections import defaultdict
+from django.db.models import (
+    Count, ExpressionWrapper, F, FloatField, IntegerField, Max, OuterRef, Q,
+    Subquery, Sum, Value)
+from django.db.models.functions import Coalesce
+from .models import CustomerOrder, PurchaseOrder, InventoryRecord, ParStockRecord
+
+# Stock figures for many products at once. with_stock_totals derives every
+# figure from order and record history with correlated subqueries;
+# with_stock_balances reads the same figures from the maintained
+# ProductStockBalance rows with a single join. Customer order figures come
+# from one grouped join per queryset of customers, plus one grouped query for
+# the top products of all of them.
+
+
+def _product_aggregate(model, aggregate, output_field):
+    totals = model.objects.filter(
+        product=OuterRef('pk')
+        ).order_by().values('product').annotate(total=aggregate).values('total')
+    return Coalesce(
+        Subquery(totals, output_field=output_field), Value(0),
+        output_field=output_field)
+
+
+def _latest_amount(model):
+    latest = model.objects.filter(
+        product=OuterRef('pk')).order_by('-date', '-pk').values('amount')[:1]
+    return Coalesce(
+        Subquery(latest, output_field=IntegerField()), Value(0),
+        output_field=IntegerField())
+
+
+def with_stock_totals(products):
+    products = products.annotate(
+        purchase_orders_total=_product_aggregate(
+            PurchaseOrder, Sum(F('runs') * F('run_quantity')), FloatField()),
+        customer_orders_total=_product_aggregate(
+            CustomerOrder, Sum('quantity'), IntegerField()),
+        purchase_order_count=_product_aggregate(
+            PurchaseOrder, Count('pk'), IntegerField()),
+        customer_order_count=_product_aggregate(
+            CustomerOrder, Count('pk'), IntegerField()),
+        recent_inventory=_latest_amount(InventoryRecord),
+        recent_par_stock=_latest_amount(ParStockRecord),
+    )
+    return _stock_figures(products)
+
+
+def _stock_figures(products):
+    return products.annotate(
+        available=ExpressionWrapper(
+            F('recent_inventory') + F('purchase_orders_total') - F('customer_orders_total'),
+            output_field=FloatField()),
+    ).annotate(
+        stock_error=ExpressionWrapper(
+            F('available') - F('recent_par_stock'), output_field=FloatField()),
+    )
+
+
+def _balance_field(field, output_field):
+    return Coalesce(
+        F(f'stock_balance__{field}'), Value(0), output_field=output_field)
+
+
+def with_stock_balances(products):
+    products = products.annotate(
+        purchase_orders_total=_balance_field('purchase_orders_total', FloatField()),
+        customer_orders_total=_balance_field('customer_orders_total', IntegerField()),
+        purchase_order_count=_balance_field('purchase_order_count', IntegerField()),
+        customer_order_count=_balance_field('customer_order_count', IntegerField()),
+        recent_inventory=_balance_field('recent_inventory', IntegerField()),
+        recent_par_stock=_balance_field('recent_par_stock', IntegerField()),
+        stock_version=_balance_field('version', IntegerField()),
+    )
+    return _stock_figures(products)
+
+
+def with_customer_totals(customers, since):
+    #lifetime figures plus the same figures for orders dated since `since`
+    recent = Q(customerorder__date__gte=since)
+    return customers.annotate(
+        order_count=Count('customerorder'),
+        quantity_total=Coalesce(Sum('customerorder__quantity'), Value(0)),
+        recent_order_count=Count('customerorder', filter=recent),
+        recent_quantity_total=Coalesce(Sum('customerorder__quantity', filter=recent), Value(0)),
+        last_order_date=Max('customerorder__date'),
+    )
+
+
+def top_products(customers, limit=3):
+    #{customer id: [(product name, product label, quantity)]} biggest first,
+    #sorted here so the database only groups
+    totals = defaultdict(list)
+    rows = CustomerOrder.objects.filter(customer__in=customers).values(
+        'customer_id', 'product__name', 'product__label').annotate(
+        quantity=Sum('quantity')).order_by()
+    for row in rows:
+        totals[row['customer_id']].append(
+            (row['product__name'], row['product__label'], row['quantity']))
+    return {
+        customer_id: sorted(products, key=lambda product: -product[2])[:limit]
+        for customer_id, products in totals.items()}
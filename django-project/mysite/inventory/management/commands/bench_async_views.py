@@ -0,0 +1,120 @@
+import statistics
+import time
+from datetime import datetime
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.db.models import Count
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from inventory import views, async_views
+from inventory.models import CustomerOrder
+
+
+class Latency:
+    #stands in for a remote database by waiting before every query
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.connections = []
+
+    def __call__(self, execute, sql, params, many, context):
+        time.sleep(self.seconds)
+        return execute(sql, params, many, context)
+
+    def install(self, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+            self.connections.append(connection)
+
+    def __enter__(self):
+        #pool threads open their own connections, so every new connection
+        #gets the delay as well as this thread's
+        connection_created.connect(self.install)
+        self.install(connection)
+        return self
+
+    def __exit__(self, *exc_info):
+        connection_created.disconnect(self.install)
+        for wrapped in self.connections:
+            wrapped.execute_wrappers.remove(self)
+
+
+class Command(BaseCommand):
+    help = ('Time the sync and async dashboard and product order views with '
+            'an artificial delay added to every database query')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', help='username whose pages are timed, defaults to the '
+                           'user with the most customer orders')
+        parser.add_argument(
+            '--latency', type=float, default=5, help='delay per query in milliseconds')
+        parser.add_argument(
+            '--repeat', type=int, default=20, help='timed requests per view')
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user = User.objects.get(username=options['user'])
+        else:
+            user = User.objects.annotate(
+                orders=Count('customerorder')).order_by('-orders').first()
+        order = CustomerOrder.objects.filter(user=user).order_by('date', 'pk').first()
+        if order is None:
+            raise CommandError('Seed the database before timing the views')
+        label = order.product.label
+        #the date converter in inventory/urls.py passes datetimes to the views
+        start_date = datetime(order.date.year, order.date.month, order.date.day)
+
+        cases = [
+            ('index', views.index, async_views.index, {}),
+            ('product_orders', views.ProductOrders.as_view(), async_views.product_orders,
+                {'product': label}),
+            ('date_filter_product_orders', views.ProductOrdersDateFilter.as_view(),
+                async_views.product_orders_date_filter,
+                {'product': label, 'date': start_date}),
+        ]
+        factory = RequestFactory()
+        latency = options['latency'] / 1000
+
+        #the page cache would hide the queries being compared
+        with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            with Latency(latency):
+                for name, sync_view, async_view, kwargs in cases:
+                    sync_times = self.time_view(
+                        lambda: self.call_sync(sync_view, factory, user, kwargs), options['repeat'])
+                    async_times = self.time_view(
+                        lambda: self.call_async(async_view, factory, user, kwargs), options['repeat'])
+                    sync_median = statistics.median(sync_times)
+                    async_median = statistics.median(async_times)
+                    self.stdout.write(
+                        f'{name}: sync {sync_median:.1f} ms, async {async_median:.1f} ms '
+                        f'({sync_median / async_median:.1f}x)')
+
+    def time_view(self, call, repeat):
+        call()
+        times = []
+        for i in range(repeat):
+            started = time.perf_counter()
+            response = call()
+            times.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'view returned {response.status_code}')
+        return times
+
+    def request(self, factory, user):
+        request = factory.get('/')
+        request.user = user
+        return request
+
+    def call_sync(self, view, factory, user, kwargs):
+        response = view(self.request(factory, user), **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def call_async(self, view, factory, user, kwargs):
+        return async_to_sync(view)(self.request(factory, user), **kwargs)
+
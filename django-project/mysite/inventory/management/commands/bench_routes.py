@@ -0,0 +1,141 @@
+import json
+import math
+import statistics
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import get_resolver
+from inventory.route_samples import sample_urls, form_urls
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def inventory_route_names():
+    resolver = get_resolver()
+    names = set()
+    for pattern in resolver.url_patterns:
+        if getattr(pattern, 'namespace', None) == 'inventory':
+            names.update(p.name for p in pattern.url_patterns if p.name)
+    return names
+
+
+class Command(BaseCommand):
+    help = ('Request every inventory route with the test client and report '
+            'p50/p95 latency and query counts, optionally against a baseline')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', help='username whose pages are requested, defaults to the '
+                           'user with the most customer orders')
+        parser.add_argument('--repeat', type=int, default=20, help='timed requests per route')
+        parser.add_argument('--save-baseline', metavar='FILE', help='write the results to FILE')
+        parser.add_argument('--baseline', metavar='FILE', help='compare the results with FILE')
+        parser.add_argument(
+            '--max-slowdown', type=float, default=0.25,
+            help='fraction a route p95 may grow over the baseline before it counts as a regression')
+        parser.add_argument(
+            '--no-cache', action='store_true', help='use a dummy cache so every request builds its page')
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user = User.objects.get(username=options['user'])
+        else:
+            user = User.objects.annotate(
+                orders=Count('customerorder')).order_by('-orders').first()
+        if user is None:
+            raise CommandError('Seed the database before benchmarking, see seed_inventory')
+
+        cache_settings = {}
+        if options['no_cache']:
+            cache_settings['CACHES'] = {'default': {
+                'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+        client = Client()
+        client.force_login(user)
+        routes = sample_urls(user) + form_urls(user)
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['*'], **cache_settings):
+            for name, url in routes:
+                results[name] = self.time_route(client, name, url, options['repeat'])
+
+        self.stdout.write(f'{"route":<36} {"p50 ms":>8} {"p95 ms":>8} {"queries":>8}')
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<36} {result["p50_ms"]:>8.1f} {result["p95_ms"]:>8.1f} {result["queries"]:>8}')
+        covered = {name.split()[0] for name in results}
+        skipped = sorted(inventory_route_names() - covered)
+        if skipped:
+            self.stdout.write(f'not requested: {", ".join(skipped)}')
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as baseline_file:
+                json.dump(results, baseline_file, indent=2, sort_keys=True)
+            self.stdout.write(f'Saved baseline to {options["save_baseline"]}')
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['max_slowdown'])
+
+    def time_route(self, client, name, url, repeat):
+        self.request(client, url)
+        times = []
+        queries = 0
+        for i in range(repeat):
+            counter = QueryCounter()
+            started = time.perf_counter()
+            with connection.execute_wrapper(counter):
+                response = self.request(client, url)
+            times.append((time.perf_counter() - started) * 1000)
+            queries = max(queries, counter.count)
+            if response.status_code != 200:
+                raise CommandError(f'{name} ({url}) returned {response.status_code}')
+        return {
+            'url': url,
+            'p50_ms': round(statistics.median(times), 3),
+            'p95_ms': round(percentile(times, 0.95), 3),
+            'queries': queries,
+        }
+
+    def request(self, client, url):
+        response = client.get(url)
+        if response.streaming:
+            #exports only do their work while the body is read
+            for chunk in response.streaming_content:
+                pass
+        return response
+
+    def compare(self, results, path, max_slowdown):
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = []
+        self.stdout.write(f'\n{"route":<36} {"p95 ms":>8} {"baseline":>9} {"change":>8} {"queries":>8}')
+        for name, result in results.items():
+            before = baseline.get(name)
+            if before is None:
+                self.stdout.write(f'{name:<36} {result["p95_ms"]:>8.1f} {"new":>9}')
+                continue
+            change = result['p95_ms'] / before['p95_ms'] - 1 if before['p95_ms'] else 0
+            queries = f'{before["queries"]}->{result["queries"]}'
+            self.stdout.write(
+                f'{name:<36} {result["p95_ms"]:>8.1f} {before["p95_ms"]:>9.1f} {change:>+8.0%} {queries:>8}')
+            if change > max_slowdown:
+                regressions.append(f'{name} p95 {change:+.0%}')
+            if result['queries'] > before['queries']:
+                regressions.append(f'{name} queries {queries}')
+        if regressions:
+            raise CommandError('Regressions against the baseline: ' + '; '.join(regressions))
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
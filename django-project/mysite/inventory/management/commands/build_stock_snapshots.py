@@ -0,0 +1,31 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand
+from inventory.models import Product, StockSnapshot
+from inventory.snapshots import PERIODS, build_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Checkpoint closing stock figures for every closed day or week'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', choices=PERIODS, default='daily')
+        parser.add_argument(
+            '--until', type=lambda value: datetime.strptime(value, '%Y-%m-%d').date(),
+            help='last day to checkpoint (YYYY-MM-DD), defaults to yesterday')
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='delete existing snapshots before building')
+        parser.add_argument(
+            '--user', help='only process products owned by this username')
+
+    def handle(self, *args, **options):
+        products = Product.objects.all()
+        if options['user']:
+            products = products.filter(user__username=options['user'])
+        if options['rebuild']:
+            StockSnapshot.objects.filter(product__in=products).delete()
+
+        created = 0
+        for product in products.iterator():
+            created += build_snapshots(product, options['period'], options['until'])
+        self.stdout.write(self.style.SUCCESS(f'Created {created} stock snapshots'))
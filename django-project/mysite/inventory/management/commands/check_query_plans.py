@@ -0,0 +1,103 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings
+from inventory.route_samples import sample_urls
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith('SELECT'):
+            self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+def sqlite_problems(cursor, sql, params):
+    cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+    problems = []
+    for row in cursor.fetchall():
+        detail = row[-1]
+        if detail.startswith('SCAN ') and 'CONSTANT ROW' not in detail:
+            problems.append(detail)
+        elif 'TEMP B-TREE' in detail and 'ORDER BY' in detail:
+            problems.append(detail)
+    return problems
+
+
+def mysql_problems(cursor, sql, params):
+    cursor.execute(f'EXPLAIN {sql}', params)
+    columns = [column[0] for column in cursor.description]
+    problems = []
+    for row in cursor.fetchall():
+        plan = dict(zip(columns, row))
+        extra = plan.get('Extra') or ''
+        if plan.get('type') == 'ALL':
+            problems.append(f"full scan of {plan['table']}")
+        if 'Using filesort' in extra:
+            problems.append(f"filesort on {plan['table']}")
+    return problems
+
+
+EXPLAINERS = {
+    'sqlite': sqlite_problems,
+    'mysql': mysql_problems,
+}
+
+
+class Command(BaseCommand):
+    help = ('EXPLAIN every query issued by the inventory pages and fail if a '
+            'query needs a full table scan or a sort outside an index')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', help='username whose pages are checked, defaults to the '
+                           'user with the most customer orders')
+        parser.add_argument(
+            '--show-plans', action='store_true', help='print every plan checked')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in EXPLAINERS:
+            raise CommandError(f'Query plans cannot be checked on {connection.vendor}')
+        explain = EXPLAINERS[connection.vendor]
+
+        if options['user']:
+            user = User.objects.get(username=options['user'])
+        else:
+            user = User.objects.annotate(
+                orders=Count('customerorder')).order_by('-orders').first()
+        if user is None:
+            raise CommandError('Seed the database before checking query plans')
+
+        client = Client()
+        client.force_login(user)
+        failures = 0
+        with override_settings(ALLOWED_HOSTS=['*']):
+            for name, url in sample_urls(user):
+                recorder = QueryRecorder()
+                with connection.execute_wrapper(recorder):
+                    response = client.get(url)
+                if response.status_code != 200:
+                    raise CommandError(f'{name} ({url}) returned {response.status_code}')
+
+                seen = set()
+                with connection.cursor() as cursor:
+                    for sql, params in recorder.queries:
+                        if sql in seen:
+                            continue
+                        seen.add(sql)
+                        problems = explain(cursor, sql, params)
+                        if problems:
+                            failures += 1
+                            self.stdout.write(self.style.ERROR(f'{name}: {"; ".join(problems)}'))
+                            self.stdout.write(f'    {sql}')
+                        elif options['show_plans']:
+                            self.stdout.write(f'{name}: ok {sql}')
+
+        if failures:
+            raise CommandError(f'{failures} queries fall back to a scan or sort')
+        self.stdout.write(self.style.SUCCESS('All inventory page queries use indexes'))
@@ -0,0 +1,66 @@
+import subprocess
+import sys
+from collections import defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+#what App Engine does before the first request: import the WSGI entry point,
+#then the URLconf and with it every view module
+COLD_START = '''
+import time
+started = time.perf_counter()
+import main
+from django.urls import get_resolver
+get_resolver().url_patterns
+print((time.perf_counter() - started) * 1000)
+'''
+
+
+def parse_importtime(output):
+    #[(module, self microseconds)] from python -X importtime
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us)))
+    return modules
+
+
+class Command(BaseCommand):
+    help = ('Import the app in a fresh interpreter with python -X importtime '
+            'and report where cold start time goes')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=15, help='rows per table')
+        parser.add_argument(
+            '--budget-ms', type=float,
+            help='fail when importing the app takes longer than this')
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', COLD_START],
+            cwd=settings.BASE_DIR, capture_output=True, text=True)
+        if result.returncode:
+            raise CommandError(f'Importing the app failed:\n{result.stderr[-2000:]}')
+        total_ms = float(result.stdout.strip().splitlines()[-1])
+        modules = parse_importtime(result.stderr)
+
+        #self times never overlap, so they add up per top level package
+        packages = defaultdict(lambda: [0, 0])
+        for name, self_us in modules:
+            package = packages[name.split('.')[0]]
+            package[0] += self_us
+            package[1] += 1
+
+        limit = options['limit']
+        self.stdout.write(f'{total_ms:.1f} ms to import main and the URLconf, {len(modules)} modules\n')
+        self.stdout.write(f'{"package":<40} {"ms":>8} {"modules":>8}')
+        for name, (self_us, count) in sorted(packages.items(), key=lambda item: -item[1][0])[:limit]:
+            self.stdout.write(f'{name:<40} {self_us / 1000:>8.1f} {count:>8}')
+        self.stdout.write(f'\n{"module":<60} {"ms":>8}')
+        for name, self_us in sorted(modules, key=lambda module: -module[1])[:limit]:
+            self.stdout.write(f'{name:<60} {self_us / 1000:>8.1f}')
+
+        if options['budget_ms'] is not None and total_ms > options['budget_ms']:
+            raise CommandError(f'Import took {total_ms:.1f} ms, over the {options["budget_ms"]:.0f} ms budget')
@@ -0,0 +1,19 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from inventory.profiling import make_token, TOKEN_MAX_AGE
+
+
+class Command(BaseCommand):
+    help = ('Print a signed X-Inventory-Profile header value for a staff user, '
+            'which profiles any request that sends it')
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'], is_staff=True, is_active=True)
+        except User.DoesNotExist:
+            raise CommandError(f'{options["username"]} is not an active staff user')
+        self.stdout.write(make_token(user))
+        self.stderr.write(f'valid for {TOKEN_MAX_AGE // 3600} hours, send it as X-Inventory-Profile')
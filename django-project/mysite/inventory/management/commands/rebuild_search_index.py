@@ -0,0 +1,19 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from inventory.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the search tokens of orders, customers and products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='only rebuild the tokens of this username')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['user']:
+            users = users.filter(username=options['user'])
+        counts = rebuild_search_index(users, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Rebuilt search tokens: ' + ', '.join(
+            f'{count} for {model._meta.verbose_name_plural}' for model, count in counts.items())))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from inventory.models import Product
+from inventory.balances import rebuild_balances, verify_balances
+
+
+class Command(BaseCommand):
+    help = 'Rebuild or verify the materialized per-product stock balances'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='compare stored balances with order history without writing')
+        parser.add_argument(
+            '--user', help='only process products owned by this username')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        products = Product.objects.all()
+        if options['user']:
+            products = products.filter(user__username=options['user'])
+
+        if options['verify']:
+            mismatches = verify_balances(products, batch_size=options['batch_size'])
+            for product, field, actual, expected in mismatches:
+                self.stdout.write(
+                    f'{product.label}: {field} is {actual}, expected {expected}')
+            if mismatches:
+                raise CommandError(f'{len(mismatches)} stock balance mismatches found')
+            self.stdout.write(self.style.SUCCESS('All stock balances match order history'))
+            return
+
+        created, updated = rebuild_balances(products, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt stock balances: {created} created, {updated} updated'))
@@ -0,0 +1,97 @@
+import random
+from datetime import date, timedelta
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from inventory.balances import rebuild_balances
+from inventory.search import index_objects
+from inventory.models import (
+    Product, Customer, CustomerOrder, PurchaseOrder, InventoryRecord,
+    ParStockRecord)
+from inventory.signals import orders_bulk_created
+from users.models import Profile
+
+
+class Command(BaseCommand):
+    help = ('Create users with products, customers, orders and stock records '
+            'for load testing, written with bulk inserts')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5)
+        parser.add_argument('--products', type=int, default=20, help='products per user')
+        parser.add_argument('--customers', type=int, default=10, help='customers per user')
+        parser.add_argument(
+            '--orders', type=int, default=100,
+            help='customer orders and purchase orders per product')
+        parser.add_argument('--records', type=int, default=12, help='inventory and par stock records per product')
+        parser.add_argument('--days', type=int, default=365, help='spread dates over this many days up to today')
+        parser.add_argument('--prefix', default='bench', help='prefix for usernames and labels')
+        parser.add_argument('--password', default='bench-password')
+        parser.add_argument('--seed', type=int, default=0, help='random seed, the same seed gives the same data')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}-').exists():
+            raise CommandError(f'Users named {prefix}-* already exist, choose another --prefix')
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.first_day = date.today() - timedelta(days=options['days'])
+        self.days = options['days']
+
+        #bulk_create skips the signals, so profiles, stock balances and search
+        #tokens are created here and the balances rebuilt from the new rows at
+        #the end
+        password = make_password(options['password'])
+        with transaction.atomic():
+            User.objects.bulk_create([
+                User(username=f'{prefix}-{number}', password=password)
+                for number in range(options['users'])], batch_size=self.batch_size)
+            users = list(User.objects.filter(username__startswith=f'{prefix}-').order_by('pk'))
+            Profile.objects.bulk_create([Profile(user=user) for user in users], batch_size=self.batch_size)
+            for user in users:
+                self.seed_user(user, options)
+            created, updated = rebuild_balances(
+                Product.objects.filter(user__in=users), batch_size=self.batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(users)} users with {created} products '
+            f'(log in as {users[0].username} with the --password given)'))
+
+    def random_day(self):
+        return self.first_day + timedelta(days=self.random.randrange(self.days + 1))
+
+    def seed_user(self, user, options):
+        Product.objects.bulk_create([
+            Product(name=f'Product {number}', label=f'{user.username}-p{number}', user=user)
+            for number in range(options['products'])], batch_size=self.batch_size)
+        Customer.objects.bulk_create([
+            Customer(name=f'Customer {number}', label=f'{user.username}-c{number}', user=user)
+            for number in range(options['customers'])], batch_size=self.batch_size)
+        products = list(Product.objects.filter(user=user))
+        customers = list(Customer.objects.filter(user=user))
+        index_objects(Product, products, replace=False, batch_size=self.batch_size)
+        index_objects(Customer, customers, replace=False, batch_size=self.batch_size)
+
+        for product in products:
+            customer_orders = CustomerOrder.objects.bulk_create([
+                CustomerOrder(
+                    order_number=f'CO{product.pk}-{number}', product=product, user=user,
+                    customer=self.random.choice(customers), date=self.random_day(),
+                    quantity=self.random.randint(1, 50))
+                for number in range(options['orders'] if customers else 0)], batch_size=self.batch_size)
+            purchase_orders = PurchaseOrder.objects.bulk_create([
+                PurchaseOrder(
+                    order_number=f'PO{product.pk}-{number}', product=product, user=user,
+                    runs=self.random.choice([0.5, 1, 1.5, 2]), run_quantity=self.random.randint(10, 100),
+                    date=self.random_day())
+                for number in range(options['orders'])], batch_size=self.batch_size)
+            orders_bulk_created.send(sender=CustomerOrder, orders=customer_orders)
+            orders_bulk_created.send(sender=PurchaseOrder, orders=purchase_orders)
+            InventoryRecord.objects.bulk_create([
+                InventoryRecord(product=product, amount=self.random.randint(0, 500), date=self.random_day())
+                for number in range(options['records'])], batch_size=self.batch_size)
+            ParStockRecord.objects.bulk_create([
+                ParStockRecord(product=product, amount=self.random.randint(50, 200), date=self.random_day())
+                for number in range(options['records'])], batch_size=self.batch_size)
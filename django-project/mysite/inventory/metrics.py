@@ -0,0 +1,110 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# Per-request query and latency figures. A wrapper installed on every database
+# connection reports each query to the collector of the request in progress,
+# found through a context variable, so queries run on other threads by the
+# async views still count towards their request. Finished requests are folded
+# into per-view histograms that the metrics view prints in Prometheus format.
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+current_collector = ContextVar('inventory_query_collector', default=None)
+
+
+class QueryCollector:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_sql = ''
+        self.lock = threading.Lock()
+
+    def add(self, sql, seconds):
+        with self.lock:
+            self.count += 1
+            self.seconds += seconds
+            if seconds > self.slowest_seconds:
+                self.slowest_seconds = seconds
+                self.slowest_sql = sql
+
+
+def record_query(execute, sql, params, many, context):
+    collector = current_collector.get()
+    if collector is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        collector.add(sql, time.perf_counter() - started)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    #connection_created receiver, connections are reopened on every request
+    #unless CONN_MAX_AGE is set, so guard against adding the wrapper twice
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def lines(self, name, labels):
+        total = 0
+        for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            total += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {total}'
+        yield f'{name}_sum{{{labels}}} {self.sum}'
+        yield f'{name}_count{{{labels}}} {total}'
+
+
+HISTOGRAMS = [
+    ('inventory_request_duration_seconds', 'Response time per view', SECONDS_BUCKETS),
+    ('inventory_request_db_seconds', 'Database time per request', SECONDS_BUCKETS),
+    ('inventory_request_queries', 'Queries per request', QUERY_BUCKETS),
+]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+        self.responses = {}
+
+    def observe(self, view, status, duration, collector):
+        with self.lock:
+            histograms = self.views.get(view)
+            if histograms is None:
+                histograms = self.views[view] = [Histogram(buckets) for name, text, buckets in HISTOGRAMS]
+            for histogram, value in zip(histograms, [duration, collector.seconds, collector.count]):
+                histogram.observe(value)
+            key = (view, status)
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+    def prometheus(self):
+        with self.lock:
+            lines = [
+                '# HELP inventory_responses_total Responses per view and status code',
+                '# TYPE inventory_responses_total counter',
+            ]
+            for (view, status), count in sorted(self.responses.items()):
+                lines.append(f'inventory_responses_total{{view="{view}",status="{status}"}} {count}')
+            for index, (name, text, buckets) in enumerate(HISTOGRAMS):
+                lines += [f'# HELP {name} {text}', f'# TYPE {name} histogram']
+                for view, histograms in sorted(self.views.items()):
+                    lines += histograms[index].lines(name, f'view="{view}"')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
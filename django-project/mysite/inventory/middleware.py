@@ -0,0 +1,90 @@
+import asyncio
+import json
+import logging
+import time
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.urls import reverse
+from .metrics import QueryCollector, current_collector, registry
+from .profiling import PROFILE_HEADER, RequestProfile, token_user_id
+
+logger = logging.getLogger('inventory.requests')
+
+
+class QueryMetricsMiddleware:
+    #records the view, query count, database time, slowest query and response
+    #time of every request; keep it first in MIDDLEWARE so the timing covers
+    #the rest of the stack
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        collector = QueryCollector()
+        token = current_collector.set(collector)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_collector.reset(token)
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        registry.observe(view, response.status_code, duration, collector)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'view': view,
+                'method': request.method,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 2),
+                'queries': collector.count,
+                'db_ms': round(collector.seconds * 1000, 2),
+                'slowest_query_ms': round(collector.slowest_seconds * 1000, 2),
+                'slowest_query': collector.slowest_sql[:500],
+            }))
+        return response
+
+
+class RequestProfilingMiddleware:
+    #profiles the view when a staff user adds ?profile=1 or sends a signed
+    #X-Inventory-Profile header (see the profiling_token command); every
+    #other request costs one header lookup and one substring check. Keep it
+    #last in MIDDLEWARE so only the view is profiled.
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        header = request.META.get(PROFILE_HEADER)
+        if header is None and 'profile=' not in request.META.get('QUERY_STRING', ''):
+            return None
+        if not self.allowed(request, header):
+            return None
+
+        profile = RequestProfile()
+        if asyncio.iscoroutinefunction(view_func):
+            #entered on the event loop thread that runs the view, this thread
+            #only waits for it
+            async def profiled():
+                with profile:
+                    return await view_func(request, *view_args, **view_kwargs)
+            response = async_to_sync(profiled)()
+        else:
+            with profile:
+                response = view_func(request, *view_args, **view_kwargs)
+                #template responses render after the middleware, so render
+                #here to include it in the profile
+                if hasattr(response, 'render') and not response.is_rendered:
+                    response.render()
+        name = profile.save(request, request.resolver_match.view_name, view_args, view_kwargs)
+        response['X-Inventory-Profile'] = reverse('inventory:profile_download', args=[name])
+        return response
+
+    def allowed(self, request, header):
+        if header is not None:
+            user_id = token_user_id(header)
+            return user_id is not None and User.objects.filter(
+                pk=user_id, is_staff=True, is_active=True).exists()
+        return request.GET.get('profile') == '1' and request.user.is_staff
@@ -0,0 +1,64 @@
+# Generated by Django 3.2.4 on 2021-06-14 18:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_balances(apps, schema_editor):
+    Product = apps.get_model('inventory', 'Product')
+    PurchaseOrder = apps.get_model('inventory', 'PurchaseOrder')
+    CustomerOrder = apps.get_model('inventory', 'CustomerOrder')
+    InventoryRecord = apps.get_model('inventory', 'InventoryRecord')
+    ParStockRecord = apps.get_model('inventory', 'ParStockRecord')
+    ProductStockBalance = apps.get_model('inventory', 'ProductStockBalance')
+
+    purchase_orders = {
+        row['product']: row for row in PurchaseOrder.objects.values('product').annotate(
+            total=models.Sum(models.F('runs') * models.F('run_quantity'), output_field=models.FloatField()),
+            count=models.Count('pk'))}
+    customer_orders = {
+        row['product']: row for row in CustomerOrder.objects.values('product').annotate(
+            total=models.Sum('quantity'), count=models.Count('pk'))}
+    recent_inventories = {}
+    for product_id, amount in InventoryRecord.objects.order_by('date', 'pk').values_list('product', 'amount'):
+        recent_inventories[product_id] = amount
+    recent_par_stocks = {}
+    for product_id, amount in ParStockRecord.objects.order_by('date', 'pk').values_list('product', 'amount'):
+        recent_par_stocks[product_id] = amount
+
+    empty = {'total': 0, 'count': 0}
+    ProductStockBalance.objects.bulk_create([
+        ProductStockBalance(
+            product_id=product_id,
+            purchase_orders_total=purchase_orders.get(product_id, empty)['total'],
+            purchase_order_count=purchase_orders.get(product_id, empty)['count'],
+            customer_orders_total=customer_orders.get(product_id, empty)['total'],
+            customer_order_count=customer_orders.get(product_id, empty)['count'],
+            recent_inventory=recent_inventories.get(product_id, 0),
+            recent_par_stock=recent_par_stocks.get(product_id, 0),
+        ) for product_id in Product.objects.values_list('pk', flat=True)
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0014_auto_20210602_0409'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductStockBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('purchase_orders_total', models.FloatField(default=0)),
+                ('customer_orders_total', models.IntegerField(default=0)),
+                ('purchase_order_count', models.IntegerField(default=0)),
+                ('customer_order_count', models.IntegerField(default=0)),
+                ('recent_inventory', models.IntegerField(default=0)),
+                ('recent_par_stock', models.IntegerField(default=0)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stock_balance', to='inventory.product')),
+            ],
+        ),
+        migrations.RunPython(build_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.4 on 2021-06-14 19:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0015_productstockbalance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('purchase_orders_total', models.FloatField(default=0)),
+                ('customer_orders_total', models.IntegerField(default=0)),
+                ('recent_inventory', models.IntegerField(default=0)),
+                ('recent_par_stock', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='inventory.product')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='stocksnapshot',
+            constraint=models.UniqueConstraint(fields=('product', 'date'), name='unique_product_snapshot_date'),
+        ),
+    ]
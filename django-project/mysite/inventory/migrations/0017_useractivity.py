@@ -0,0 +1,25 @@
+# Generated by Django 3.2.4 on 2021-06-15 02:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('inventory', '0016_stocksnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('latest_customer_order_date', models.DateField(null=True)),
+                ('latest_purchase_order_date', models.DateField(null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_activity', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
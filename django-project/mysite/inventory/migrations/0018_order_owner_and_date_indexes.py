@@ -0,0 +1,62 @@
+# Generated by Django 3.2.4 on 2021-06-16 03:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_order_owners(apps, schema_editor):
+    Product = apps.get_model('inventory', 'Product')
+    for model_name in ['CustomerOrder', 'PurchaseOrder']:
+        apps.get_model('inventory', model_name).objects.update(user=models.Subquery(
+            Product.objects.filter(pk=models.OuterRef('product_id')).values('user')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('inventory', '0017_useractivity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customerorder',
+            name='user',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='purchaseorder',
+            name='user',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(copy_order_owners, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='customerorder',
+            index=models.Index(fields=['user', 'date'], name='co_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerorder',
+            index=models.Index(fields=['product', 'date'], name='co_product_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerorder',
+            index=models.Index(fields=['customer', 'date'], name='co_customer_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventoryrecord',
+            index=models.Index(fields=['product', 'date'], name='ir_product_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='parstockrecord',
+            index=models.Index(fields=['product', 'date'], name='ps_product_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['user', 'date'], name='po_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['product', 'date'], name='po_product_date_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.4 on 2021-06-17 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0018_order_owner_and_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productstockbalance',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.4 on 2021-06-19 17:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0019_productstockbalance_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['user', 'label'], name='customer_user_label_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['user', 'label'], name='product_user_label_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 3.2.4 on 2021-06-20 10:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+
+
+def build_search_tokens(apps, schema_editor):
+    #same as inventory.search.rebuild_search_index, against the historical models
+    word = re.compile(r'[^\W_]+')
+    SearchToken = apps.get_model('inventory', 'SearchToken')
+    sources = [
+        ('CustomerOrder', 'co', 'order_number'),
+        ('PurchaseOrder', 'po', 'order_number'),
+        ('Customer', 'cu', 'name'),
+        ('Product', 'pr', 'name'),
+    ]
+    for model_name, kind, field in sources:
+        model = apps.get_model('inventory', model_name)
+        rows = []
+        for pk, user_id, text in model.objects.filter(
+                user__isnull=False).values_list('pk', 'user', field).iterator():
+            words = [found[:50] for found in word.findall((text or '').lower())]
+            tokens = set(words)
+            if len(words) > 1:
+                tokens.add(''.join(words)[:50])
+            rows += [
+                SearchToken(user_id=user_id, kind=kind, object_id=pk, token=token)
+                for token in sorted(tokens)]
+            if len(rows) >= 1000:
+                SearchToken.objects.bulk_create(rows)
+                rows = []
+        SearchToken.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('inventory', '0020_label_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('co', 'Customer Order'), ('po', 'Purchase Order'), ('cu', 'Customer'), ('pr', 'Product')], max_length=2)),
+                ('object_id', models.BigIntegerField()),
+                ('token', models.CharField(max_length=50)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='searchtoken',
+            index=models.Index(fields=['user', 'token'], name='search_user_token_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='searchtoken',
+            index=models.Index(fields=['kind', 'object_id', 'token'], name='search_object_token_idx'),
+        ),
+        migrations.RunPython(build_search_tokens, migrations.RunPython.noop),
+    ]
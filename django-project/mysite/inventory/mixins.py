@@ -0,0 +1,81 @@
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from .forms import AutocompleteSelect
+from .models import Product, Customer
+
+# Ownership checks that resolve their target once per request. test_func,
+# get_context_data, form_valid and get_success_url all call these helpers,
+# so after the first call they only read the memoized row. Owners are
+# compared by id, which never needs the User row itself.
+
+
+class OwnedObjectMixin:
+    #path from the view's object to its owning user, e.g. 'product__user'
+    owner_lookup = 'user'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        path = self.owner_lookup.split('__')[:-1]
+        if path:
+            queryset = queryset.select_related('__'.join(path))
+        return queryset
+
+    def get_object(self, queryset=None):
+        if queryset is not None:
+            return super().get_object(queryset)
+        if not hasattr(self, '_owned_object'):
+            self._owned_object = super().get_object()
+        return self._owned_object
+
+    def get_owner_id(self, obj):
+        *path, field = self.owner_lookup.split('__')
+        for name in path:
+            obj = getattr(obj, name)
+        return getattr(obj, f'{field}_id')
+
+    def test_func(self):
+        return self.get_owner_id(self.get_object()) == self.request.user.pk
+
+
+class ProductFromUrlMixin:
+    #views addressed by a product label in the URL
+    product_url_kwarg = 'product'
+
+    def get_product(self):
+        if not hasattr(self, '_url_product'):
+            self._url_product = get_object_or_404(
+                Product, label=self.kwargs[self.product_url_kwarg])
+        return self._url_product
+
+    def test_func(self):
+        return self.get_product().user_id == self.request.user.pk
+
+
+class CustomerFromUrlMixin:
+    #views addressed by a customer label in the URL
+    customer_url_kwarg = 'customer'
+
+    def get_customer(self):
+        if not hasattr(self, '_url_customer'):
+            self._url_customer = get_object_or_404(
+                Customer, label=self.kwargs[self.customer_url_kwarg])
+        return self._url_customer
+
+    def test_func(self):
+        return self.get_customer().user_id == self.request.user.pk
+
+
+class AutocompleteFieldsMixin:
+    #{field name: autocomplete url name}; the fields choose among the user's
+    #own rows through an AutocompleteSelect instead of a full <select>
+    autocomplete_fields = {}
+
+    def get_form(self, form_class=None):
+        form = super().get_form(form_class)
+        for name, url_name in self.autocomplete_fields.items():
+            field = form.fields[name]
+            field.widget = AutocompleteSelect(reverse(url_name))
+            field.widget.is_required = field.required
+            #assigning the queryset hands the widget its choices
+            field.queryset = field.queryset.filter(user=self.request.user)
+        return form
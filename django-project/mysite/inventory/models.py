@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth.models import User
@@ -8,6 +8,12 @@ class Product(models.Model):
     label = models.SlugField(max_length=50, null=True, unique=True)
     user = models.ForeignKey(User, on_delete=models.PROTECT, null=True)
 
+    class Meta:
+        indexes = [
+            #autocomplete reads label prefixes of one user's rows in order
+            models.Index(fields=['user', 'label'], name='product_user_label_idx'),
+        ]
+
     def __str__(self):
         return f'{self.name}'
 
@@ -15,16 +21,39 @@ class Product(models.Model):
         return reverse('inventory:product_detail', kwargs={'product': self.label})
 
 
-class PurchaseOrder(models.Model):
+class StockMovement(models.Model):
+    #stock balances are kept up to date by signals, so the row and its
+    #balance change are written in the same transaction
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class PurchaseOrder(StockMovement):
     order_number = models.CharField(max_length=25)
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
     runs = models.FloatField()
     run_quantity = models.IntegerField()
     date = models.DateField(default=timezone.now)
+    #copy of product.user so user-wide order lists can be read off an index
+    user = models.ForeignKey(User, on_delete=models.PROTECT, null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date'], name='po_user_date_idx'),
+            models.Index(fields=['product', 'date'], name='po_product_date_idx'),
+        ]
 
     def __str__(self):
         return f'{self.order_number}: {self.product.name}: {self.total}'
 
+    def save(self, *args, **kwargs):
+        self.user_id = self.product.user_id
+        super().save(*args, **kwargs)
+
     @property
     def total(self):
         return self.run_quantity * self.runs
@@ -38,6 +67,11 @@ class Customer(models.Model):
     label = models.SlugField(max_length=50, null=True, unique=True)
     user = models.ForeignKey(User, on_delete=models.PROTECT, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'label'], name='customer_user_label_idx'),
+        ]
+
     def __str__(self):
         return f'{self.name}'
 
@@ -45,25 +79,43 @@ class Customer(models.Model):
         return reverse('inventory:customer_detail', kwargs={'pk': self.pk})
 
 
-class CustomerOrder(models.Model):
+class CustomerOrder(StockMovement):
     order_number = models.CharField(max_length=25)
     customer = models.ForeignKey(Customer, on_delete=models.PROTECT)
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
     date = models.DateField(default=timezone.now)
     quantity = models.IntegerField()
+    #copy of product.user so user-wide order lists can be read off an index
+    user = models.ForeignKey(User, on_delete=models.PROTECT, null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date'], name='co_user_date_idx'),
+            models.Index(fields=['product', 'date'], name='co_product_date_idx'),
+            models.Index(fields=['customer', 'date'], name='co_customer_date_idx'),
+        ]
 
     def __str__(self):
         return f'{self.order_number}: {self.customer.name[:5]}: {self.quantity} {self.product.name}'
 
+    def save(self, *args, **kwargs):
+        self.user_id = self.product.user_id
+        super().save(*args, **kwargs)
+
     def get_absolute_url(self):
         return reverse('inventory:customer_order_detail', kwargs={'pk': self.pk})
 
 
-class InventoryRecord(models.Model):
+class InventoryRecord(StockMovement):
     amount = models.IntegerField()
     date = models.DateField(default=timezone.now)
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'date'], name='ir_product_date_idx'),
+        ]
+
     def __str__(self):
         return f'{self.amount} {self.product.name} on {self.date}'
 
@@ -72,11 +124,16 @@ class InventoryRecord(models.Model):
             'pk': self.pk, 'product': self.product.label})
 
 
-class ParStockRecord(models.Model):
+class ParStockRecord(StockMovement):
     amount = models.IntegerField()
     date = models.DateField(default=timezone.now)
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'date'], name='ps_product_date_idx'),
+        ]
+
     def __str__(self):
         return f'{self.amount} {self.product.name} on {self.date}'
 
@@ -84,3 +141,99 @@ class ParStockRecord(models.Model):
         return reverse('inventory:par_stock_record_detail', kwargs={
             'pk': self.pk, 'product': self.product.label})
 
+
+class ProductStockBalance(models.Model):
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, related_name='stock_balance')
+    purchase_orders_total = models.FloatField(default=0)
+    customer_orders_total = models.IntegerField(default=0)
+    purchase_order_count = models.IntegerField(default=0)
+    customer_order_count = models.IntegerField(default=0)
+    recent_inventory = models.IntegerField(default=0)
+    recent_par_stock = models.IntegerField(default=0)
+    #incremented with every change to the row, used for API ETags
+    version = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return f'{self.product.name} balance: {self.available}'
+
+    @property
+    def available(self):
+        return self.recent_inventory + self.purchase_orders_total - self.customer_orders_total
+
+    @property
+    def stock_error(self):
+        return self.available - self.recent_par_stock
+
+
+class StockSnapshot(models.Model):
+    #closing stock figures for a product at the end of a day or week
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='stock_snapshots')
+    date = models.DateField()
+    purchase_orders_total = models.FloatField(default=0)
+    customer_orders_total = models.IntegerField(default=0)
+    recent_inventory = models.IntegerField(default=0)
+    recent_par_stock = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product', 'date'], name='unique_product_snapshot_date'),
+        ]
+
+    def __str__(self):
+        return f'{self.product.name} on {self.date}: {self.available}'
+
+    @property
+    def available(self):
+        return self.recent_inventory + self.purchase_orders_total - self.customer_orders_total
+
+    @property
+    def stock_error(self):
+        return self.available - self.recent_par_stock
+
+
+class UserActivity(models.Model):
+    #latest order dates per user, kept current by signals
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, related_name='inventory_activity')
+    latest_customer_order_date = models.DateField(null=True)
+    latest_purchase_order_date = models.DateField(null=True)
+
+    def __str__(self):
+        return f'{self.user.username} activity: {self.latest_date}'
+
+    @property
+    def latest_date(self):
+        dates = [day for day in [
+            self.latest_customer_order_date, self.latest_purchase_order_date] if day]
+        return max(dates) if dates else None
+
+
+class SearchToken(models.Model):
+    #one row per word of an order number or a customer or product name, plus
+    #the words run together, kept current by signals (see search.py)
+    CUSTOMER_ORDER = 'co'
+    PURCHASE_ORDER = 'po'
+    CUSTOMER = 'cu'
+    PRODUCT = 'pr'
+    KINDS = [
+        (CUSTOMER_ORDER, 'Customer Order'),
+        (PURCHASE_ORDER, 'Purchase Order'),
+        (CUSTOMER, 'Customer'),
+        (PRODUCT, 'Product'),
+    ]
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=2, choices=KINDS)
+    object_id = models.BigIntegerField()
+    token = models.CharField(max_length=50)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'token'], name='search_user_token_idx'),
+            models.Index(fields=['kind', 'object_id', 'token'], name='search_object_token_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}: {self.token}'
@@ -0,0 +1,49 @@
+from collections import defaultdict
+from .models import PurchaseOrder
+from .balances import apply_deltas
+from .snapshots import invalidate_snapshots
+from .activity import record_order_date, forget_order_date
+from .page_cache import bump_version
+
+# Everything that follows from orders being written or removed: stock balance
+# deltas, stale snapshots, the owners' latest order dates and the page cache
+# versions. The post_save/post_delete receivers pass one order (and the stored
+# version of an edited one), the CSV upload passes every order of a batch, so
+# both go through record_order_changes and the effects are summed per product.
+
+
+def order_deltas(order, sign):
+    if isinstance(order, PurchaseOrder):
+        return {'purchase_orders_total': sign * order.total, 'purchase_order_count': sign}
+    return {'customer_orders_total': sign * order.quantity, 'customer_order_count': sign}
+
+
+def record_order_changes(model, added=(), removed=()):
+    #`removed` are orders as they were before an edit or delete, `added` the
+    #orders as they are now; all of one model
+    deltas = defaultdict(lambda: defaultdict(int))
+    earliest = {}
+    latest = {}
+    for sign, orders in [(-1, removed), (1, added)]:
+        for order in orders:
+            for field, delta in order_deltas(order, sign).items():
+                deltas[order.product_id][field] += delta
+            earliest[order.product_id] = min(earliest.get(order.product_id, order.date), order.date)
+    for order in added:
+        latest[order.user_id] = max(latest.get(order.user_id, order.date), order.date)
+
+    for product_id, product_deltas in deltas.items():
+        apply_deltas(product_id, **product_deltas)
+        invalidate_snapshots(product_id, earliest[product_id])
+    #only a removed order dated on its owner's latest day can move it back
+    kept = {(order.user_id, order.date) for order in added}
+    for user_id, day in {(order.user_id, order.date) for order in removed} - kept:
+        forget_order_date(model, user_id, day)
+    for user_id, day in latest.items():
+        record_order_date(model, user_id, day)
+
+    #cached pages showing the products or their owners' dashboards are stale
+    for product_id in deltas:
+        bump_version('product', product_id)
+    for user_id in {order.user_id for order in [*removed, *added]}:
+        bump_version('user', user_id)
@@ -0,0 +1,96 @@
+import hashlib
+import time
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from mysite.db_routing import primary_reads
+
+# Version counters for cached page data. Every user, product and user's
+# customer list has a counter that the signals bump when the rows behind it
+# change. Cached data is stored under a key built from the counters it depends
+# on, so a bump makes the old entry unreachable and it simply expires; nothing
+# has to be found and deleted. Only plain get/set/add/incr calls are used, so
+# any cache backend works, including local memory and file based caches.
+
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _version_key(scope, pk):
+    return f'inventory-version:{scope}:{pk}'
+
+
+def _initial_version():
+    #counters start from the clock, so a counter that was evicted and created
+    #again never lands on a version that still has data cached under it
+    return time.time_ns() // 1000
+
+
+def get_versions(scopes):
+    keys = [_version_key(scope, pk) for scope, pk in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def _increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), None)
+
+
+def bump_version(scope, pk):
+    #applied once the change commits, so a page rebuilt before then is cached
+    #under the old version rather than the new one
+    if pk is not None:
+        key = _version_key(scope, pk)
+        transaction.on_commit(lambda: _increment(key))
+
+
+def page_data_key(name, scopes):
+    versions = get_versions(scopes)
+    return ':'.join([f'inventory-page:{name}'] + [
+        f'{scope}{pk}.{version}' for (scope, pk), version in zip(scopes, versions)])
+
+
+def cached_page_data(name, scopes, build, timeout=PAGE_CACHE_TIMEOUT):
+    key = page_data_key(name, scopes)
+    data = cache.get(key)
+    if data is None:
+        #stored under the current versions, so it must not be read from a
+        #replica that has not caught up with them yet
+        with primary_reads():
+            data = build()
+        cache.set(key, data, timeout)
+    return data
+
+
+async def async_cached_page_data(name, scopes, build, timeout=PAGE_CACHE_TIMEOUT):
+    #cached_page_data for async views, `build` is a coroutine function
+    key = await sync_to_async(page_data_key)(name, scopes)
+    data = await sync_to_async(cache.get)(key)
+    if data is None:
+        #the routing context reaches the pool threads the queries run on
+        with primary_reads():
+            data = await build()
+        await sync_to_async(cache.set)(key, data, timeout)
+    return data
+
+
+def cached_fragments(name, items, key_parts, render, timeout=PAGE_CACHE_TIMEOUT):
+    #rendered HTML for each item, cached under the values it is built from;
+    #one get_many covers the whole list and only the misses are rendered
+    keys = [
+        f'inventory-fragment:{name}:' + hashlib.md5(repr(key_parts(item)).encode()).hexdigest()
+        for item in items]
+    fragments = cache.get_many(keys)
+    missing = {}
+    for key, item in zip(keys, items):
+        if key not in fragments:
+            missing[key] = fragments[key] = render(item)
+    if missing:
+        cache.set_many(missing, timeout)
+    return [fragments[key] for key in keys]
@@ -0,0 +1,75 @@
+import hashlib
+from datetime import datetime
+from django.core.cache import cache
+from django.db.models import Q
+
+# Cursor pagination for date ordered lists. Rows are ordered by (-date, -pk)
+# and each page starts strictly after the last row of the previous one, so
+# the database seeks straight to the page through the (owner, date) indexes
+# instead of counting past every earlier row like OFFSET does.
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def encode_cursor(row):
+    return f"{row.date.strftime('%Y-%m-%d')}.{row.pk}"
+
+
+def decode_cursor(value):
+    try:
+        day, pk = value.split('.')
+        return datetime.strptime(day, '%Y-%m-%d').date(), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+class KeysetPaginationMixin:
+    paginate_by = 50
+    cursor_kwarg = 'after'
+    count_cache_timeout = 300
+
+    def get_cursor(self):
+        return decode_cursor(self.request.GET.get(self.cursor_kwarg))
+
+    def paginate_queryset(self, queryset, page_size):
+        cursor = self.get_cursor()
+        queryset = queryset.order_by('-date', '-pk')
+        if cursor is not None:
+            day, pk = cursor
+            queryset = queryset.filter(Q(date__lt=day) | Q(date=day, pk__lt=pk))
+        rows = list(queryset[:page_size + 1])
+        next_cursor = encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+        page = KeysetPage(rows[:page_size], next_cursor, cursor)
+        return None, page, page.object_list, page.has_other_pages()
+
+    def get_approximate_count(self):
+        #list totals are cached briefly so paging through a long history
+        #does not re-count it on every page
+        queryset = self.object_list
+        sql, params = queryset.order_by().query.sql_with_params()
+        key = 'keyset-count:' + hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.count_cache_timeout)
+        return count
@@ -0,0 +1,112 @@
+import cProfile
+import json
+import marshal
+import os
+import sys
+import threading
+from collections import Counter
+from django.conf import settings
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.core.files.storage import get_storage_class
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+from django.utils.functional import LazyObject
+from django.utils.text import slugify
+
+# On-demand profiling of a single view call. cProfile gives the pstats dump and
+# a sampler thread records the view thread's stack every millisecond for a
+# collapsed-stack file (flamegraph.pl, speedscope). Both files and a small JSON
+# description go to the private PROFILE_STORAGE, so staff can download them
+# through the profile_download view after the instance that made them is gone.
+#
+# Both only see the thread the profile is entered on. Async views are
+# profiled on their event loop thread (see RequestProfilingMiddleware), and
+# the queries they hand to pool threads show up as time spent awaiting.
+
+PROFILE_HEADER = 'HTTP_X_INVENTORY_PROFILE'
+TOKEN_SALT = 'inventory.profiling'
+TOKEN_MAX_AGE = 60 * 60 * 8
+PROFILE_SUFFIXES = ('.prof', '.collapsed', '.json')
+
+
+def make_token(user):
+    return signing.dumps({'user': user.pk}, salt=TOKEN_SALT)
+
+
+def token_user_id(value):
+    try:
+        return signing.loads(value, salt=TOKEN_SALT, max_age=TOKEN_MAX_AGE)['user']
+    except (signing.BadSignature, KeyError, TypeError):
+        return None
+
+
+class ProfileStorage(LazyObject):
+    def _setup(self):
+        self._wrapped = get_storage_class(settings.PROFILE_STORAGE)(**settings.PROFILE_STORAGE_OPTIONS)
+
+
+profile_storage = ProfileStorage()
+
+
+class StackSampler(threading.Thread):
+    def __init__(self, thread_id, interval=0.001):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.counts.most_common())
+
+
+class RequestProfile:
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.sampler = None
+
+    def __enter__(self):
+        #samples whichever thread runs the profiled code
+        self.sampler = StackSampler(threading.get_ident())
+        self.sampler.start()
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.disable()
+        self.sampler.stopped.set()
+        self.sampler.join()
+
+    def save(self, request, view_name, view_args, view_kwargs):
+        tag = slugify(' '.join([view_name.replace(':', ' ')] + [str(value) for value in view_args] + [
+            str(value) for value in view_kwargs.values()]))[:100]
+        #the same bytes cProfile.Profile.dump_stats writes; the storage may
+        #rename the file to keep it unique, so the others follow its name.
+        #The random part keeps names unguessable even if the storage leaks.
+        self.profiler.create_stats()
+        stats_name = profile_storage.save(
+            f'{timezone.now():%Y%m%d-%H%M%S}-{tag}-{get_random_string(12)}.prof',
+            ContentFile(marshal.dumps(self.profiler.stats)))
+        base = stats_name[:-len('.prof')]
+        profile_storage.save(f'{base}.collapsed', ContentFile(self.sampler.collapsed().encode()))
+        profile_storage.save(f'{base}.json', ContentFile(json.dumps({
+            'view': view_name,
+            'args': [str(value) for value in view_args],
+            'kwargs': {key: str(value) for key, value in view_kwargs.items()},
+            'path': request.get_full_path(),
+            'user': request.user.username,
+            'samples': sum(self.sampler.counts.values()),
+        }, indent=2).encode()))
+        return stats_name
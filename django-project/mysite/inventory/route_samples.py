@@ -0,0 +1,158 @@
+from urllib.parse import urlencode
+from django.urls import reverse
+from .models import (
+    Product, Customer, CustomerOrder, PurchaseOrder, InventoryRecord,
+    ParStockRecord)
+
+# Concrete URLs for the routes in inventory/urls.py, filled in with one of the
+# given user's own objects. sample_urls covers the read-only pages, which the
+# query plan check and the route benchmark both use; form_urls adds the GET
+# side of the create, update and delete forms and the exports for the
+# benchmark.
+
+
+def _date(day):
+    return day.strftime('%Y-%m-%d')
+
+
+def sample_urls(user):
+    urls = [('index', reverse('inventory:index'))]
+    product = Product.objects.filter(user=user).order_by('pk').first()
+    customer = Customer.objects.filter(user=user).order_by('pk').first()
+    customer_order = CustomerOrder.objects.filter(user=user).order_by('date', 'pk').first()
+    purchase_order = PurchaseOrder.objects.filter(user=user).order_by('date', 'pk').first()
+
+    urls += [
+        ('all_customer_orders', reverse('inventory:all_customer_orders')),
+        ('all_purchase_orders', reverse('inventory:all_purchase_orders')),
+        ('my_customers', reverse('inventory:my_customers')),
+        ('api_stock', reverse('inventory:api_stock')),
+    ]
+    if customer is not None:
+        urls += [('customer_autocomplete', reverse('inventory:customer_autocomplete') + f'?q={customer.label[:2]}')]
+    if product is not None:
+        urls += [
+            ('product_autocomplete', reverse('inventory:product_autocomplete') + f'?q={product.label[:2]}'),
+            ('search', reverse('inventory:search') + '?' + urlencode({'q': product.name[:2]})),
+        ]
+    if customer_order is not None:
+        start = _date(customer_order.date)
+        urls += [
+            ('customer_order_detail', reverse('inventory:customer_order_detail', args=[customer_order.pk])),
+            ('date_filter_customer_orders', reverse('inventory:date_filter_customer_orders', args=[start])),
+            ('date_range_filter_customer_orders', reverse(
+                'inventory:date_range_filter_customer_orders', args=[start, start])),
+            #several words, matched per candidate on the object index
+            ('search words', reverse('inventory:search') + '?' + urlencode(
+                {'q': f'{customer_order.order_number[:4]} 1'})),
+        ]
+    if purchase_order is not None:
+        start = _date(purchase_order.date)
+        urls += [
+            ('purchase_order_detail', reverse('inventory:purchase_order_detail', args=[purchase_order.pk])),
+            ('date_filter_purchase_orders', reverse('inventory:date_filter_purchase_orders', args=[start])),
+            ('date_range_filter_purchase_orders', reverse(
+                'inventory:date_range_filter_purchase_orders', args=[start, start])),
+        ]
+    if customer is not None:
+        urls += [
+            ('customer_detail', reverse('inventory:customer_detail', args=[customer.pk])),
+        ]
+        if CustomerOrder.objects.filter(customer=customer).exists():
+            urls += [
+                ('customer_customer_orders', reverse('inventory:customer_customer_orders', args=[customer.label])),
+            ]
+    if product is not None:
+        label = product.label
+        urls += [
+            ('product_detail', reverse('inventory:product_detail', args=[label])),
+            ('product_orders', reverse('inventory:product_orders', args=[label])),
+            ('product_customer_orders', reverse('inventory:product_customer_orders', args=[label])),
+            ('product_purchase_orders', reverse('inventory:product_purchase_orders', args=[label])),
+            ('product_inventory_records', reverse('inventory:product_inventory_records', args=[label])),
+            ('product_par_stock_records', reverse('inventory:product_par_stock_records', args=[label])),
+            ('api_product_stock', reverse('inventory:api_product_stock', args=[label])),
+        ]
+        first_order = CustomerOrder.objects.filter(product=product).order_by('date', 'pk').first()
+        if first_order is not None:
+            start = _date(first_order.date)
+            urls += [
+                ('date_filter_product_customer_orders', reverse(
+                    'inventory:date_filter_product_customer_orders', args=[label, start])),
+                ('date_filter_product_orders', reverse('inventory:date_filter_product_orders', args=[label, start])),
+                ('date_range_filter_product_orders', reverse(
+                    'inventory:date_range_filter_product_orders', args=[label, start, start])),
+            ]
+        inventory_record = InventoryRecord.objects.filter(product=product).first()
+        if inventory_record is not None:
+            urls += [
+                ('inventory_record_detail', reverse(
+                    'inventory:inventory_record_detail', args=[label, inventory_record.pk])),
+            ]
+        par_stock_record = ParStockRecord.objects.filter(product=product).first()
+        if par_stock_record is not None:
+            urls += [
+                ('par_stock_record_detail', reverse(
+                    'inventory:par_stock_record_detail', args=[label, par_stock_record.pk])),
+            ]
+    return urls
+
+
+def form_urls(user):
+    urls = [
+        ('product_create', reverse('inventory:product_create')),
+        ('customer_create', reverse('inventory:customer_create')),
+        ('order_upload', reverse('inventory:order_upload')),
+    ]
+    for kind in ['customer_orders', 'purchase_orders', 'inventory_records', 'par_stock_records']:
+        urls.append((f'export {kind}', reverse('inventory:export', args=[kind, 'csv'])))
+    customer_order = CustomerOrder.objects.filter(user=user).order_by('date', 'pk').first()
+    if customer_order is not None:
+        start = _date(customer_order.date)
+        urls += [
+            ('date_filter_export', reverse('inventory:date_filter_export', args=['customer_orders', start, 'csv'])),
+            ('date_range_filter_export', reverse(
+                'inventory:date_range_filter_export', args=['customer_orders', start, start, 'csv'])),
+            ('customer_order_update', reverse('inventory:customer_order_update', args=[customer_order.pk])),
+            ('customer_order_delete', reverse('inventory:customer_order_delete', args=[customer_order.pk])),
+        ]
+    purchase_order = PurchaseOrder.objects.filter(user=user).order_by('date', 'pk').first()
+    if purchase_order is not None:
+        urls += [
+            ('purchase_order_update', reverse('inventory:purchase_order_update', args=[purchase_order.pk])),
+            ('purchase_order_delete', reverse('inventory:purchase_order_delete', args=[purchase_order.pk])),
+        ]
+    customer = Customer.objects.filter(user=user).order_by('pk').first()
+    if customer is not None:
+        urls += [
+            ('customer_update', reverse('inventory:customer_update', args=[customer.pk])),
+            ('customer_delete', reverse('inventory:customer_delete', args=[customer.pk])),
+        ]
+    product = Product.objects.filter(user=user).order_by('pk').first()
+    if product is not None:
+        label = product.label
+        urls += [
+            ('product_update', reverse('inventory:product_update', args=[label])),
+            ('product_delete', reverse('inventory:product_delete', args=[label])),
+            ('customer_order_create', reverse('inventory:customer_order_create', args=[label])),
+            ('purchase_order_create', reverse('inventory:purchase_order_create', args=[label])),
+            ('inventory_record_create', reverse('inventory:inventory_record_create', args=[label])),
+            ('par_stock_record_create', reverse('inventory:par_stock_record_create', args=[label])),
+        ]
+        inventory_record = InventoryRecord.objects.filter(product=product).first()
+        if inventory_record is not None:
+            urls += [
+                ('inventory_record_update', reverse(
+                    'inventory:inventory_record_update', args=[label, inventory_record.pk])),
+                ('inventory_record_delete', reverse(
+                    'inventory:inventory_record_delete', args=[label, inventory_record.pk])),
+            ]
+        par_stock_record = ParStockRecord.objects.filter(product=product).first()
+        if par_stock_record is not None:
+            urls += [
+                ('par_stock_record_update', reverse(
+                    'inventory:par_stock_record_update', args=[label, par_stock_record.pk])),
+                ('par_stock_record_delete', reverse(
+                    'inventory:par_stock_record_delete', args=[label, par_stock_record.pk])),
+            ]
+    return urls
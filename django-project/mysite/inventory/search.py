@@ -0,0 +1,151 @@
+import re
+from collections import defaultdict
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from .models import Product, Customer, CustomerOrder, PurchaseOrder, SearchToken
+
+# Search across a user's orders, customers and products. Every order number
+# and name is split into lowercase words, and each word plus the words run
+# together is stored as a SearchToken row. A query matches an object when
+# every word of the query is the start of one of its tokens, so 'acme' finds
+# "Acme Supplies", 'sup ac' finds it too and 'co12' finds order CO-12. The
+# first word is a range read on the (user, token) index and the others are
+# checked per candidate on the (kind, object_id, token) index, so the cost
+# follows the number of results asked for, not the number of orders.
+
+SEARCHED = {
+    CustomerOrder: (SearchToken.CUSTOMER_ORDER, 'order_number'),
+    PurchaseOrder: (SearchToken.PURCHASE_ORDER, 'order_number'),
+    Customer: (SearchToken.CUSTOMER, 'name'),
+    Product: (SearchToken.PRODUCT, 'name'),
+}
+KIND_MODELS = {kind: model for model, (kind, field) in SEARCHED.items()}
+KIND_NAMES = dict(SearchToken.KINDS)
+TOKEN_LENGTH = SearchToken._meta.get_field('token').max_length
+WORD = re.compile(r'[^\W_]+')
+
+
+def words(text):
+    return [word[:TOKEN_LENGTH] for word in WORD.findall((text or '').lower())]
+
+
+def tokens(text):
+    found = words(text)
+    result = set(found)
+    if len(found) > 1:
+        result.add(''.join(found)[:TOKEN_LENGTH])
+    return result
+
+
+def _token_rows(model, objects):
+    kind, field = SEARCHED[model]
+    return [
+        SearchToken(user_id=obj.user_id, kind=kind, object_id=obj.pk, token=token)
+        for obj in objects if obj.user_id is not None
+        for token in sorted(tokens(getattr(obj, field)))]
+
+
+def index_objects(model, objects, replace=True, batch_size=1000):
+    #objects must have their primary keys; replace drops their old tokens first
+    objects = list(objects)
+    with transaction.atomic():
+        if replace:
+            SearchToken.objects.filter(
+                kind=SEARCHED[model][0], object_id__in=[obj.pk for obj in objects]).delete()
+        SearchToken.objects.bulk_create(_token_rows(model, objects), batch_size=batch_size)
+
+
+def reindex_object(instance):
+    #rewrites the tokens of one saved object unless they are already right
+    kind, field = SEARCHED[type(instance)]
+    wanted = {
+        (instance.user_id, token) for token in tokens(getattr(instance, field))
+        } if instance.user_id is not None else set()
+    stored = set(SearchToken.objects.filter(
+        kind=kind, object_id=instance.pk).values_list('user_id', 'token'))
+    if stored != wanted:
+        index_objects(type(instance), [instance])
+
+
+def remove_object(instance):
+    SearchToken.objects.filter(kind=SEARCHED[type(instance)][0], object_id=instance.pk).delete()
+
+
+def index_bulk_orders(model, orders):
+    #bulk_create only sets primary keys on some databases; without them the
+    #new rows are found again by product and order number
+    if all(order.pk is not None for order in orders):
+        index_objects(model, orders, replace=False)
+        return
+    numbers = defaultdict(set)
+    for order in orders:
+        numbers[order.product_id].add(order.order_number)
+    for product_id, order_numbers in numbers.items():
+        index_objects(model, model.objects.filter(
+            product_id=product_id, order_number__in=order_numbers))
+
+
+def rebuild_search_index(users, batch_size=1000):
+    counts = {}
+    with transaction.atomic():
+        SearchToken.objects.filter(user__in=users).delete()
+        for model, (kind, field) in SEARCHED.items():
+            objects = model.objects.filter(user__in=users).only('pk', 'user', field)
+            rows = []
+            counts[model] = 0
+            for obj in objects.iterator(chunk_size=batch_size):
+                rows += _token_rows(model, [obj])
+                if len(rows) >= batch_size:
+                    counts[model] += len(SearchToken.objects.bulk_create(rows, batch_size=batch_size))
+                    rows = []
+            counts[model] += len(SearchToken.objects.bulk_create(rows, batch_size=batch_size))
+    return counts
+
+
+def prefix_match(field, term):
+    #MySQL reads LIKE 'term%' off the index under its case-insensitive
+    #collations; SQLite only does so for case-sensitive LIKE, so it gets the
+    #range spelled out (the values and terms are both lowercase: search
+    #tokens here, slugified labels for autocomplete)
+    if connection.vendor == 'sqlite':
+        return Q(**{f'{field}__gte': term, f'{field}__lt': term + '\U0010ffff'})
+    return Q(**{f'{field}__istartswith': term})
+
+
+def search(user, query, limit=20):
+    #[(kind name, object)] for the first `limit` objects matching every word
+    terms = words(query)
+    if not terms:
+        return []
+    #the longest word usually narrows the candidates the most
+    first, *rest = sorted(set(terms), key=len, reverse=True)
+    matches = SearchToken.objects.filter(prefix_match('token', first), user=user)
+    for term in rest:
+        matches = matches.filter(Exists(SearchToken.objects.filter(
+            prefix_match('token', term), kind=OuterRef('kind'), object_id=OuterRef('object_id'))))
+    #an object can match on several of its tokens, so read a few extra rows
+    found = []
+    for key in matches.order_by('token').values_list('kind', 'object_id')[:limit * 4]:
+        if key not in found:
+            found.append(key)
+            if len(found) == limit:
+                break
+    return load_results(found)
+
+
+def load_results(found):
+    by_kind = defaultdict(list)
+    for kind, object_id in found:
+        by_kind[kind].append(object_id)
+    objects = {}
+    for kind, object_ids in by_kind.items():
+        model = KIND_MODELS[kind]
+        queryset = model.objects.filter(pk__in=object_ids)
+        if model is CustomerOrder:
+            queryset = queryset.select_related('customer', 'product')
+        elif model is PurchaseOrder:
+            queryset = queryset.select_related('product')
+        objects.update({(kind, obj.pk): obj for obj in queryset})
+    return [
+        (KIND_NAMES[kind], objects[kind, object_id])
+        for kind, object_id in found if (kind, object_id) in objects]
@@ -0,0 +1,132 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.db.models import F
+from django.dispatch import receiver, Signal
+from .models import (
+    Product, Customer, CustomerOrder, PurchaseOrder, InventoryRecord,
+    ParStockRecord, ProductStockBalance)
+from .balances import refresh_latest
+from .snapshots import invalidate_snapshots
+from .movements import record_order_changes
+from .page_cache import bump_version
+from .search import index_bulk_orders, index_objects, reindex_object, remove_object
+
+#sent with the orders written by bulk_create, which skips post_save, so other
+#apps can keep their own figures current (arguments: sender, orders)
+orders_bulk_created = Signal()
+
+RECORD_FIELDS = {
+    InventoryRecord: 'recent_inventory',
+    ParStockRecord: 'recent_par_stock',
+}
+
+
+@receiver(post_save, sender=Product)
+def create_stock_balance(sender, instance, created, **kwargs):
+    #every new product starts with an empty balance, an edited one moves its
+    #balance version on so API clients pick up the new name
+    if created:
+        ProductStockBalance.objects.get_or_create(product=instance)
+    else:
+        ProductStockBalance.objects.filter(product=instance).update(version=F('version') + 1)
+
+
+@receiver(pre_save, sender=CustomerOrder)
+@receiver(pre_save, sender=PurchaseOrder)
+@receiver(pre_save, sender=InventoryRecord)
+@receiver(pre_save, sender=ParStockRecord)
+def remember_previous_movement(sender, instance, **kwargs):
+    #keep the stored version of an edited row so its effect can be reversed
+    instance._previous_movement = None
+    if instance.pk:
+        instance._previous_movement = sender.objects.filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=CustomerOrder)
+@receiver(post_save, sender=PurchaseOrder)
+def record_saved_order(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_movement', None)
+    record_order_changes(sender, added=[instance], removed=[previous] if previous is not None else [])
+
+
+@receiver(post_delete, sender=CustomerOrder)
+@receiver(post_delete, sender=PurchaseOrder)
+def record_deleted_order(sender, instance, **kwargs):
+    record_order_changes(sender, removed=[instance])
+
+
+@receiver(post_save, sender=InventoryRecord)
+@receiver(post_save, sender=ParStockRecord)
+@receiver(post_delete, sender=InventoryRecord)
+@receiver(post_delete, sender=ParStockRecord)
+def refresh_balance_record(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_movement', None)
+    if previous is not None and previous.product_id != instance.product_id:
+        refresh_latest(previous.product_id, sender, RECORD_FIELDS[sender])
+    refresh_latest(instance.product_id, sender, RECORD_FIELDS[sender])
+
+
+@receiver(post_save, sender=InventoryRecord)
+@receiver(post_save, sender=ParStockRecord)
+@receiver(post_delete, sender=InventoryRecord)
+@receiver(post_delete, sender=ParStockRecord)
+def invalidate_stock_snapshots(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_movement', None)
+    if previous is not None:
+        invalidate_snapshots(previous.product_id, previous.date)
+    invalidate_snapshots(instance.product_id, instance.date)
+
+
+@receiver(post_save, sender=InventoryRecord)
+@receiver(post_save, sender=ParStockRecord)
+@receiver(post_delete, sender=InventoryRecord)
+@receiver(post_delete, sender=ParStockRecord)
+def bump_movement_versions(sender, instance, **kwargs):
+    #cached pages showing the product or its owner's dashboard are stale
+    previous = getattr(instance, '_previous_movement', None)
+    if previous is not None and previous.product_id != instance.product_id:
+        bump_version('product', previous.product_id)
+    bump_version('product', instance.product_id)
+    bump_version('user', instance.product.user_id)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def bump_product_versions(sender, instance, **kwargs):
+    bump_version('product', instance.pk)
+    bump_version('user', instance.user_id)
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def bump_customer_versions(sender, instance, **kwargs):
+    bump_version('customers', instance.user_id)
+    bump_version('user', instance.user_id)
+
+
+@receiver(post_save, sender=CustomerOrder)
+@receiver(post_save, sender=PurchaseOrder)
+@receiver(post_save, sender=Customer)
+@receiver(post_save, sender=Product)
+def update_search_tokens(sender, instance, created, **kwargs):
+    if created:
+        index_objects(sender, [instance], replace=False)
+        return
+    #most order edits leave the order number alone
+    previous = getattr(instance, '_previous_movement', None)
+    if previous is not None and (previous.user_id, previous.order_number) == (
+            instance.user_id, instance.order_number):
+        return
+    reindex_object(instance)
+
+
+@receiver(post_delete, sender=CustomerOrder)
+@receiver(post_delete, sender=PurchaseOrder)
+@receiver(post_delete, sender=Customer)
+@receiver(post_delete, sender=Product)
+def remove_search_tokens(sender, instance, **kwargs):
+    remove_object(instance)
+
+
+@receiver(orders_bulk_created)
+def add_bulk_orders_to_search(sender, orders, **kwargs):
+    index_bulk_orders(sender, orders)
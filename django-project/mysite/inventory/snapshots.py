@@ -0,0 +1,118 @@
+from datetime import date, datetime, timedelta
+from django.db.models import F, FloatField, Sum
+from .models import (
+    CustomerOrder, PurchaseOrder, InventoryRecord, ParStockRecord, StockSnapshot)
+
+# Point-in-time stock figures. Closing figures are checkpointed per product
+# at the end of each day or week that had movements; stock_as_of starts from
+# the nearest checkpoint and only replays the movements after it.
+
+PERIODS = ['daily', 'weekly']
+
+
+def as_date(day):
+    #URL converters give datetimes, model fields give dates
+    if isinstance(day, datetime):
+        return day.date()
+    return day
+
+
+def period_end(day, period):
+    if period == 'weekly':
+        return day + timedelta(days=6 - day.weekday())
+    return day
+
+
+def stock_as_of(product, day):
+    day = as_date(day)
+    position = StockSnapshot(product=product, date=day)
+    checkpoint = StockSnapshot.objects.filter(
+        product=product, date__lte=day).order_by('-date').first()
+    movement_range = {'product': product, 'date__lte': day}
+    if checkpoint is not None:
+        position.purchase_orders_total = checkpoint.purchase_orders_total
+        position.customer_orders_total = checkpoint.customer_orders_total
+        position.recent_inventory = checkpoint.recent_inventory
+        position.recent_par_stock = checkpoint.recent_par_stock
+        movement_range['date__gt'] = checkpoint.date
+
+    position.purchase_orders_total += PurchaseOrder.objects.filter(**movement_range).aggregate(
+        total=Sum(F('runs') * F('run_quantity'), output_field=FloatField()))['total'] or 0
+    position.customer_orders_total += CustomerOrder.objects.filter(**movement_range).aggregate(
+        total=Sum('quantity'))['total'] or 0
+    recent_inventory = InventoryRecord.objects.filter(
+        **movement_range).order_by('-date', '-pk').values_list('amount', flat=True).first()
+    if recent_inventory is not None:
+        position.recent_inventory = recent_inventory
+    recent_par_stock = ParStockRecord.objects.filter(
+        **movement_range).order_by('-date', '-pk').values_list('amount', flat=True).first()
+    if recent_par_stock is not None:
+        position.recent_par_stock = recent_par_stock
+    return position
+
+
+def _movements(product, after):
+    #every stock movement after the checkpoint as (date, field, value)
+    #tuples; record amounts replace the running value, order totals add to it
+    movement_range = {'product': product}
+    if after is not None:
+        movement_range['date__gt'] = after
+    movements = []
+    for day, total in PurchaseOrder.objects.filter(**movement_range).values_list(
+            'date').annotate(total=Sum(F('runs') * F('run_quantity'), output_field=FloatField())):
+        movements.append((day, 'purchase_orders_total', total))
+    for day, total in CustomerOrder.objects.filter(**movement_range).values_list(
+            'date').annotate(total=Sum('quantity')):
+        movements.append((day, 'customer_orders_total', total))
+    for model, field in [(InventoryRecord, 'recent_inventory'), (ParStockRecord, 'recent_par_stock')]:
+        for day, amount in model.objects.filter(**movement_range).order_by(
+                'date', 'pk').values_list('date', 'amount'):
+            movements.append((day, field, amount))
+    return sorted(movements, key=lambda movement: movement[0])
+
+
+def build_snapshots(product, period='daily', until=None):
+    #checkpoint every closed period after the product's latest snapshot
+    until = as_date(until) or date.today() - timedelta(days=1)
+    checkpoint = StockSnapshot.objects.filter(product=product).order_by('-date').first()
+    running = StockSnapshot(product=product)
+    after = None
+    if checkpoint is not None:
+        running.purchase_orders_total = checkpoint.purchase_orders_total
+        running.customer_orders_total = checkpoint.customer_orders_total
+        running.recent_inventory = checkpoint.recent_inventory
+        running.recent_par_stock = checkpoint.recent_par_stock
+        after = checkpoint.date
+
+    snapshots = []
+    current_end = None
+    for day, field, value in _movements(product, after):
+        end = period_end(day, period)
+        if end > until:
+            break
+        if current_end is not None and end != current_end:
+            snapshots.append(_checkpoint(running, current_end))
+        current_end = end
+        if field in ('recent_inventory', 'recent_par_stock'):
+            setattr(running, field, value)
+        else:
+            setattr(running, field, getattr(running, field) + value)
+    if current_end is not None:
+        snapshots.append(_checkpoint(running, current_end))
+
+    StockSnapshot.objects.bulk_create(snapshots, batch_size=500)
+    return len(snapshots)
+
+
+def _checkpoint(running, day):
+    return StockSnapshot(
+        product=running.product, date=day,
+        purchase_orders_total=running.purchase_orders_total,
+        customer_orders_total=running.customer_orders_total,
+        recent_inventory=running.recent_inventory,
+        recent_par_stock=running.recent_par_stock)
+
+
+def invalidate_snapshots(product_id, day):
+    #a movement dated `day` changes every closing figure from that day on
+    StockSnapshot.objects.filter(product_id=product_id, date__gte=as_date(day)).delete()
@@ -0,0 +1,37 @@
+// Type-ahead for AutocompleteSelect widgets. Typing asks the endpoint for the
+// rows whose label starts with the text and fills the datalist; picking one
+// puts the row's id in the hidden input the form posts.
+document.querySelectorAll('input[data-autocomplete-url]').forEach(function (input) {
+    var hidden = input.form.elements[input.dataset.autocompleteFor];
+    var options = document.getElementById(input.getAttribute('list'));
+    var ids = {};
+    var timer = null;
+    var latest = 0;
+    ids[input.value] = hidden.value;
+
+    function lookup() {
+        var request = ++latest;
+        fetch(input.dataset.autocompleteUrl + '?q=' + encodeURIComponent(input.value), {credentials: 'same-origin'})
+            .then(function (response) { return response.json(); })
+            .then(function (data) {
+                //an older response arriving late must not replace a newer one
+                if (request !== latest) {
+                    return;
+                }
+                options.innerHTML = '';
+                data.results.forEach(function (row) {
+                    var option = document.createElement('option');
+                    option.value = row.name + ' (' + row.label + ')';
+                    ids[option.value] = row.id;
+                    options.appendChild(option);
+                });
+                hidden.value = ids[input.value] || '';
+            });
+    }
+
+    input.addEventListener('input', function () {
+        hidden.value = ids[input.value] || '';
+        clearTimeout(timer);
+        timer = setTimeout(lookup, 150);
+    });
+});
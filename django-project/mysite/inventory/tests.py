@@ -1,3 +1,1195 @@
-from django.test import TestCase
+import csv
+import json
+import marshal
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta
+from io import StringIO
+from unittest import mock, skipUnless
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from django.utils.functional import empty
+from mysite.db_routing import (
+    REPLICA, STICKY_COOKIE, DatabaseRoutingMiddleware, PrimaryReplicaRouter,
+    RequestRouting, _routing, primary_reads)
+from mysite.staticfiles import IMMUTABLE, cache_control, serve_precompressed
+from .activity import get_user_activity, latest_activity_date
+from .async_views import index, product_orders, product_orders_date_filter
+from .balances import BALANCE_FIELDS, verify_balances
+from .exports import EXPORTS, export_queryset, iter_rows
+from .ledger import with_stock_balances, with_stock_totals
+from .management.commands.check_query_plans import EXPLAINERS
+from .middleware import RequestProfilingMiddleware
+from .models import (
+    Product, Customer, CustomerOrder, PurchaseOrder, InventoryRecord, ParStockRecord,
+    ProductStockBalance, SearchToken, StockSnapshot, UserActivity)
+from .page_cache import (
+    async_cached_page_data, bump_version, cached_fragments, cached_page_data, get_versions,
+    page_data_key)
+from .pagination import decode_cursor, encode_cursor
+from .profiling import make_token, profile_storage, token_user_id
+from .search import rebuild_search_index, search
+from .snapshots import PERIODS, as_date, build_snapshots, stock_as_of
+from .uploads import import_orders
+from .views import latest_amount, product_rows
 
-# Create your tests here.
+STOCK_FIGURES = BALANCE_FIELDS + ['available', 'stock_error']
+
+
+class InventoryFixtures:
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', password='pw')
+        self.other = User.objects.create_user('bob', password='pw')
+        self.widget = Product.objects.create(name='Acme Widget', label='widget', user=self.user)
+        self.gadget = Product.objects.create(name='Gadget', label='gadget', user=self.user)
+        self.customer = Customer.objects.create(name='Acme Supplies', label='acme', user=self.user)
+
+    def customer_order(self, number, quantity, product=None, day=date(2021, 3, 5), customer=None):
+        return CustomerOrder.objects.create(
+            order_number=number, customer=customer or self.customer,
+            product=product or self.widget, date=day, quantity=quantity)
+
+    def purchase_order(self, number, runs, run_quantity, product=None, day=date(2021, 3, 5)):
+        return PurchaseOrder.objects.create(
+            order_number=number, product=product or self.widget, date=day,
+            runs=runs, run_quantity=run_quantity)
+
+    def record(self, model, amount, product=None, day=date(2021, 3, 5)):
+        return model.objects.create(product=product or self.widget, amount=amount, date=day)
+
+
+class InventoryTestCase(InventoryFixtures, TestCase):
+    pass
+
+
+class StockTotalsTests(InventoryTestCase):
+    def test_figures_per_product(self):
+        self.customer_order('CO-1', 5)
+        self.customer_order('CO-2', 7)
+        self.customer_order('CO-3', 4, product=self.gadget)
+        self.purchase_order('PO-1', 2.5, 10)
+        self.record(InventoryRecord, 40, day=date(2021, 3, 1))
+        self.record(InventoryRecord, 30, day=date(2021, 3, 2))
+        self.record(ParStockRecord, 20)
+
+        products = {product.pk: product for product in with_stock_totals(Product.objects.all())}
+        widget, gadget = products[self.widget.pk], products[self.gadget.pk]
+        self.assertEqual(
+            (widget.customer_orders_total, widget.customer_order_count, widget.purchase_orders_total,
+             widget.purchase_order_count, widget.recent_inventory, widget.recent_par_stock),
+            (12, 2, 25, 1, 30, 20))
+        self.assertEqual((widget.available, widget.stock_error), (43, 23))
+        self.assertEqual((gadget.available, gadget.stock_error), (-4, -4))
+
+    def test_latest_record_breaks_date_ties_by_pk(self):
+        self.record(InventoryRecord, 40)
+        self.record(InventoryRecord, 30)
+        self.assertEqual(with_stock_totals(Product.objects.filter(pk=self.widget.pk)).get().recent_inventory, 30)
+
+    def test_dashboard_queries_do_not_grow_with_products(self):
+        self.client.force_login(self.user)
+
+        def dashboard_queries():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/')
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        before = dashboard_queries()
+        for n in range(5):
+            product = Product.objects.create(name=f'Part {n}', label=f'part-{n}', user=self.user)
+            self.customer_order(f'CO-{n}', n + 1, product=product)
+            self.record(InventoryRecord, 10, product=product)
+        self.assertEqual(dashboard_queries(), before)
+
+    def test_dashboard_shows_only_own_products(self):
+        Product.objects.create(name='Not Mine', label='not-mine', user=self.other)
+        self.customer_order('CO-1', 5)
+        self.client.force_login(self.user)
+        response = self.client.get('/')
+        self.assertContains(response, 'Acme Widget')
+        self.assertNotContains(response, 'Not Mine')
+        self.assertEqual(response.context['has_customer_orders'], 1)
+
+
+class StockBalanceTests(InventoryTestCase):
+    def assertBalancesMatchHistory(self):
+        products = Product.objects.filter(user=self.user).order_by('pk')
+        maintained = list(with_stock_balances(products).values('pk', *STOCK_FIGURES))
+        derived = list(with_stock_totals(products).values('pk', *STOCK_FIGURES))
+        self.assertEqual(maintained, derived)
+        self.assertEqual(verify_balances(products), [])
+
+    def test_new_product_has_empty_balance(self):
+        balance = ProductStockBalance.objects.get(product=self.widget)
+        self.assertEqual([getattr(balance, field) for field in BALANCE_FIELDS], [0] * 6)
+        self.assertBalancesMatchHistory()
+
+    def test_orders_and_records_apply_deltas(self):
+        self.customer_order('CO-1', 5)
+        self.customer_order('CO-2', 7, product=self.gadget)
+        self.purchase_order('PO-1', 2.5, 10)
+        self.record(InventoryRecord, 40, day=date(2021, 3, 1))
+        self.record(InventoryRecord, 30, day=date(2021, 3, 2))
+        self.record(ParStockRecord, 50, day=date(2021, 3, 1))
+
+        balance = ProductStockBalance.objects.get(product=self.widget)
+        self.assertEqual(balance.customer_orders_total, 5)
+        self.assertEqual(balance.purchase_orders_total, 25)
+        self.assertEqual(balance.recent_inventory, 30)
+        self.assertEqual(balance.available, 50)
+        self.assertEqual(balance.stock_error, 0)
+        self.assertBalancesMatchHistory()
+
+    def test_updates_move_deltas_between_products(self):
+        order = self.customer_order('CO-1', 5)
+        purchase = self.purchase_order('PO-1', 2, 10)
+        record = self.record(InventoryRecord, 40)
+
+        order.quantity = 8
+        order.product = self.gadget
+        order.save()
+        purchase.runs = 3
+        purchase.save()
+        record.product = self.gadget
+        record.save()
+
+        self.assertEqual(ProductStockBalance.objects.get(product=self.widget).customer_order_count, 0)
+        self.assertEqual(ProductStockBalance.objects.get(product=self.gadget).customer_orders_total, 8)
+        self.assertEqual(ProductStockBalance.objects.get(product=self.widget).recent_inventory, 0)
+        self.assertBalancesMatchHistory()
+
+    def test_deletes_reverse_deltas(self):
+        order = self.customer_order('CO-1', 5)
+        self.customer_order('CO-2', 3)
+        purchase = self.purchase_order('PO-1', 2, 10)
+        older = self.record(InventoryRecord, 40, day=date(2021, 3, 1))
+        newer = self.record(InventoryRecord, 10, day=date(2021, 3, 2))
+
+        order.delete()
+        purchase.delete()
+        newer.delete()
+
+        balance = ProductStockBalance.objects.get(product=self.widget)
+        self.assertEqual(balance.customer_orders_total, 3)
+        self.assertEqual(balance.purchase_order_count, 0)
+        self.assertEqual(balance.recent_inventory, older.amount)
+        self.assertBalancesMatchHistory()
+
+    def test_every_change_moves_the_version(self):
+        version = ProductStockBalance.objects.get(product=self.widget).version
+        order = self.customer_order('CO-1', 5)
+        order.delete()
+        self.assertEqual(ProductStockBalance.objects.get(product=self.widget).version, version + 2)
+
+    def test_verify_balances_reports_drift(self):
+        self.customer_order('CO-1', 5)
+        ProductStockBalance.objects.filter(product=self.widget).update(customer_orders_total=9)
+        mismatches = verify_balances(Product.objects.filter(user=self.user))
+        self.assertEqual(
+            [(product.pk, field, actual, expected) for product, field, actual, expected in mismatches],
+            [(self.widget.pk, 'customer_orders_total', 9, 5)])
+
+    def test_verify_balances_reports_missing_rows(self):
+        ProductStockBalance.objects.filter(product=self.gadget).delete()
+        mismatches = verify_balances(Product.objects.filter(user=self.user))
+        self.assertEqual({field for product, field, actual, expected in mismatches}, set(BALANCE_FIELDS))
+        self.assertEqual({product.pk for product, field, actual, expected in mismatches}, {self.gadget.pk})
+
+    def test_rebuild_command_repairs_drift(self):
+        self.customer_order('CO-1', 5)
+        ProductStockBalance.objects.filter(product=self.widget).update(customer_orders_total=9)
+        ProductStockBalance.objects.filter(product=self.gadget).delete()
+        with self.assertRaisesMessage(CommandError, 'stock balance mismatches found'):
+            call_command('rebuild_stock_balances', '--verify', stdout=StringIO())
+        out = StringIO()
+        call_command('rebuild_stock_balances', stdout=out)
+        self.assertIn('1 created, 1 updated', out.getvalue())
+        self.assertBalancesMatchHistory()
+
+
+class StockSnapshotTests(InventoryTestCase):
+    days = [date(2021, 3, day) for day in range(1, 22)]
+
+    def setUp(self):
+        super().setUp()
+        self.customer_order('CO-1', 5, day=date(2021, 3, 2))
+        self.customer_order('CO-2', 3, day=date(2021, 3, 9))
+        self.purchase_order('PO-1', 2, 10, day=date(2021, 3, 2))
+        self.purchase_order('PO-2', 1, 4, day=date(2021, 3, 15))
+        self.record(InventoryRecord, 40, day=date(2021, 3, 1))
+        self.record(InventoryRecord, 35, day=date(2021, 3, 10))
+        self.record(InventoryRecord, 33, day=date(2021, 3, 10))
+        self.record(ParStockRecord, 20, day=date(2021, 3, 3))
+
+    def positions(self):
+        return [
+            (position.purchase_orders_total, position.customer_orders_total,
+             position.recent_inventory, position.recent_par_stock)
+            for position in [stock_as_of(self.widget, day) for day in self.days]]
+
+    def test_checkpoints_match_replaying_history(self):
+        replayed = self.positions()
+        self.assertEqual(replayed[9], (20, 8, 33, 20))
+        for period in PERIODS:
+            with self.subTest(period=period):
+                StockSnapshot.objects.all().delete()
+                self.assertGreater(build_snapshots(self.widget, period, until=date(2021, 3, 20)), 0)
+                self.assertEqual(self.positions(), replayed)
+
+    def test_building_is_incremental(self):
+        build_snapshots(self.widget, until=date(2021, 3, 9))
+        built = StockSnapshot.objects.count()
+        self.assertEqual(build_snapshots(self.widget, until=date(2021, 3, 9)), 0)
+        build_snapshots(self.widget, until=date(2021, 3, 20))
+        self.assertGreater(StockSnapshot.objects.count(), built)
+        self.assertEqual(StockSnapshot.objects.latest('date').date, date(2021, 3, 15))
+
+    def test_movements_drop_later_snapshots(self):
+        replayed = self.positions()
+        build_snapshots(self.widget, until=date(2021, 3, 20))
+        order = self.customer_order('CO-3', 6, day=date(2021, 3, 9))
+        self.assertFalse(StockSnapshot.objects.filter(date__gte=date(2021, 3, 9)).exists())
+        self.assertTrue(StockSnapshot.objects.filter(date__lt=date(2021, 3, 9)).exists())
+        order.delete()
+        self.assertEqual(self.positions(), replayed)
+
+    def test_date_filter_page_shows_stock_as_of_end_date(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse(
+            'inventory:date_range_filter_product_orders', args=['widget', '2021-03-01', '2021-03-10']))
+        self.assertEqual(response.status_code, 200)
+        position = response.context['stock_as_of']
+        self.assertEqual((position.date, position.available), (date(2021, 3, 10), 45))
+        self.assertEqual(response.context['end_date'], date(2021, 3, 10))
+
+    def test_as_date(self):
+        self.assertEqual(as_date(datetime(2021, 3, 5, 12, 30)), date(2021, 3, 5))
+        self.assertEqual(as_date(date(2021, 3, 5)), date(2021, 3, 5))
+
+
+class UserActivityTests(InventoryTestCase):
+    def latest(self):
+        activity = get_user_activity(self.user)
+        return activity.latest_customer_order_date, activity.latest_purchase_order_date
+
+    def test_created_from_own_orders(self):
+        self.customer_order('CO-1', 5, day=date(2021, 3, 5))
+        self.purchase_order('PO-1', 1, 10, day=date(2021, 2, 1))
+        theirs = Product.objects.create(name='Theirs', label='theirs', user=self.other)
+        self.purchase_order('PO-2', 1, 10, product=theirs, day=date(2021, 6, 1))
+        self.assertFalse(UserActivity.objects.filter(user=self.user).exists())
+        self.assertEqual(self.latest(), (date(2021, 3, 5), date(2021, 2, 1)))
+        self.assertEqual(latest_activity_date(self.user), date(2021, 3, 5))
+
+    def test_moved_by_saves_and_deletes(self):
+        get_user_activity(self.user)
+        first = self.customer_order('CO-1', 5, day=date(2021, 3, 5))
+        second = self.customer_order('CO-2', 5, day=date(2021, 3, 9))
+        self.customer_order('CO-3', 5, day=date(2021, 3, 7))
+        self.assertEqual(self.latest()[0], date(2021, 3, 9))
+
+        #backdating the latest order finds the next latest
+        second.date = date(2021, 3, 1)
+        second.save()
+        self.assertEqual(self.latest()[0], date(2021, 3, 7))
+        CustomerOrder.objects.get(order_number='CO-3').delete()
+        self.assertEqual(self.latest()[0], date(2021, 3, 5))
+        first.delete()
+        second.delete()
+        self.assertEqual(self.latest()[0], None)
+
+    def test_no_orders_defaults_to_today(self):
+        self.assertEqual(latest_activity_date(self.user), date.today())
+
+    def test_open_ended_filters_end_at_latest_order(self):
+        self.customer_order('CO-1', 5, day=date(2021, 3, 5))
+        self.purchase_order('PO-1', 1, 10, day=date(2021, 3, 20))
+        self.client.force_login(self.user)
+        response = self.client.get(reverse(
+            'inventory:date_filter_product_orders', args=['widget', '2021-03-01']))
+        self.assertEqual(response.context['end_date'], date(2021, 3, 20))
+        self.assertTrue(response.context['end_date_unset'])
+        with self.assertNumQueries(1):
+            latest_activity_date(self.user)
+
+
+class QueryPlanTests(TestCase):
+    def test_seeded_pages_use_indexes(self):
+        call_command(
+            'seed_inventory', users=2, products=4, customers=3, orders=15, records=3,
+            prefix='plans', stdout=StringIO())
+        out = StringIO()
+        call_command('check_query_plans', user='plans-0', stdout=out)
+        self.assertIn('All inventory page queries use indexes', out.getvalue())
+
+    @skipUnless(connection.vendor in EXPLAINERS, 'query plans are only read on SQLite and MySQL')
+    def test_scans_and_sorts_are_reported(self):
+        explain = EXPLAINERS[connection.vendor]
+        orders = 'SELECT id FROM inventory_customerorder WHERE'
+        with connection.cursor() as cursor:
+            self.assertEqual(explain(cursor, f'{orders} product_id = %s ORDER BY date', [1]), [])
+            self.assertTrue(explain(cursor, f'{orders} quantity = %s', [1]))
+            self.assertTrue(explain(cursor, f'{orders} product_id = %s ORDER BY quantity', [1]))
+
+
+class KeysetPaginationTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        #many orders on few dates, so pages split inside a run of equal dates
+        CustomerOrder.objects.bulk_create([
+            CustomerOrder(
+                order_number=f'CO-{n}', customer=self.customer, product=self.widget,
+                user=self.user, quantity=1, date=date(2021, 3, 1 + n % 3))
+            for n in range(120)])
+        self.client.force_login(self.user)
+        self.url = reverse('inventory:all_customer_orders')
+
+    def walk(self, url):
+        pages = []
+        params = {}
+        while True:
+            response = self.client.get(url, params)
+            page = response.context['page_obj']
+            pages.append([order.pk for order in page])
+            if not page.has_next():
+                return pages
+            params = {'after': page.next_cursor}
+
+    def test_pages_cover_every_row_once_across_ties(self):
+        pages = self.walk(self.url)
+        self.assertEqual([len(page) for page in pages], [50, 50, 20])
+        expected = list(CustomerOrder.objects.order_by('-date', '-pk').values_list('pk', flat=True))
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_deep_pages_seek_instead_of_offset(self):
+        last = CustomerOrder.objects.order_by('-date', '-pk')[99]
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as first_page:
+            self.client.get(self.url)
+        with CaptureQueriesContext(connection) as deep_page:
+            response = self.client.get(self.url, {'after': encode_cursor(last)})
+        self.assertEqual(len(deep_page), len(first_page))
+        self.assertEqual(len(response.context['page_obj']), 20)
+        self.assertFalse(any('OFFSET' in query['sql'] for query in deep_page.captured_queries))
+        #the total comes from the cached count, not a new COUNT per page
+        self.assertFalse(any('COUNT(' in query['sql'] for query in deep_page.captured_queries))
+        self.assertEqual(response.context['co_count'], 120)
+
+    def test_bad_cursor_shows_first_page(self):
+        for cursor in ['nonsense', '2021-13-01.5', '2021-03-01']:
+            response = self.client.get(self.url, {'after': cursor})
+            self.assertFalse(response.context['page_obj'].has_previous())
+            self.assertEqual(len(response.context['page_obj']), 50)
+        self.assertIsNone(decode_cursor(None))
+
+    def test_product_and_filtered_lists_paginate(self):
+        for url, count in [
+                (reverse('inventory:product_customer_orders', args=['widget']), 120),
+                (reverse('inventory:date_range_filter_customer_orders', args=['2021-03-01', '2021-03-02']), 80)]:
+            with self.subTest(url=url):
+                rows = sum(self.walk(url), [])
+                self.assertEqual(len(set(rows)), count)
+                self.assertEqual(len(rows), count)
+
+
+class OwnershipTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.theirs = Product.objects.create(name='Theirs', label='theirs', user=self.other)
+        self.order = self.customer_order('CO-1', 5)
+        self.record_row = self.record(InventoryRecord, 10)
+        self.client.force_login(self.other)
+
+    def test_other_users_objects_are_forbidden(self):
+        for name, args in [
+                ('product_detail', ['widget']),
+                ('product_orders', ['widget']),
+                ('product_customer_orders', ['widget']),
+                ('customer_order_detail', [self.order.pk]),
+                ('customer_order_update', [self.order.pk]),
+                ('customer_customer_orders', ['acme']),
+                ('inventory_record_detail', ['widget', self.record_row.pk]),
+                ('inventory_record_create', ['widget'])]:
+            with self.subTest(name=name):
+                self.assertEqual(self.client.get(reverse(f'inventory:{name}', args=args)).status_code, 403)
+
+    def test_record_update_checks_record_and_url_product(self):
+        #the URL names the user's own product but the record is someone else's
+        url = reverse('inventory:inventory_record_update', args=['theirs', self.record_row.pk])
+        self.assertEqual(self.client.post(url, {'amount': 1, 'date': '2021-03-05'}).status_code, 403)
+        self.record_row.refresh_from_db()
+        self.assertEqual(self.record_row.amount, 10)
+
+    def test_owned_object_is_read_once(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('inventory:customer_order_detail', args=[self.order.pk]))
+        self.assertEqual(response.status_code, 200)
+        order_reads = [query for query in queries if 'FROM "inventory_customerorder"' in query['sql']]
+        self.assertEqual(len(order_reads), 1)
+
+
+class UploadTests(InventoryTestCase):
+    def upload(self, model, content):
+        if isinstance(content, str):
+            content = content.encode()
+        return import_orders(self.user, model, SimpleUploadedFile('orders.csv', content))
+
+    def test_customer_orders_are_created_with_side_effects(self):
+        self.customer_order('CO-0', 1, day=date(2021, 1, 1))
+        activity = get_user_activity(self.user)
+        created, errors = self.upload(CustomerOrder, (
+            'Order_Number,Product,Customer,Date,Quantity\n'
+            'CO-1,widget,acme,2021-03-05,5\n'
+            'CO-2,gadget,acme,,7\n'
+            'CO-3,widget,acme,2021-04-01,2\n'))
+        self.assertEqual((created, errors), (3, []))
+        self.assertEqual(ProductStockBalance.objects.get(product=self.widget).customer_orders_total, 8)
+        self.assertEqual(verify_balances(Product.objects.filter(user=self.user)), [])
+        activity.refresh_from_db()
+        self.assertEqual(activity.latest_customer_order_date, max(
+            CustomerOrder.objects.values_list('date', flat=True)))
+        #uploaded orders are edited and deleted like any other
+        CustomerOrder.objects.get(order_number='CO-3').delete()
+        self.assertEqual(verify_balances(Product.objects.filter(user=self.user)), [])
+
+    def test_purchase_orders_in_batches(self):
+        rows = ''.join(f'PO-{n},widget,1.5,10,2021-03-{n + 1:02}\n' for n in range(5))
+        created, errors = import_orders(self.user, PurchaseOrder, SimpleUploadedFile(
+            'orders.csv', f'order_number,product,runs,run_quantity,date\n{rows}'.encode()), batch_size=2)
+        self.assertEqual((created, errors), (5, []))
+        self.assertEqual(ProductStockBalance.objects.get(product=self.widget).purchase_orders_total, 75)
+        self.assertEqual(verify_balances(Product.objects.filter(user=self.user)), [])
+
+    def test_any_bad_row_rejects_the_file(self):
+        Product.objects.create(name='Theirs', label='theirs', user=self.other)
+        created, errors = self.upload(CustomerOrder, (
+            'order_number,product,customer,date,quantity\n'
+            'CO-1,widget,acme,2021-03-05,5\n'
+            'CO-2,theirs,acme,2021-03-05,5\n'
+            'CO-3,widget,nobody,2021-03-05,x\n'))
+        self.assertEqual(created, 0)
+        self.assertEqual([line for line, error in errors], [3, 4])
+        self.assertIn('unknown product "theirs"', errors[0][1])
+        self.assertIn('unknown customer "nobody"', errors[1][1])
+        self.assertIn('quantity', errors[1][1])
+        self.assertFalse(CustomerOrder.objects.exists())
+        self.assertEqual(ProductStockBalance.objects.get(product=self.widget).customer_order_count, 0)
+
+    def test_missing_columns(self):
+        created, errors = self.upload(PurchaseOrder, 'order_number,product,date\nPO-1,widget,\n')
+        self.assertEqual((created, errors), (0, [(1, 'missing columns: runs, run_quantity')]))
+
+    def test_file_that_is_not_utf8(self):
+        created, errors = self.upload(CustomerOrder, (
+            'order_number,product,customer,date,quantity\n'
+            'CO-1,widget,acme,2021-03-05,5\n'
+            'CO-2,widget,Caf\xe9,2021-03-05,5\n').encode('latin-1'))
+        self.assertEqual(created, 0)
+        self.assertEqual(errors[0][0], 3)
+        self.assertIn('not UTF-8', errors[0][1])
+        self.assertFalse(CustomerOrder.objects.exists())
+
+    def test_file_that_is_not_csv(self):
+        created, errors = self.upload(CustomerOrder, (
+            'order_number,product,customer,date,quantity\n'
+            'CO-1,widget,acme,2021-03-05,' + 'x' * (csv.field_size_limit() + 1) + '\n'))
+        self.assertEqual(created, 0)
+        self.assertIn('not valid CSV', errors[0][1])
+
+    def test_upload_page(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('inventory:order_upload'), {
+            'order_type': 'customer',
+            'file': SimpleUploadedFile('orders.csv', b'order_number,product,customer,quantity\nCO-1,widget,acme,5\n'),
+        })
+        self.assertRedirects(response, reverse('inventory:all_customer_orders'), fetch_redirect_response=False)
+        self.assertEqual(CustomerOrder.objects.get().user, self.user)
+
+
+class ExportTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        for n in range(6):
+            self.customer_order(f'CO-{n}', n + 1, product=[self.widget, self.gadget][n % 2],
+                                day=date(2021, 3, 1 + n // 3))
+        theirs = Product.objects.create(name='Theirs', label='theirs', user=self.other)
+        self.purchase_order('PO-X', 1, 10, product=theirs)
+        self.client.force_login(self.user)
+
+    def export(self, name, *args, **params):
+        response = self.client.get(reverse(f'inventory:{name}', args=args), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_can_be_uploaded_again(self):
+        content = self.export('export', 'customer_orders', 'csv')
+        rows = list(csv.reader(StringIO(content)))
+        self.assertEqual(rows[0], ['order_number', 'product', 'customer', 'date', 'quantity'])
+        self.assertEqual([row[0] for row in rows[1:]], [f'CO-{n}' for n in range(6)])
+
+        CustomerOrder.objects.all().delete()
+        created, errors = import_orders(
+            self.user, CustomerOrder, SimpleUploadedFile('orders.csv', content.encode()))
+        self.assertEqual((created, errors), (6, []))
+        self.assertEqual(self.export('export', 'customer_orders', 'csv'), content)
+
+    def test_json_and_filters(self):
+        rows = json.loads(self.export(
+            'date_range_filter_export', 'customer_orders', '2021-03-02', '2021-03-02', 'json', product='gadget'))
+        self.assertEqual(rows, [
+            {'order_number': 'CO-3', 'product': 'gadget', 'customer': 'acme', 'date': '2021-03-02', 'quantity': 4},
+            {'order_number': 'CO-5', 'product': 'gadget', 'customer': 'acme', 'date': '2021-03-02', 'quantity': 6}])
+        self.assertEqual(json.loads(self.export('export', 'purchase_orders', 'json')), [])
+
+    def test_only_own_rows_and_known_kinds(self):
+        self.client.force_login(self.other)
+        self.assertIn('PO-X', self.export('export', 'purchase_orders', 'csv'))
+        self.assertNotIn('CO-', self.export('export', 'customer_orders', 'csv'))
+        for args, params in [(['orders', 'csv'], {}), (['customer_orders', 'xml'], {}),
+                             (['customer_orders', 'csv'], {'product': 'widget'})]:
+            self.assertEqual(self.client.get(reverse('inventory:export', args=args), params).status_code, 404)
+
+    def test_rows_are_read_in_keyset_chunks(self):
+        model, owner_lookup, columns = EXPORTS['customer_orders']
+        queryset = export_queryset('customer_orders', self.user)
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(iter_rows(queryset, columns, chunk_size=2))
+        self.assertEqual([row[0] for row in rows], [f'CO-{n}' for n in range(6)])
+        self.assertEqual(len(queries), 4)
+        self.assertFalse(any('OFFSET' in query['sql'] for query in queries.captured_queries))
+
+
+class PageCacheTests(InventoryTestCase):
+    def test_bump_waits_for_commit(self):
+        scopes = [('product', self.widget.pk), ('user', self.user.pk)]
+        before = get_versions(scopes)
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_version('product', self.widget.pk)
+            #a page rebuilt before the commit is still cached under the old version
+            self.assertEqual(get_versions(scopes), before)
+        after = get_versions(scopes)
+        self.assertGreater(after[0], before[0])
+        self.assertEqual(after[1], before[1])
+
+    def test_rolled_back_change_keeps_versions(self):
+        scopes = [('product', self.widget.pk), ('user', self.user.pk)]
+        before = get_versions(scopes)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self.customer_order('CO-1', 5)
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(get_versions(scopes), before)
+
+    def test_order_changes_invalidate_product_and_owner(self):
+        scopes = [('product', self.widget.pk), ('product', self.gadget.pk), ('user', self.user.pk)]
+        before = get_versions(scopes)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.customer_order('CO-1', 5)
+        after = get_versions(scopes)
+        self.assertGreater(after[0], before[0])
+        self.assertEqual(after[1], before[1])
+        self.assertGreater(after[2], before[2])
+
+    def test_evicted_counter_starts_above_old_versions(self):
+        [before] = get_versions([('product', self.widget.pk)])
+        cache.clear()
+        [after] = get_versions([('product', self.widget.pk)])
+        self.assertGreater(after, before)
+
+    def test_dashboard_shows_new_orders(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('inventory:index'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.purchase_order('PO-1', 1, 123)
+        response = self.client.get(reverse('inventory:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '123')
+
+    def test_product_orders_cache_one_page(self):
+        for n in range(70):
+            self.customer_order(f'CO-{n}', 1, day=date(2021, 3, 1 + n % 3))
+        self.purchase_order('PO-1', 1, 10)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('inventory:product_orders', args=['widget']))
+        self.assertEqual(len(response.context['related_customer_orders']), 50)
+        self.assertEqual(len(response.context['related_purchase_orders']), 1)
+        self.assertIsNone(response.context['purchase_orders_after'])
+
+        cached = cache.get(page_data_key(
+            'product_orders', [('product', self.widget.pk), ('customers', self.user.pk)]))
+        self.assertEqual(len(cached['related_customer_orders']), 50)
+
+        #the product's order list carries on where the cached page stops
+        cursor = response.context['customer_orders_after']
+        self.assertContains(response, f'?after={cursor}')
+        rest = self.client.get(
+            reverse('inventory:product_customer_orders', args=['widget']), {'after': cursor})
+        shown = [order.pk for order in response.context['related_customer_orders']]
+        shown += [order.pk for order in rest.context['page_obj']]
+        expected = CustomerOrder.objects.filter(product=self.widget).order_by('-date', '-pk')
+        self.assertEqual(shown, list(expected.values_list('pk', flat=True)))
+
+
+class StockApiTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer_order('CO-1', 5)
+        self.purchase_order('PO-1', 2, 10)
+        Product.objects.create(name='Other', label='other', user=self.other)
+        self.client.force_login(self.user)
+        self.url = reverse('inventory:api_stock')
+
+    def test_figures_for_own_products(self):
+        data = self.client.get(self.url).json()
+        self.assertEqual([product['label'] for product in data['products']], ['gadget', 'widget'])
+        widget = data['products'][1]
+        self.assertEqual((widget['available'], widget['customer_orders_total']), (15, 5))
+
+        data = self.client.get(self.url, {'products': 'widget,other,nope'}).json()
+        self.assertEqual([product['label'] for product in data['products']], ['widget'])
+        self.assertEqual(data['missing'], ['nope', 'other'])
+
+        response = self.client.get(reverse('inventory:api_product_stock', args=['widget']))
+        self.assertEqual(response.json()['purchase_orders_total'], 20)
+        self.assertEqual(self.client.get(reverse('inventory:api_product_stock', args=['other'])).status_code, 404)
+
+    def test_batch_limit(self):
+        labels = ','.join(f'p{n}' for n in range(201))
+        self.assertEqual(self.client.get(self.url, {'products': labels}).status_code, 400)
+
+    def test_unchanged_stock_is_not_modified(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+        with self.assertNumQueries(3):
+            #the session, the user and the versions; no stock figures
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_changes_move_the_etag(self):
+        product_url = reverse('inventory:api_product_stock', args=['gadget'])
+        etag = self.client.get(self.url)['ETag']
+        gadget_etag = self.client.get(product_url)['ETag']
+        self.customer_order('CO-2', 1)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        #other products keep their tags
+        self.assertEqual(self.client.get(product_url, HTTP_IF_NONE_MATCH=gadget_etag).status_code, 304)
+
+
+class AsyncViewTests(InventoryFixtures, TransactionTestCase):
+    #the async views query on pool threads, which only see committed rows;
+    #their GETs read the replica when LOCAL_SQLITE_REPLICA configures one
+    databases = '__all__'
+
+    def setUp(self):
+        super().setUp()
+        self.customer_order('CO-1', 5, day=date(2021, 3, 1))
+        self.customer_order('CO-2', 3, product=self.gadget, day=date(2021, 3, 2))
+        self.purchase_order('PO-1', 2, 10, day=date(2021, 3, 3))
+        self.record(InventoryRecord, 40, day=date(2021, 3, 3))
+        #same date, the later record is the latest
+        self.record(InventoryRecord, 30, day=date(2021, 3, 3))
+        self.client.force_login(self.user)
+
+    def call(self, view, url, user=None):
+        #the sync view's URL resolved, so the async view gets the same arguments
+        request = RequestFactory().get(url)
+        request.user = user or self.user
+        return async_to_sync(view)(request, **resolve(url).kwargs)
+
+    def test_pages_match_the_sync_views(self):
+        for view, name, args in [
+                (index, 'index', []),
+                (product_orders, 'product_orders', ['widget']),
+                (product_orders_date_filter, 'date_filter_product_orders', ['widget', '2021-03-01']),
+                (product_orders_date_filter, 'date_range_filter_product_orders',
+                 ['widget', '2021-03-01', '2021-03-02'])]:
+            with self.subTest(name=name):
+                url = reverse(f'inventory:{name}', args=args)
+                cache.clear()
+                expected = self.client.get(url)
+                cache.clear()
+                response = self.call(view, url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content.decode(), expected.content.decode())
+
+    def test_latest_amount_breaks_date_ties_by_pk(self):
+        response = self.client.get(reverse('inventory:date_filter_product_orders', args=['widget', '2021-03-01']))
+        self.assertEqual(response.context['inventory'], 30)
+        self.assertEqual(latest_amount(InventoryRecord, self.widget), 30)
+
+    def test_other_users_products_are_forbidden(self):
+        with self.assertRaises(PermissionDenied):
+            self.call(product_orders, reverse('inventory:product_orders', args=['widget']), user=self.other)
+        with self.assertRaises(Http404):
+            self.call(product_orders, reverse('inventory:product_orders', args=['nope']))
+
+
+class MetricsTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def test_request_line_counts_queries(self):
+        url = reverse('inventory:product_orders', args=['widget'])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            with self.assertLogs('inventory.requests', 'INFO') as logs:
+                self.client.get(url)
+        [line] = logs.records
+        figures = json.loads(line.getMessage())
+        self.assertEqual(figures['view'], 'inventory:product_orders')
+        self.assertEqual((figures['method'], figures['status']), ('GET', 200))
+        self.assertEqual(figures['queries'], len(queries))
+        self.assertIn('SELECT', figures['slowest_query'])
+
+    def test_metrics_are_staff_only(self):
+        self.client.get(reverse('inventory:index'))
+        self.assertEqual(self.client.get(reverse('inventory:metrics')).status_code, 403)
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        response = self.client.get(reverse('inventory:metrics'))
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn('inventory_responses_total{view="inventory:index",status="200"}', text)
+        self.assertIn('inventory_request_queries_bucket{view="inventory:index",le="+Inf"}', text)
+
+
+class ProfilingTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        profile_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, profile_root)
+        settings = override_settings(PROFILE_STORAGE_OPTIONS={'location': profile_root})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        profile_storage._wrapped = empty
+        self.addCleanup(setattr, profile_storage, '_wrapped', empty)
+        self.profile_root = profile_root
+        self.staff = User.objects.create_user('carol', password='pw', is_staff=True)
+        self.url = reverse('inventory:index')
+
+    def test_tokens_are_signed_and_expire(self):
+        token = make_token(self.staff)
+        self.assertEqual(token_user_id(token), self.staff.pk)
+        self.assertIsNone(token_user_id(token[:-1] + ('A' if token[-1] != 'A' else 'B')))
+        self.assertIsNone(token_user_id(signing.dumps({'user': self.staff.pk})))
+        self.assertIsNone(token_user_id('nonsense'))
+        with mock.patch('inventory.profiling.TOKEN_MAX_AGE', -1):
+            self.assertIsNone(token_user_id(token))
+
+    def test_only_staff_are_profiled(self):
+        self.client.force_login(self.user)
+        self.assertNotIn('X-Inventory-Profile', self.client.get(self.url, {'profile': '1'}))
+        #a valid signature still needs an active staff user behind it
+        response = self.client.get(self.url, HTTP_X_INVENTORY_PROFILE=make_token(self.user))
+        self.assertNotIn('X-Inventory-Profile', response)
+        response = self.client.get(self.url, HTTP_X_INVENTORY_PROFILE=make_token(self.staff))
+        self.assertIn('X-Inventory-Profile', response)
+
+        self.client.force_login(self.staff)
+        self.assertNotIn('X-Inventory-Profile', self.client.get(self.url))
+        self.assertIn('X-Inventory-Profile', self.client.get(self.url, {'profile': '1'}))
+
+    def test_profiles_are_private_and_staff_only(self):
+        self.client.force_login(self.staff)
+        download = self.client.get(self.url, {'profile': '1'})['X-Inventory-Profile']
+        name = resolve(download).kwargs['name']
+        self.assertRegex(name, r'^\d{8}-\d{6}-inventory-index-\w{12}\.prof$')
+        self.assertEqual(sorted(os.listdir(self.profile_root)), [
+            name[:-len('.prof')] + suffix for suffix in ['.collapsed', '.json', '.prof']])
+
+        response = self.client.get(download)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment', response['Content-Disposition'])
+        description = json.loads(b''.join(self.client.get(download[:-len('.prof')] + '.json').streaming_content))
+        self.assertEqual((description['view'], description['user']), ('inventory:index', 'carol'))
+        self.assertEqual(self.client.get(reverse('inventory:profile_download', args=['nope.prof'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('inventory:profile_download', args=['db.sqlite3'])).status_code, 404)
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(download).status_code, 403)
+
+    def test_async_views_are_profiled_on_their_thread(self):
+        async def view(request):
+            return HttpResponse(sum(range(1000)))
+
+        request = RequestFactory().get(self.url, {'profile': '1'})
+        request.user = self.staff
+        request.resolver_match = resolve(self.url)
+        response = RequestProfilingMiddleware(None).process_view(request, view, (), {})
+        self.assertEqual(response.content, b'499500')
+        name = resolve(response['X-Inventory-Profile']).kwargs['name']
+        with profile_storage.open(name) as stats:
+            functions = {function for filename, line, function in marshal.loads(stats.read())}
+        self.assertIn('view', functions)
+
+
+class CustomerSummaryTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        today = timezone.localdate()
+        self.beta = Customer.objects.create(name='Beta Stores', label='beta', user=self.user)
+        Customer.objects.create(name='Theirs', label='theirs', user=self.other)
+        self.customer_order('CO-1', 5, day=today)
+        self.customer_order('CO-2', 3, day=today - timedelta(days=200))
+        self.customer_order('CO-3', 10, product=self.gadget, day=today - timedelta(days=10))
+        self.customer_order('CO-4', 1, product=self.gadget, day=today, customer=self.beta)
+        self.client.force_login(self.user)
+
+    def test_list_figures_in_constant_queries(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('inventory:my_customers'))
+        customers = response.context['object_list']
+        self.assertEqual([customer.label for customer in customers], ['acme', 'beta'])
+        acme = customers[0]
+        self.assertEqual(
+            (acme.order_count, acme.quantity_total, acme.recent_order_count, acme.recent_quantity_total),
+            (3, 18, 2, 15))
+        self.assertEqual(acme.last_order_date, timezone.localdate())
+        self.assertEqual(acme.top_products, [('Gadget', 'gadget', 10), ('Acme Widget', 'widget', 8)])
+
+        for n in range(5):
+            Customer.objects.create(name=f'Customer {n}', label=f'c{n}', user=self.user)
+        with self.assertNumQueries(4):
+            self.client.get(reverse('inventory:my_customers'))
+
+    def test_customer_without_orders(self):
+        quiet = Customer.objects.create(name='Quiet', label='quiet', user=self.user)
+        response = self.client.get(reverse('inventory:customer_detail', args=[quiet.pk]))
+        customer = response.context['object']
+        self.assertEqual((customer.order_count, customer.quantity_total, customer.last_order_date), (0, 0, None))
+        self.assertEqual(response.context['top_products'], [])
+
+    def test_detail_figures(self):
+        response = self.client.get(reverse('inventory:customer_detail', args=[self.beta.pk]))
+        self.assertEqual(response.context['object'].recent_quantity_total, 1)
+        self.assertEqual(response.context['top_products'], [('Gadget', 'gadget', 1)])
+        self.assertEqual(response.context['trailing_days'], 90)
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    #the routing decisions only name a database, so no replica is needed
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, routing):
+        token = _routing.set(routing)
+        self.addCleanup(_routing.reset, token)
+        return routing
+
+    def middleware(self, view):
+        middleware = DatabaseRoutingMiddleware(view)
+        middleware.replica = True
+        return middleware
+
+    def test_outside_requests_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Product), 'default')
+        self.assertEqual(self.router.db_for_write(Product), 'default')
+
+    def test_safe_request_reads_replica_until_it_writes(self):
+        routing = self.route(RequestRouting(True))
+        self.assertEqual(self.router.db_for_read(Product), REPLICA)
+        self.assertEqual(self.router.db_for_write(Product), 'default')
+        self.assertTrue(routing.wrote)
+        self.assertEqual(self.router.db_for_read(Product), 'default')
+
+    def test_sessions_read_primary(self):
+        self.route(RequestRouting(True))
+        self.assertEqual(self.router.db_for_read(Session), 'default')
+
+    def test_primary_reads(self):
+        routing = self.route(RequestRouting(True))
+        with primary_reads():
+            self.assertEqual(self.router.db_for_read(Product), 'default')
+        self.assertEqual(self.router.db_for_read(Product), REPLICA)
+        with primary_reads():
+            self.router.db_for_write(Product)
+        self.assertTrue(routing.wrote)
+        self.assertEqual(self.router.db_for_read(Product), 'default')
+
+    def test_cached_page_data_is_built_from_primary(self):
+        self.route(RequestRouting(True))
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        async def build():
+            return self.router.db_for_read(Product)
+
+        self.assertEqual(cached_page_data('test', [], lambda: self.router.db_for_read(Product)), 'default')
+        self.assertEqual(async_to_sync(async_cached_page_data)('async-test', [], build), 'default')
+
+    def test_requests_are_routed_by_method_and_cookie(self):
+        seen = []
+
+        def view(request):
+            seen.append(_routing.get().use_replica)
+            return HttpResponse()
+
+        middleware = self.middleware(view)
+        get = middleware(self.factory.get('/'))
+        post = middleware(self.factory.post('/'))
+        sticky = self.factory.get('/')
+        sticky.COOKIES[STICKY_COOKIE] = post.cookies[STICKY_COOKIE].value
+        middleware(sticky)
+        expired = self.factory.get('/')
+        expired.COOKIES[STICKY_COOKIE] = '0'
+        middleware(expired)
+
+        self.assertEqual(seen, [True, False, False, True])
+        self.assertNotIn(STICKY_COOKIE, get.cookies)
+        self.assertIsNone(_routing.get())
+
+    def test_get_that_writes_sets_sticky_cookie(self):
+        def view(request):
+            self.router.db_for_write(Product)
+            return HttpResponse()
+
+        response = self.middleware(view)(self.factory.get('/'))
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+    def test_streamed_chunks_keep_request_routing(self):
+        def chunks():
+            yield self.router.db_for_read(Product)
+            self.router.db_for_write(Product)
+            yield self.router.db_for_read(Product)
+
+        response = self.middleware(lambda request: StreamingHttpResponse(chunks()))(self.factory.get('/'))
+        self.assertEqual(b''.join(response.streaming_content), f'{REPLICA}default'.encode())
+
+
+@skipUnless(REPLICA in settings.DATABASES, 'no replica configured, see LOCAL_SQLITE_REPLICA')
+class ReplicaReadTests(TransactionTestCase):
+    #the test replica mirrors the default database; TestCase would keep every
+    #read on the primary by wrapping the test in a transaction
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', password='pw')
+        Product.objects.create(name='Acme Widget', label='widget', user=self.user)
+        self.client.force_login(self.user)
+
+    def test_pages_read_replica_until_the_client_writes(self):
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = self.client.get(reverse('inventory:all_customer_orders'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(replica.captured_queries)
+
+        self.client.post(reverse('inventory:order_upload'))
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            self.client.get(reverse('inventory:all_customer_orders'))
+        self.assertEqual(replica.captured_queries, [])
+
+    def test_cached_pages_are_built_from_primary(self):
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = self.client.get(reverse('inventory:index'))
+        self.assertContains(response, 'Acme Widget')
+        self.assertFalse(any('inventory_product' in query['sql'] for query in replica.captured_queries))
+
+
+class StaticFilesTests(SimpleTestCase):
+    def setUp(self):
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root)
+        settings = override_settings(
+            STATIC_ROOT=static_root,
+            STATICFILES_STORAGE='mysite.staticfiles.CompressedManifestStaticFilesStorage')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command('collectstatic', interactive=False, verbosity=0, ignore_patterns=['admin'])
+        self.static_root = static_root
+
+    def test_hashed_names_and_compressed_copies(self):
+        name = staticfiles_storage.stored_name('inventory/base.css')
+        self.assertRegex(name, r'^inventory/base\.[0-9a-f]{12}\.css$')
+        for suffix in ['.gz', '.br']:
+            self.assertTrue(os.path.exists(os.path.join(self.static_root, name + suffix)))
+
+    def test_only_listed_files_may_be_missing_from_the_manifest(self):
+        self.assertEqual(staticfiles_storage.stored_name('images/favicon.ico'), 'images/favicon.ico')
+        with self.assertRaises(ValueError):
+            staticfiles_storage.stored_name('inventory/missing.css')
+
+    def test_only_hashed_names_are_immutable(self):
+        name = staticfiles_storage.stored_name('inventory/base.css')
+        self.assertEqual(cache_control(name), IMMUTABLE)
+        self.assertEqual(cache_control(name + '.gz'), IMMUTABLE)
+        for unhashed in ['staticfiles.json', 'inventory/base.css', 'images/favicon.ico']:
+            self.assertIsNone(cache_control(unhashed))
+
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        response = serve_precompressed(request, name)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE)
+        self.assertIn('Accept-Encoding', response['Vary'])
+        response = serve_precompressed(request, 'staticfiles.json')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertFalse(response.has_header('Cache-Control'))
+
+
+class FragmentCacheTests(InventoryTestCase):
+    def test_only_missing_fragments_are_rendered(self):
+        rendered = []
+
+        def render(item):
+            rendered.append(item)
+            return f'<{item}>'
+
+        items = ['a', 'b', 'c']
+        self.assertEqual(cached_fragments('test', items, lambda item: item, render), ['<a>', '<b>', '<c>'])
+        self.assertEqual(cached_fragments('test', items + ['d'], lambda item: item, render),
+                         ['<a>', '<b>', '<c>', '<d>'])
+        self.assertEqual(rendered, ['a', 'b', 'c', 'd'])
+
+    def test_dashboard_rows_follow_stock_and_names(self):
+        def products():
+            return list(with_stock_balances(Product.objects.filter(user=self.user).order_by('pk')))
+
+        template = mock.Mock(**{'render.side_effect': lambda context: context['product'].name + ';'})
+        with mock.patch('inventory.views.get_template', return_value=template):
+            self.assertEqual(product_rows(products()), 'Acme Widget;Gadget;')
+            product_rows(products())
+            self.assertEqual(template.render.call_count, 2)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.purchase_order('PO-1', 1, 123)
+            Product.objects.filter(pk=self.gadget.pk).update(name='Renamed Gadget')
+            self.assertEqual(product_rows(products()), 'Acme Widget;Renamed Gadget;')
+            self.assertEqual(template.render.call_count, 4)
+
+        cache.clear()
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('inventory:index'))
+        self.assertContains(response, '123')
+        self.assertContains(response, 'Renamed Gadget')
+
+
+class AutocompleteTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        for label in ['widget-b', 'widget-a', 'wicket']:
+            Product.objects.create(name=label.title(), label=label, user=self.user)
+        Product.objects.create(name='Their Widget', label='widget-c', user=self.other)
+        self.client.force_login(self.user)
+
+    def labels(self, **params):
+        response = self.client.get(reverse('inventory:product_autocomplete'), params)
+        self.assertEqual(response.status_code, 200)
+        return [row['label'] for row in response.json()['results']]
+
+    def test_own_prefix_matches_in_label_order(self):
+        self.assertEqual(self.labels(q='widget'), ['widget', 'widget-a', 'widget-b'])
+        self.assertEqual(self.labels(q='Wi'), ['wicket', 'widget', 'widget-a', 'widget-b'])
+        self.assertEqual(self.labels(q='gadget x'), [])
+        self.assertEqual(self.labels(), ['gadget', 'wicket', 'widget', 'widget-a', 'widget-b'])
+
+    def test_limit_is_clamped(self):
+        self.assertEqual(self.labels(q='wi', limit=2), ['wicket', 'widget'])
+        self.assertEqual(self.labels(q='wi', limit=0), ['wicket'])
+        self.assertEqual(len(self.labels(limit=500)), 5)
+        self.assertEqual(len(self.labels(limit='many')), 5)
+
+    def test_anonymous_requests_are_refused(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('inventory:customer_autocomplete')).status_code, 403)
+
+    def test_order_forms_offer_only_own_rows(self):
+        theirs = Customer.objects.create(name='Initech', label='initech', user=self.other)
+        response = self.client.get(reverse('inventory:customer_order_create', args=['widget']))
+        self.assertEqual(list(response.context['form'].fields['customer'].queryset), [self.customer])
+
+        order = self.customer_order('CO-1', 5)
+        response = self.client.post(reverse('inventory:customer_order_update', args=[order.pk]), {
+            'order_number': 'CO-1', 'customer': theirs.pk, 'product': self.widget.pk,
+            'date': '2021-03-05', 'quantity': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('customer', response.context['form'].errors)
+        order.refresh_from_db()
+        self.assertEqual(order.customer, self.customer)
+
+
+class SearchTests(InventoryTestCase):
+    def found(self, query, user=None):
+        return [(kind, str(obj)) for kind, obj in search(user or self.user, query)]
+
+    def upload(self, model, content):
+        return import_orders(self.user, model, SimpleUploadedFile('orders.csv', content))
+
+    def test_word_prefixes_match(self):
+        #objects matching on the same token come back in no particular order
+        self.assertCountEqual(self.found('acme'), [('Customer', 'Acme Supplies'), ('Product', 'Acme Widget')])
+        self.assertEqual(self.found('sup ac'), [('Customer', 'Acme Supplies')])
+        self.assertEqual(self.found('acmewid'), [('Product', 'Acme Widget')])
+        self.assertEqual(self.found('nothing'), [])
+        self.assertEqual(self.found(' -- '), [])
+
+    def test_orders_are_found_by_number(self):
+        order = self.customer_order('CO-12', 5)
+        purchase = self.purchase_order('PO-12', 1, 10)
+        self.assertEqual([obj for kind, obj in search(self.user, 'co12')], [order])
+        self.assertCountEqual([obj for kind, obj in search(self.user, '12')], [order, purchase])
+
+    def test_only_own_objects_are_found(self):
+        self.assertEqual(self.found('acme', self.other), [])
+
+    def test_index_follows_renames_and_deletes(self):
+        order = self.customer_order('CO-12', 5)
+        order.order_number = 'RUSH-7'
+        order.save()
+        self.widget.name = 'Sprocket'
+        self.widget.save()
+        self.assertEqual(self.found('co12'), [])
+        self.assertEqual([obj for kind, obj in search(self.user, 'rush')], [order])
+        self.assertEqual(self.found('acme'), [('Customer', 'Acme Supplies')])
+        order.delete()
+        self.assertEqual(self.found('rush'), [])
+
+    def test_uploaded_orders_are_searchable(self):
+        self.assertEqual(self.upload(CustomerOrder, (
+            b'order_number,product,customer,date,quantity\n'
+            b'CO-3,widget,acme,2021-03-05,5\n')), (1, []))
+        self.assertEqual([obj.order_number for kind, obj in search(self.user, 'co3')], ['CO-3'])
+
+    def test_maintained_index_equals_rebuild(self):
+        self.customer_order('CO-1', 5)
+        order = self.customer_order('CO-2', 5)
+        order.order_number = 'CO-3'
+        order.save()
+        self.upload(PurchaseOrder, b'order_number,product,runs,run_quantity\nPO-9,gadget,1,5\n')
+        maintained = sorted(SearchToken.objects.values_list('user', 'kind', 'object_id', 'token'))
+        rebuild_search_index([self.user])
+        self.assertEqual(sorted(SearchToken.objects.values_list('user', 'kind', 'object_id', 'token')), maintained)
+
+    def test_search_page(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('inventory:search'), {'q': 'acme sup'})
+        self.assertContains(response, 'Acme Supplies')
+        self.assertNotContains(response, 'Acme Widget')
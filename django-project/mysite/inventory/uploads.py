@@ -0,0 +1,124 @@
+import codecs
+import csv
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from .models import Product, Customer, CustomerOrder, PurchaseOrder
+from .movements import record_order_changes
+from .signals import orders_bulk_created
+
+# Bulk loading of order files. The CSV is read a batch of rows at a time, the
+# products and customers a batch refers to are fetched with one query each and
+# the orders are written with bulk_create. bulk_create skips model signals, so
+# each batch goes through record_order_changes, the function the order
+# receivers use, which sums the balance, snapshot, activity and page cache
+# changes per product inside the same transaction as the inserts. Each batch
+# is announced with orders_bulk_created for the reports rollups and search.
+
+ORDER_COLUMNS = {
+    CustomerOrder: ['order_number', 'product', 'customer', 'date', 'quantity'],
+    PurchaseOrder: ['order_number', 'product', 'runs', 'run_quantity', 'date'],
+}
+
+
+class RejectedUpload(Exception):
+    pass
+
+
+def _batches(reader, batch_size):
+    batch = []
+    for row in reader:
+        batch.append((reader.line_num, row))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _labels(batch, column):
+    return {(row.get(column) or '').strip() for line, row in batch}
+
+
+def _build_order(model, row, products, customers):
+    order = model()
+    errors = []
+    for name in ORDER_COLUMNS[model]:
+        value = (row.get(name) or '').strip()
+        if name == 'product':
+            if value in products:
+                order.product = products[value]
+            else:
+                errors.append(f'unknown product "{value}"')
+        elif name == 'customer':
+            if value in customers:
+                order.customer = customers[value]
+            else:
+                errors.append(f'unknown customer "{value}"')
+        elif name == 'date' and not value:
+            order.date = timezone.localdate()
+        else:
+            try:
+                setattr(order, name, model._meta.get_field(name).clean(value, order))
+            except ValidationError as error:
+                errors.append(f'{name}: {" ".join(error.messages)}')
+    if not errors:
+        order.user_id = order.product.user_id
+    return order, errors
+
+
+def _unreadable(reader, error):
+    #a file-level error, reported at the line the reader stopped on
+    if isinstance(error, UnicodeDecodeError):
+        return reader.line_num + 1, 'the file is not UTF-8 text, save it as CSV (UTF-8) and upload it again'
+    return max(reader.line_num, 1), f'the file is not valid CSV: {error}'
+
+
+def import_orders(user, model, upload, batch_size=1000):
+    #returns (orders created, [(line, error)]); nothing is written unless
+    #every row in the file is valid
+    reader = csv.DictReader(codecs.iterdecode(upload, 'utf-8-sig'))
+    try:
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+    except (UnicodeDecodeError, csv.Error) as error:
+        return 0, [_unreadable(reader, error)]
+    required = [name for name in ORDER_COLUMNS[model] if name != 'date']
+    missing = [name for name in required if name not in reader.fieldnames]
+    if missing:
+        return 0, [(1, f'missing columns: {", ".join(missing)}')]
+
+    errors = []
+    created = 0
+    try:
+        with transaction.atomic():
+            for batch in _batches(reader, batch_size):
+                products = {product.label: product for product in Product.objects.filter(
+                    user=user, label__in=_labels(batch, 'product')).only('pk', 'label', 'user_id')}
+                customers = {}
+                if model is CustomerOrder:
+                    customers = {customer.label: customer for customer in Customer.objects.filter(
+                        user=user, label__in=_labels(batch, 'customer')).only('pk', 'label')}
+
+                orders = []
+                for line, row in batch:
+                    order, row_errors = _build_order(model, row, products, customers)
+                    if row_errors:
+                        errors.append((line, '; '.join(row_errors)))
+                    else:
+                        orders.append(order)
+                if errors:
+                    #keep validating so the report covers the whole file
+                    continue
+
+                model.objects.bulk_create(orders, batch_size=batch_size)
+                record_order_changes(model, added=orders)
+                orders_bulk_created.send(sender=model, orders=orders)
+                created += len(orders)
+
+            if errors:
+                raise RejectedUpload
+    except RejectedUpload:
+        return 0, errors
+    except (UnicodeDecodeError, csv.Error) as error:
+        return 0, [_unreadable(reader, error)]
+    return created, errors
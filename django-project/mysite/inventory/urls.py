@@ -1,5 +1,6 @@
+from django.conf import settings
 from django.urls import path, register_converter
-from . import views
+from . import views, async_views
 from inventory.views import (
     ProductCustomerOrderList, ProductPurchaseOrderList, PurchaseOrderList,
     ProductDetail, CustomerCustomerOrderList, PurchaseOrderDetail, 
@@ -12,8 +13,10 @@ from inventory.views import (
     InventoryRecordUpdate, InventoryRecordDelete, ProductParStockRecordList,
     ParStockRecordDetail, ParStockRecordCreate, ParStockRecordUpdate, 
     ParStockRecordDelete, CustomerList, CustomerDetail, CustomerCreate, 
-    CustomerUpdate, CustomerDelete,
+    CustomerUpdate, CustomerDelete, OrderUpload, Export, ProductStockApi,
+    Metrics, ProfileDownload, Autocomplete, Search,
 )
+from .models import Customer, Product
 from datetime import datetime
 
 
@@ -49,6 +52,17 @@ urlpatterns = [
     path('customers/all/', CustomerList.as_view(), name='my_customers'),
     path('customers/<int:pk>/', CustomerDetail.as_view(), name='customer_detail'),
     path('customers/new/', CustomerCreate.as_view(), name='customer_create'),
+    path('orders/upload/', OrderUpload.as_view(), name='order_upload'),
+    path('exports/<slug:kind>.<slug:format>', Export.as_view(), name='export'),
+    path('exports/<slug:kind>/<yyyy:date>.<slug:format>', Export.as_view(), name='date_filter_export'),
+    path('exports/<slug:kind>/<yyyy:date>/<yyyy:end_date>.<slug:format>', Export.as_view(), name='date_range_filter_export'),
+    path('api/stock/', ProductStockApi.as_view(), name='api_stock'),
+    path('api/stock/<slug:product>/', ProductStockApi.as_view(), name='api_product_stock'),
+    path('api/customers/autocomplete/', Autocomplete.as_view(model=Customer), name='customer_autocomplete'),
+    path('api/products/autocomplete/', Autocomplete.as_view(model=Product), name='product_autocomplete'),
+    path('metrics/', Metrics.as_view(), name='metrics'),
+    path('profiles/<str:name>', ProfileDownload.as_view(), name='profile_download'),
+    path('search/', Search.as_view(), name='search'),
     path('customers/<int:pk>/update/', CustomerUpdate.as_view(), name='customer_update'),
     path('customers/<int:pk>/delete/', CustomerDelete.as_view(), name='customer_delete'),
     path('customers/<slug:customer>/customer_orders', CustomerCustomerOrderList.as_view(), name='customer_customer_orders'),
@@ -74,3 +88,12 @@ urlpatterns = [
     path('par_stock_records/<slug:product>/<int:pk>/update', ParStockRecordUpdate.as_view(), name='par_stock_record_update'),
     path('par_stock_records/<slug:product>/<int:pk>/delete', ParStockRecordDelete.as_view(), name='par_stock_record_delete'),
 ]
+
+if settings.INVENTORY_ASYNC_VIEWS:
+    #the heaviest pages run their independent queries concurrently
+    urlpatterns = [
+        path('', async_views.index, name='index'),
+        path('productorders/<slug:product>/', async_views.product_orders, name='product_orders'),
+        path('productorders/<slug:product>/<yyyy:date>/', async_views.product_orders_date_filter, name='date_filter_product_orders'),
+        path('productorders/<slug:product>/<yyyy:date>/<yyyy:end_date>/', async_views.product_orders_date_filter, name='date_range_filter_product_orders'),
+    ] + urlpatterns
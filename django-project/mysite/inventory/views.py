@@ -1,156 +1,197 @@
-from django.shortcuts import render, get_object_or_404, redirect
+from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+from django.http import Http404, StreamingHttpResponse, JsonResponse, HttpResponse, FileResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.utils.decorators import method_decorator
+from django.utils import timezone
 from django.utils.text import slugify
 from django.views.generic import (
-    DetailView, ListView, CreateView, UpdateView, DeleteView)
+    View, DetailView, ListView, CreateView, UpdateView, DeleteView, FormView)
 from .models import (
     CustomerOrder, PurchaseOrder, Product, Customer, 
     InventoryRecord, ParStockRecord)
-from datetime import datetime
-from django.db.models import ProtectedError
+from .ledger import with_stock_balances, with_customer_totals, top_products
+from .snapshots import stock_as_of, as_date
+from .activity import latest_activity_date
+from .pagination import KeysetPaginationMixin, encode_cursor
+from .mixins import (
+    OwnedObjectMixin, ProductFromUrlMixin, CustomerFromUrlMixin, AutocompleteFieldsMixin)
+from .forms import OrderUploadForm
+from .uploads import ORDER_COLUMNS, import_orders
+from .exports import EXPORTS, export_queryset, stream_csv, stream_json
+from .page_cache import cached_page_data, cached_fragments
+from .search import search, prefix_match
+from .metrics import registry
+from .profiling import PROFILE_SUFFIXES, profile_storage
+from datetime import datetime, timedelta
+import hashlib
+from django.db.models import ProtectedError, F, Value
+from django.db.models.functions import Coalesce
 from django.db import IntegrityError
 
+def index_context(product_list, has_customers):
+    return {'product_inventories': product_list,
+        'has_customers': has_customers,
+        'has_customer_orders': sum([item.customer_order_count for item in product_list]),
+        'has_purchase_orders': sum([item.purchase_order_count for item in product_list]),
+        'has_products': len(product_list)}
+
+
+def _index_data(user):
+    return index_context(
+        list(with_stock_balances(Product.objects.filter(user=user))),
+        Customer.objects.filter(user=user).exists())
+
+
+def product_rows(product_list):
+    #dashboard rows are rendered once per product and balance version; a
+    #product's name and label are part of the key since renaming it leaves
+    #the balance alone
+    template = get_template('inventory/product_row.html')
+    return mark_safe(''.join(cached_fragments(
+        'product-row', product_list,
+        lambda product: (product.pk, product.stock_version, product.name, product.label),
+        lambda product: template.render({'product': product}))))
+
+
 @login_required
 def index(request):
-    product_list = Product.objects.filter(user=request.user)
-    has_customers = Customer.objects.filter(user=request.user)
-    has_purchase_orders = 0
-    has_customer_orders = 0
-    has_products = product_list.count()
-    calculated_inventories = []
-    calculated_errors = []
-    recent_inventories = []
-    recent_par_stocks = []
-    rpo_sums = []
-    rco_sums = []
-    for item in product_list:
-        related_customer_orders = CustomerOrder.objects.filter(product=item)
-        has_customer_orders += related_customer_orders.count()
-        rco_sum = sum([customer_order.quantity for customer_order in related_customer_orders])
-        related_purchase_orders = PurchaseOrder.objects.filter(product=item)
-        has_purchase_orders += related_purchase_orders.count()
-        rpo_sum = sum([purchase_order.total for purchase_order in related_purchase_orders])
-        try:
-            recent_inventory = InventoryRecord.objects.filter(product=item).order_by('-date').first().amount
-        except:
-            recent_inventory = 0
-        try:
-            recent_par_stock = ParStockRecord.objects.filter(product=item).order_by('-date').first().amount
-        except:
-            recent_par_stock = 0
-        recent_inventories.append(recent_inventory)
-        recent_par_stocks.append(recent_par_stock)
-        available_product = recent_inventory + rpo_sum - rco_sum
-        calculated_inventories.append(available_product)
-        calculated_errors.append(available_product - recent_par_stock)
-        rpo_sums.append(rpo_sum)
-        rco_sums.append(rco_sum)
-
-    context = {'product_inventories': zip(
-        product_list, calculated_inventories, rpo_sums, 
-        rco_sums, recent_inventories, recent_par_stocks, calculated_errors
-        ), 'has_customers': has_customers,
-        'has_customer_orders': has_customer_orders,
-        'has_purchase_orders': has_purchase_orders,
-        'has_products': has_products}
+    context = cached_page_data(
+        'index', [('user', request.user.pk)], lambda: _index_data(request.user))
+    context['product_rows'] = product_rows(context['product_inventories'])
 
     return render(request, 'inventory/index.html', context)
 
 
-class ProductDetail(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+def related_orders(model, product, limit=None, **filters):
+    orders = model.objects.filter(product=product, **filters).order_by('-date', '-pk')
+    if model is CustomerOrder:
+        orders = orders.select_related('customer')
+    orders = list(orders[:limit] if limit is not None else orders)
+    #every row shares the one product instance, so it is pickled once
+    for order in orders:
+        order.product = product
+    return orders
+
+
+def first_order_page(model, product, page_size=KeysetPaginationMixin.paginate_by):
+    #(orders, cursor of the next page or None); cached product pages hold
+    #one page of each order list however long its history, the product's
+    #paginated order lists carry on from the cursor
+    orders = related_orders(model, product, limit=page_size + 1)
+    if len(orders) > page_size:
+        return orders[:page_size], encode_cursor(orders[page_size - 1])
+    return orders, None
+
+
+def product_orders_data(customer_orders, purchase_orders, has_customers):
+    return {
+        'related_customer_orders': customer_orders[0],
+        'customer_orders_after': customer_orders[1],
+        'related_purchase_orders': purchase_orders[0],
+        'purchase_orders_after': purchase_orders[1],
+        'has_customers': has_customers,
+    }
+
+
+def latest_amount(model, product):
+    record = model.objects.filter(product=product).order_by('-date', '-pk').first()
+    return record.amount if record else 0
+
+
+def date_filter_context(product, start_date, end_date, customer_orders, purchase_orders,
+                        recent_inventory, recent_par_stock, stock_position, has_customers):
+    rco_sum = sum([customer_order.quantity for customer_order in customer_orders])
+    rpo_sum = sum([purchase_order.total for purchase_order in purchase_orders])
+    return {
+        'product': product,
+        'available': recent_inventory + rpo_sum - rco_sum,
+        'customer_orders_total': rco_sum,
+        'purchase_orders_total': rpo_sum,
+        'inventory': recent_inventory,
+        'par_stock': recent_par_stock,
+        'stock_error': recent_inventory - recent_par_stock,
+        'related_customer_orders': customer_orders,
+        'related_purchase_orders': purchase_orders,
+        'co_filter_count': len(customer_orders),
+        'po_filter_count': len(purchase_orders),
+        'start_date': as_date(start_date),
+        'end_date': as_date(end_date),
+        'stock_as_of': stock_position,
+        'has_customers': has_customers,
+        'has_purchase_orders': len(purchase_orders),
+        'has_customer_orders': len(customer_orders),
+    }
+
+
+class ProductDetail(LoginRequiredMixin, OwnedObjectMixin, UserPassesTestMixin, DetailView):
     template_name = 'inventory/product_detail.html'
     model = Product
     query_pk_and_slug = True
     slug_field = 'label'
     slug_url_kwarg = 'product'
 
+    def get_queryset(self):
+        return with_stock_balances(Product.objects.all())
+
     def get_context_data(self, *args, **kwargs):
         context = super().get_context_data(**kwargs)
-        self.product = self.get_object()
-        related_customer_orders = CustomerOrder.objects.filter(product=self.product)
-        rco_sum = sum([customer_order.quantity for customer_order in related_customer_orders])
-        related_purchase_orders = PurchaseOrder.objects.filter(product=self.product)
-        rpo_sum = sum([purchase_order.total for purchase_order in related_purchase_orders])
-        try:
-            recent_inventory = InventoryRecord.objects.filter(product=self.product).order_by('-date').first().amount
-        except:
-            recent_inventory = 0
-        try:
-            recent_par_stock = ParStockRecord.objects.filter(product=self.product).order_by('-date').first().amount
-        except:
-            recent_par_stock = 0
-        calculated_inventory = recent_inventory + rpo_sum - rco_sum
-        stock_error = calculated_inventory - recent_par_stock
+        self.product = self.object
         
         context['product'] = self.product
-        context['available'] = calculated_inventory
-        context['customer_orders'] = rco_sum
-        context['purchase_orders'] = rpo_sum
-        context['recent_inventory'] = recent_inventory
-        context['recent_par_stock'] = recent_par_stock
-        context['stock_error'] = stock_error
+        context['available'] = self.product.available
+        context['customer_orders'] = self.product.customer_orders_total
+        context['purchase_orders'] = self.product.purchase_orders_total
+        context['recent_inventory'] = self.product.recent_inventory
+        context['recent_par_stock'] = self.product.recent_par_stock
+        context['stock_error'] = self.product.stock_error
 
         return context
 
-    def test_func(self):
-        if self.get_object().user == self.request.user:
-            return True
-        else:
-            return False
-
 
-class ProductOrders(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+class ProductOrders(LoginRequiredMixin, OwnedObjectMixin, UserPassesTestMixin, DetailView):
     template_name = 'inventory/product_order_detail.html'
     model = Product
     query_pk_and_slug = True
     slug_field = 'label'
     slug_url_kwarg = 'product'
 
+    def get_queryset(self):
+        return with_stock_balances(Product.objects.all())
+
     def get_context_data(self, *args, **kwargs):
         context = super().get_context_data(**kwargs)
-        self.product = self.get_object()
-        self.related_customer_orders = CustomerOrder.objects.filter(product=self.product).order_by('-date')
-        self.related_purchase_orders = PurchaseOrder.objects.filter(product=self.product).order_by('-date')
-        try:
-            self.recent_inventory_record = InventoryRecord.objects.filter(product=self.product).order_by('-date').first().amount
-        except:
-            self.recent_inventory_record = 0
-        try:
-            self.recent_par_stock_record = ParStockRecord.objects.filter(product=self.product).order_by('-date').first().amount
-        except:
-            self.recent_par_stock_record = 0
-        rco_sum = sum([customer_order.quantity for customer_order in self.related_customer_orders])
-        rpo_sum = sum([purchase_order.total for purchase_order in self.related_purchase_orders])
-        calculated_inventory = self.recent_inventory_record + rpo_sum - rco_sum
-        stock_error = calculated_inventory - self.recent_par_stock_record
+        self.product = self.object
         
         context['product'] = self.product
-        context['available'] = calculated_inventory
-        context['customer_orders_total'] = rco_sum
-        context['purchase_orders_total'] = rpo_sum
-        context['inventory'] = self.recent_inventory_record
-        context['par_stock'] = self.recent_par_stock_record
-        context['stock_error'] = stock_error
-        context['related_customer_orders'] = self.related_customer_orders
-        context['related_purchase_orders'] = self.related_purchase_orders
-        context['has_customers'] = Customer.objects.filter(user=self.request.user).count()
-        context['has_purchase_orders'] = self.related_purchase_orders.count()
-        context['has_customer_orders'] = self.related_customer_orders.count()
+        context['available'] = self.product.available
+        context['customer_orders_total'] = self.product.customer_orders_total
+        context['purchase_orders_total'] = self.product.purchase_orders_total
+        context['inventory'] = self.product.recent_inventory
+        context['par_stock'] = self.product.recent_par_stock
+        context['stock_error'] = self.product.stock_error
+        context.update(cached_page_data(
+            'product_orders',
+            [('product', self.product.pk), ('customers', self.request.user.pk)],
+            self.get_related_orders))
+        context['has_purchase_orders'] = self.product.purchase_order_count
+        context['has_customer_orders'] = self.product.customer_order_count
 
         return context
 
-    def test_func(self):
-        if self.get_object().user == self.request.user:
-            return True
-        else:
-            return False
+    def get_related_orders(self):
+        return product_orders_data(
+            first_order_page(CustomerOrder, self.product),
+            first_order_page(PurchaseOrder, self.product),
+            Customer.objects.filter(user=self.request.user).exists())
 
 
-class ProductOrdersDateFilter(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+class ProductOrdersDateFilter(LoginRequiredMixin, OwnedObjectMixin, UserPassesTestMixin, DetailView):
     template_name = 'inventory/product_order_detail.html'
     model = Product
     slug_field = 'label'
@@ -163,104 +204,61 @@ class ProductOrdersDateFilter(LoginRequiredMixin, UserPassesTestMixin, DetailVie
         try:
             end_date = self.kwargs['end_date']
         except:
-            end_date = max(max([item.date for item in CustomerOrder.objects.all()]), max([item.date for item in PurchaseOrder.objects.all()]))
+            end_date = latest_activity_date(self.request.user)
             context['end_date_unset'] = True
         
         self.product = self.get_object()
-        self.related_customer_orders = CustomerOrder.objects.filter(product=self.product, date__range=[start_date, end_date]).order_by('-date')
-        self.related_purchase_orders = PurchaseOrder.objects.filter(product=self.product, date__range=[start_date, end_date]).order_by('-date')
-        try:
-            self.recent_inventory_record = InventoryRecord.objects.filter(product=self.product).order_by('-date').first().amount
-        except:
-            self.recent_inventory_record = 0
-        try:
-            self.recent_par_stock_record = ParStockRecord.objects.filter(product=self.product).order_by('-date').first().amount
-        except:
-            self.recent_par_stock_record = 0
-        rco_sum = sum([customer_order.quantity for customer_order in self.related_customer_orders])
-        rpo_sum = sum([purchase_order.total for purchase_order in self.related_purchase_orders])
-        calculated_inventory = self.recent_inventory_record + rpo_sum - rco_sum
-        stock_error = self.recent_inventory_record - self.recent_par_stock_record
-
-        context['product'] = self.product
-        context['available'] = calculated_inventory
-        context['customer_orders_total'] = rco_sum
-        context['purchase_orders_total'] = rpo_sum
-        context['inventory'] = self.recent_inventory_record
-        context['par_stock'] = self.recent_par_stock_record
-        context['stock_error'] = stock_error
-        context['related_customer_orders'] = self.related_customer_orders
-        context['related_purchase_orders'] = self.related_purchase_orders
-        context['co_filter_count'] = self.related_customer_orders.count()
-        context['po_filter_count'] = self.related_purchase_orders.count()
-        context['start_date'] = start_date.date()
-        try:
-            context['end_date'] = end_date.date()
-        except:
-            context['end_date'] = end_date
-        context['has_customers'] = Customer.objects.filter(user=self.request.user).count()
-        context['has_purchase_orders'] = self.related_purchase_orders.count()
-        context['has_customer_orders'] = self.related_customer_orders.count()
+        context.update(date_filter_context(
+            self.product, start_date, end_date,
+            related_orders(CustomerOrder, self.product, date__range=[start_date, end_date]),
+            related_orders(PurchaseOrder, self.product, date__range=[start_date, end_date]),
+            latest_amount(InventoryRecord, self.product),
+            latest_amount(ParStockRecord, self.product),
+            stock_as_of(self.product, end_date),
+            Customer.objects.filter(user=self.request.user).exists()))
 
         return context
 
-    def test_func(self):
-        if self.get_object().user == self.request.user:
-            return True
-        else:
-            return False
-
 
-class ProductCustomerOrderList(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class ProductCustomerOrderList(LoginRequiredMixin, ProductFromUrlMixin, UserPassesTestMixin, KeysetPaginationMixin, ListView):
     template_name = 'inventory/product_customer_orders.html'
     
     def get_queryset(self):
-        self.product = get_object_or_404(Product, label=self.kwargs['product'])
-        return CustomerOrder.objects.filter(product=self.product).order_by('-date')
+        self.product = self.get_product()
+        return CustomerOrder.objects.filter(product=self.product).select_related(
+            'customer', 'product').order_by('-date', '-pk')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['product'] = self.product
         return context
 
-    def test_func(self):
-        if Product.objects.get(label=self.kwargs['product']).user == self.request.user:
-            return True
-        else:
-            return False
 
-
-class ProductCustomerOrderDateFilterList(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class ProductCustomerOrderDateFilterList(LoginRequiredMixin, ProductFromUrlMixin, UserPassesTestMixin, KeysetPaginationMixin, ListView):
     template_name = 'inventory/product_customer_orders.html'
-    ordering = ['date']
 
     def get_queryset(self):
         start_date = self.kwargs['date']
         end_date = datetime.now()
-        self.product = Product.objects.get(label=self.kwargs['product'])
-        return CustomerOrder.objects.filter(product=self.product, date__range=[start_date, end_date]).order_by('-date')
+        self.product = self.get_product()
+        return CustomerOrder.objects.filter(
+            product=self.product, date__range=[start_date, end_date]
+            ).select_related('customer', 'product').order_by('-date', '-pk')
 
     def get_context_data(self, **kwargs):
-        co_count = self.get_queryset().count()
         context = super().get_context_data(**kwargs)
         context['product'] = self.product
-        context['co_filter_count'] = co_count
+        context['co_filter_count'] = self.get_approximate_count()
         context['filter_date'] = self.kwargs['date'].date()
         return context
 
-    def test_func(self):
-        if Product.objects.get(label=self.kwargs['product']).user == self.request.user:
-            return True
-        else:
-            return False
 
-
-class ProductPurchaseOrderList(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class ProductPurchaseOrderList(LoginRequiredMixin, ProductFromUrlMixin, UserPassesTestMixin, KeysetPaginationMixin, ListView):
     template_name = 'inventory/product_purchase_orders.html'
     
     def get_queryset(self):
-        self.product = get_object_or_404(Product, label=self.kwargs['product'])
-        return PurchaseOrder.objects.filter(product=self.product).order_by('-date')
+        self.product = self.get_product()
+        return PurchaseOrder.objects.filter(product=self.product).order_by('-date', '-pk')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -268,21 +266,15 @@ class ProductPurchaseOrderList(LoginRequiredMixin, UserPassesTestMixin, ListView
 
         return context
 
-    def test_func(self):
-        if Product.objects.get(label=self.kwargs['product']).user == self.request.user:
-            return True
-        else:
-            return False
-
 
-class CustomerCustomerOrderList(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class CustomerCustomerOrderList(LoginRequiredMixin, CustomerFromUrlMixin, UserPassesTestMixin, KeysetPaginationMixin, ListView):
     template_name = 'inventory/customer_customer_orders.html'
     
     def get_queryset(self):
-        self.customer = get_object_or_404(Customer, label=self.kwargs['customer'])
+        self.customer = self.get_customer()
         return CustomerOrder.objects.filter(
-            customer=self.customer, product__user=self.request.user
-            ).order_by('-date', 'product__name')
+            customer=self.customer, user=self.request.user
+            ).select_related('customer', 'product').order_by('-date', '-pk')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -290,63 +282,39 @@ class CustomerCustomerOrderList(LoginRequiredMixin, UserPassesTestMixin, ListVie
 
         return context
 
-    def test_func(self):
-        try:
-            if self.get_queryset().first().customer.user == self.request.user:
-                return True
-            else:
-                return False
-        except AttributeError:
-            return False
-
-    def handle_no_permission(self):
-        context = {'customer': Customer.objects.get(label=self.kwargs['customer'])}
-        return render(self.request, 'inventory/error_no_customer_customerorders.html', context=context)
+    def render_to_response(self, context, **response_kwargs):
+        if not context['object_list'] and not context['page_obj'].has_previous():
+            context = {'customer': self.customer}
+            return render(self.request, 'inventory/error_no_customer_customerorders.html', context=context)
+        return super().render_to_response(context, **response_kwargs)
 
 
-class PurchaseOrderDetail(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+class PurchaseOrderDetail(LoginRequiredMixin, OwnedObjectMixin, UserPassesTestMixin, DetailView):
     model = PurchaseOrder
     template_name = 'inventory/purchase_order_detail.html'
 
-    def test_func(self):
-        if self.get_object().product.user == self.request.user:
-            return True
-        else:
-            return False
-
 
-class PurchaseOrderList(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class PurchaseOrderList(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = PurchaseOrder
     template_name = 'inventory/purchase_orders.html'
-    ordering = ['date']
 
     def get_queryset(self):
-        return PurchaseOrder.objects.filter(product__user=self.request.user).order_by('-date')
+        return PurchaseOrder.objects.filter(user=self.request.user).select_related(
+            'product').order_by('-date', '-pk')
 
     def get_context_data(self, **kwargs):
-        po_count = self.get_queryset().count()
         context = super().get_context_data(**kwargs)
-        context['po_count'] = po_count
+        context['po_count'] = self.get_approximate_count()
         return context
 
-    def test_func(self):
-        if self.get_queryset().count() == 0:
-            return True
-        elif self.get_queryset().first().product.user == self.request.user:
-            return True
-        else:
-            return False
 
-
-class PurchaseOrderDateFilterList(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class PurchaseOrderDateFilterList(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = PurchaseOrder
     template_name = 'inventory/purchase_orders.html'
-    ordering = ['date']
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        po_count = self.get_queryset().count()
-        context['po_filter_count'] = po_count
+        context['po_filter_count'] = self.get_approximate_count()
         context['start_date'] = self.kwargs['date'].date()
         try:
             context['end_date'] = self.end_date.date()
@@ -360,29 +328,23 @@ class PurchaseOrderDateFilterList(LoginRequiredMixin, UserPassesTestMixin, ListV
         try:
             self.end_date = self.kwargs['end_date']
             self.end_date_set = True
-        except:
-            self.end_date = max([item.date for item in CustomerOrder.objects.all()])
+        except KeyError:
+            if not hasattr(self, 'end_date'):
+                self.end_date = latest_activity_date(self.request.user)
             self.end_date_set = False
         return PurchaseOrder.objects.filter(
-            product__user=self.request.user,
-            date__range=[self.start_date, self.end_date]).order_by('-date')
+            user=self.request.user,
+            date__range=[self.start_date, self.end_date]
+            ).select_related('product').order_by('-date', '-pk')
 
-    def test_func(self):
-        if self.get_queryset().first().product.user == self.request.user:
-            return True
-        else:
-            return False
-        
 
-class CustomerOrderDateFilterList(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class CustomerOrderDateFilterList(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = CustomerOrder
     template_name = 'inventory/customer_orders.html'
-    ordering = ['date']
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        co_count = self.get_queryset().count()
-        context['co_filter_count'] = co_count
+        context['co_filter_count'] = self.get_approximate_count()
         context['start_date'] = self.start_date.date()
         try:
             context['end_date'] = self.end_date.date()
@@ -396,101 +358,57 @@ class CustomerOrderDateFilterList(LoginRequiredMixin, UserPassesTestMixin, ListV
         try:
             self.end_date = self.kwargs['end_date']
             self.end_date_set = True
-        except:
-            self.end_date = max([item.date for item in CustomerOrder.objects.all()])
+        except KeyError:
+            if not hasattr(self, 'end_date'):
+                self.end_date = latest_activity_date(self.request.user)
             self.end_date_set = False
         return CustomerOrder.objects.filter(
-            product__user=self.request.user,
-            date__range=[self.start_date, self.end_date]).order_by('-date', 'customer__name', 'product__name')
-    
-    def test_func(self):
-        if self.get_queryset().first().product.user == self.request.user:
-            return True
-        else:
-            return False
+            user=self.request.user,
+            date__range=[self.start_date, self.end_date]
+            ).select_related('customer', 'product').order_by('-date', '-pk')
 
 
-class CustomerOrderDetail(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+class CustomerOrderDetail(LoginRequiredMixin, OwnedObjectMixin, UserPassesTestMixin, DetailView):
     model = CustomerOrder
     template_name = 'inventory/customer_order_detail.html'
 
-    def test_func(self):
-        if self.get_object().product.user == self.request.user:
-            return True
-        else:
-            return False
-
 
-class CustomerOrderList(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class CustomerOrderList(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = CustomerOrder
     template_name = 'inventory/customer_orders.html'
-    ordering = ['date', 'product']
 
     def get_queryset(self):
-        return CustomerOrder.objects.filter(product__user=self.request.user).order_by('-date', 'customer__name', 'product__name')
+        return CustomerOrder.objects.filter(user=self.request.user).select_related(
+            'customer', 'product').order_by('-date', '-pk')
 
     def get_context_data(self, **kwargs):
-        co_count = self.get_queryset().count()
         context = super().get_context_data(**kwargs)
-        context['co_count'] = co_count
+        context['co_count'] = self.get_approximate_count()
         return context
 
-    def test_func(self):
-        if self.get_queryset().count() == 0:
-            return True
-        elif self.get_queryset().first().product.user == self.request.user:
-            return True
-        else:
-            return False
-
 
-class PurchaseOrderCreate(LoginRequiredMixin, UserPassesTestMixin, CreateView):
+class PurchaseOrderCreate(LoginRequiredMixin, ProductFromUrlMixin, UserPassesTestMixin, CreateView):
     model = PurchaseOrder
     fields = ['order_number', 'runs', 'run_quantity', 'date']
 
     def form_valid(self, form):
-        form.instance.product = Product.objects.get(label=self.kwargs['product'])
+        form.instance.product = self.get_product()
         return super().form_valid(form)
 
-    def test_func(self):
-        product = Product.objects.get(label=self.kwargs['product'])
-        if product.user == self.request.user:
-            return True
-        else:
-            return False
-
 
-class PurchaseOrderUpdate(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class PurchaseOrderUpdate(LoginRequiredMixin, OwnedObjectMixin, UserPassesTestMixin, AutocompleteFieldsMixin, UpdateView):
     model = PurchaseOrder
     fields = ['order_number', 'product', 'runs', 'run_quantity', 'date']
+    autocomplete_fields = {'product': 'inventory:product_autocomplete'}
 
-    def test_func(self):
-        if self.get_object().product.user == self.request.user:
-            return True
-        else:
-            return False
-
-    def get_form(self, form_class=None):
-        if form_class is None:
-            form_class = self.get_form_class()
-        form = super(PurchaseOrderUpdate, self).get_form()
-        form.fields['product'].queryset = Product.objects.filter(user=self.request.user)
-        return form
 
-
-class PurchaseOrderDelete(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+class PurchaseOrderDelete(LoginRequiredMixin, OwnedObjectMixin, UserPassesTestMixin, DeleteView):
     model = PurchaseOrder
     
     def get_success_url(self):
         return reverse_lazy(
         'inventory:product_orders', 
         kwargs={'product': self.get_object().product.label})
-    
-    def test_func(self):
-        if self.get_object().product.user == self.request.user:
-            return True
-        else:
-            return False
 
 
 class ProductCreate(LoginRequiredMixin, CreateView):
@@ -515,7 +433,7 @@ class ProductCreate(LoginRequiredMixin, CreateView):
             return super().form_valid(form)
 
 
-class ProductUpdate(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class ProductUpdate(LoginRequiredMixin, OwnedObjectMixin, UserPassesTestMixin, UpdateView):
     model = Product
     fields = ['name']
     slug_field = 'label'
@@ -525,24 +443,12 @@ class ProductUpdate(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         form.instance.user = self.request.user
         return super().form_valid(form)
 
-    def test_func(self):
-        if self.get_object().user == self.request.user:
-            return True
-        else:
-            return False
-
 
-class ProductDelete(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+class ProductDelete(LoginRequiredMixin, OwnedObjectMixin, UserPassesTestMixin, DeleteView):
     model = Product
     slug_field = 'label'
     slug_url_kwarg = 'product'
 
-    def test_func(self):
-        if self.get_object().user == self.request.user:
-            return True
-        else:
-            return False
-
     def get_success_url(self):
         return reverse_lazy('inventory:index')
 
@@ -555,239 +461,182 @@ class ProductDelete(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
             return render(request, 'inventory/protected_delete_error.html')
 
 
-class CustomerOrderCreate(LoginRequiredMixin, UserPassesTestMixin, CreateView):
+class CustomerOrderCreate(LoginRequiredMixin, ProductFromUrlMixin, UserPassesTestMixin, AutocompleteFieldsMixin, CreateView):
     model = CustomerOrder
     fields = ['order_number', 'customer', 'quantity', 'date']
+    autocomplete_fields = {'customer': 'inventory:customer_autocomplete'}
         
     def form_valid(self, form):
-        form.instance.product = Product.objects.get(label=self.kwargs['product'])
+        form.instance.product = self.get_product()
         return super().form_valid(form)
 
-    def get_form(self, form_class=None):
-        if form_class is None:
-            form_class = self.get_form_class()
-        form = super(CustomerOrderCreate, self).get_form()
-        form.fields['customer'].queryset = Customer.objects.filter(user=self.request.user)
-        return form
-
-    def test_func(self):
-        product = Product.objects.get(label=self.kwargs['product'])
-        if product.user == self.request.user:
-            return True
-        else:
-            return False
 
-
-class CustomerOrderUpdate(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class CustomerOrderUpdate(LoginRequiredMixin, OwnedObjectMixin, UserPassesTestMixin, AutocompleteFieldsMixin, UpdateView):
     model = CustomerOrder
     fields = ['order_number', 'customer', 'product', 'date', 'quantity']
+    autocomplete_fields = {
+        'customer': 'inventory:customer_autocomplete',
+        'product': 'inventory:product_autocomplete',
+    }
 
-    def test_func(self):
-        if self.get_object().product.user == self.request.user:
-            return True
-        else:
-            return False
-
-    def get_form(self, form_class=None):
-        if form_class is None:
-            form_class = self.get_form_class()
-        form = super(CustomerOrderUpdate, self).get_form()
-        form.fields['customer'].queryset = Customer.objects.filter(user=self.request.user)
-        form.fields['product'].queryset = Product.objects.filter(user=self.request.user)
-        return form
 
-
-class CustomerOrderDelete(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+class CustomerOrderDelete(LoginRequiredMixin, OwnedObjectMixin, UserPassesTestMixin, DeleteView):
     model = CustomerOrder
 
     def get_success_url(self):
         return reverse_lazy(
         'inventory:product_orders', 
         kwargs={'product': self.get_object().product.label})
-    
-    def test_func(self):
-        if self.get_object().product.user == self.request.user:
-            return True
-        else:
-            return False
 
 
-class ProductInventoryRecordList(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class ProductInventoryRecordList(LoginRequiredMixin, ProductFromUrlMixin, UserPassesTestMixin, KeysetPaginationMixin, ListView):
     template_name = 'inventory/product_inventory_records.html'
     
     def get_queryset(self):
-        self.product = get_object_or_404(Product, label=self.kwargs['product'])
-        return InventoryRecord.objects.filter(product=self.product).order_by('-date')
+        self.product = self.get_product()
+        return InventoryRecord.objects.filter(product=self.product).order_by('-date', '-pk')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['product'] = self.product
         return context
 
-    def test_func(self):
-        if Product.objects.get(label=self.kwargs['product']).user == self.request.user:
-            return True
-        else:
-            return False
-
 
-class InventoryRecordDetail(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+class InventoryRecordDetail(LoginRequiredMixin, OwnedObjectMixin, UserPassesTestMixin, DetailView):
     model = InventoryRecord
+    owner_lookup = 'product__user'
     template_name = 'inventory/inventory_record_detail.html'
 
-    def test_func(self):
-        if self.get_object().product.user == self.request.user:
-            return True
-        else:
-            return False
-
 
-class InventoryRecordCreate(LoginRequiredMixin, UserPassesTestMixin, CreateView):
+class InventoryRecordCreate(LoginRequiredMixin, ProductFromUrlMixin, UserPassesTestMixin, CreateView):
     model = InventoryRecord
     fields = ['amount', 'date']
 
     def form_valid(self, form):
-        form.instance.product = Product.objects.get(label=self.kwargs['product'])
+        form.instance.product = self.get_product()
         return super().form_valid(form)
 
-    def test_func(self):
-        if Product.objects.get(label=self.kwargs['product']).user == self.request.user:
-            return True
-        else:
-            return False
-    
 
-class InventoryRecordUpdate(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class InventoryRecordUpdate(LoginRequiredMixin, OwnedObjectMixin, ProductFromUrlMixin, UserPassesTestMixin, UpdateView):
     model = InventoryRecord
+    owner_lookup = 'product__user'
     fields = ['amount', 'date']
 
     def form_valid(self, form):
-        form.instance.product = Product.objects.get(label=self.kwargs['product'])
+        form.instance.product = self.get_product()
         return super().form_valid(form)
 
     def test_func(self):
-        if Product.objects.get(label=self.kwargs['product']).user == self.request.user:
-            return True
-        else:
-            return False
+        return OwnedObjectMixin.test_func(self) and ProductFromUrlMixin.test_func(self)
 
 
-class InventoryRecordDelete(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+class InventoryRecordDelete(LoginRequiredMixin, OwnedObjectMixin, UserPassesTestMixin, DeleteView):
     model = InventoryRecord
+    owner_lookup = 'product__user'
 
     def get_success_url(self):
         return reverse_lazy(
         'inventory:product_inventory_records', 
         kwargs={'product': self.get_object().product.label})
-    
-    def test_func(self):
-        if self.get_object().product.user == self.request.user:
-            return True
-        else:
-            return False
 
 
-class ProductParStockRecordList(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class ProductParStockRecordList(LoginRequiredMixin, ProductFromUrlMixin, UserPassesTestMixin, KeysetPaginationMixin, ListView):
     template_name = 'inventory/product_par_stock_records.html'
     
     def get_queryset(self):
-        self.product = get_object_or_404(Product, label=self.kwargs['product'])
-        return ParStockRecord.objects.filter(product=self.product).order_by('-date')
+        self.product = self.get_product()
+        return ParStockRecord.objects.filter(product=self.product).order_by('-date', '-pk')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['product'] = self.product
         return context
 
-    def test_func(self):
-        if Product.objects.get(label=self.kwargs['product']).user == self.request.user:
-            return True
-        else:
-            return False
 
-
-class ParStockRecordDetail(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+class ParStockRecordDetail(LoginRequiredMixin, OwnedObjectMixin, UserPassesTestMixin, DetailView):
     model = ParStockRecord
+    owner_lookup = 'product__user'
     template_name = 'inventory/par_stock_record_detail.html'
 
-    def test_func(self):
-        if self.get_object().product.user == self.request.user:
-            return True
-        else:
-            return False
-
 
-class ParStockRecordCreate(LoginRequiredMixin, UserPassesTestMixin, CreateView):
+class ParStockRecordCreate(LoginRequiredMixin, ProductFromUrlMixin, UserPassesTestMixin, CreateView):
     model = ParStockRecord
     fields = ['amount', 'date']
 
     def form_valid(self, form):
-        form.instance.product = Product.objects.get(label=self.kwargs['product'])
+        form.instance.product = self.get_product()
         return super().form_valid(form)
 
-    def test_func(self):
-        if Product.objects.get(label=self.kwargs['product']).user == self.request.user:
-            return True
-        else:
-            return False
-    
 
-class ParStockRecordUpdate(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class ParStockRecordUpdate(LoginRequiredMixin, OwnedObjectMixin, ProductFromUrlMixin, UserPassesTestMixin, UpdateView):
     model = ParStockRecord
+    owner_lookup = 'product__user'
     fields = ['amount', 'date']
 
     def form_valid(self, form):
-        form.instance.product = Product.objects.get(label=self.kwargs['product'])
+        form.instance.product = self.get_product()
         return super().form_valid(form)
 
     def test_func(self):
-        if Product.objects.get(label=self.kwargs['product']).user == self.request.user:
-            return True
-        else:
-            return False
+        return OwnedObjectMixin.test_func(self) and ProductFromUrlMixin.test_func(self)
 
 
-class ParStockRecordDelete(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+class ParStockRecordDelete(LoginRequiredMixin, OwnedObjectMixin, UserPassesTestMixin, DeleteView):
     model = ParStockRecord
+    owner_lookup = 'product__user'
 
     def get_success_url(self):
         return reverse_lazy(
         'inventory:product_par_stock_records', 
         kwargs={'product': self.get_object().product.label})
-    
-    def test_func(self):
-        if self.get_object().product.user == self.request.user:
-            return True
-        else:
-            return False
 
 
-class CustomerList(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class CustomerSummaryMixin:
+    #order figures over the customer's lifetime and the trailing window
+    trailing_days = 90
+    top_product_count = 3
+
+    def trailing_since(self):
+        return timezone.localdate() - timedelta(days=self.trailing_days)
+
+    def get_queryset(self):
+        return with_customer_totals(super().get_queryset(), self.trailing_since())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['trailing_days'] = self.trailing_days
+        return context
+
+
+class CustomerList(LoginRequiredMixin, CustomerSummaryMixin, ListView):
+    model = Customer
     template_name = 'inventory/customers.html'
-    
+
     def get_queryset(self):
-        self.customer_list = Customer.objects.filter(user=self.request.user)
-        return self.customer_list
+        return super().get_queryset().filter(user=self.request.user).order_by()
 
-    def test_func(self):
-        if self.get_queryset().count() == 0:
-            return True
-        elif self.get_queryset().first().user == self.request.user:
-            return True
-        else:
-            return False
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        #sorted here, ordering the grouped rows in SQL needs a temporary sort
+        customers = sorted(context['object_list'], key=lambda customer: (customer.name, customer.pk))
+        products = top_products(
+            Customer.objects.filter(user=self.request.user), self.top_product_count)
+        for customer in customers:
+            customer.top_products = products.get(customer.pk, [])
+        context['object_list'] = customers
+        return context
 
 
-class CustomerDetail(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+class CustomerDetail(LoginRequiredMixin, OwnedObjectMixin, UserPassesTestMixin, CustomerSummaryMixin, DetailView):
     model = Customer
     template_name = 'inventory/customer_detail.html'
+    top_product_count = 5
 
-    def test_func(self):
-        customer = self.get_object()
-        if customer.user == self.request.user:
-            return True
-        else:
-            return False
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['top_products'] = top_products(
+            [self.object.pk], self.top_product_count).get(self.object.pk, [])
+        return context
 
 
 class CustomerCreate(LoginRequiredMixin, CreateView):
@@ -802,9 +651,9 @@ class CustomerCreate(LoginRequiredMixin, CreateView):
         except IntegrityError:
             form.instance.label = slugify(f'{form.instance.name}_{self.request.user.id}')
             return super().form_valid(form)
-    
 
-class CustomerUpdate(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+
+class CustomerUpdate(LoginRequiredMixin, OwnedObjectMixin, UserPassesTestMixin, UpdateView):
     model = Customer
     fields = ['name']
 
@@ -812,28 +661,198 @@ class CustomerUpdate(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         form.instance.label = slugify(form.instance.label)
         return super().form_valid(form)
 
-    def test_func(self):
-        if self.get_object().user == self.request.user:
-            return True
-        else:
-            return False
 
-
-class CustomerDelete(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+class CustomerDelete(LoginRequiredMixin, OwnedObjectMixin, UserPassesTestMixin, DeleteView):
     model = Customer
 
     def get_success_url(self):
         return reverse_lazy('inventory:my_customers')
-    
-    def test_func(self):
-        if self.get_object().user == self.request.user:
-            return True
-        else:
-            return False
-        
+            
     def delete(self, request, *args, **kwargs):
         try:
             self.get_object().delete()
             return redirect(self.get_success_url())
         except ProtectedError:
-            return render(request, 'inventory/protected_delete_error.html')
\ No newline at end of file
+            return render(request, 'inventory/protected_delete_error.html')
+
+
+class OrderUpload(LoginRequiredMixin, FormView):
+    form_class = OrderUploadForm
+    template_name = 'inventory/order_upload.html'
+    upload_models = {
+        'customer': CustomerOrder,
+        'purchase': PurchaseOrder,
+    }
+    success_urls = {
+        'customer': 'inventory:all_customer_orders',
+        'purchase': 'inventory:all_purchase_orders',
+    }
+    #only the first errors are shown, the count covers the whole file
+    max_reported_errors = 500
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['customer_columns'] = ', '.join(ORDER_COLUMNS[CustomerOrder])
+        context['purchase_columns'] = ', '.join(ORDER_COLUMNS[PurchaseOrder])
+        return context
+
+    def form_valid(self, form):
+        order_type = form.cleaned_data['order_type']
+        created, errors = import_orders(
+            self.request.user, self.upload_models[order_type], form.cleaned_data['file'])
+        if errors:
+            return self.render_to_response(self.get_context_data(
+                form=form, errors=errors[:self.max_reported_errors], error_count=len(errors)))
+        messages.success(self.request, f'{created} orders uploaded')
+        return redirect(self.success_urls[order_type])
+
+
+class Export(LoginRequiredMixin, View):
+    streams = {
+        'csv': (stream_csv, 'text/csv'),
+        'json': (stream_json, 'application/json'),
+    }
+
+    def get(self, request, *args, **kwargs):
+        kind, export_format = kwargs['kind'], kwargs['format']
+        if kind not in EXPORTS or export_format not in self.streams:
+            raise Http404
+        product = None
+        if request.GET.get('product'):
+            product = get_object_or_404(Product, label=request.GET['product'], user=request.user)
+        start_date = kwargs.get('date')
+        end_date = kwargs.get('end_date')
+        queryset = export_queryset(
+            kind, request.user,
+            start_date=start_date.date() if start_date else None,
+            end_date=end_date.date() if end_date else None,
+            product=product)
+
+        stream, content_type = self.streams[export_format]
+        model, owner_lookup, columns = EXPORTS[kind]
+        response = StreamingHttpResponse(stream(queryset, columns), content_type=content_type)
+        filename = '_'.join([kind] + [day.strftime('%Y-%m-%d') for day in [start_date, end_date] if day])
+        response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+        return response
+
+
+class Autocomplete(LoginRequiredMixin, View):
+    #the user's rows whose label starts with the slugified query, read in
+    #label order off the (user, label) index, for AutocompleteSelect widgets
+    raise_exception = True
+    model = None
+    limit = 10
+    max_limit = 50
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = max(1, min(int(request.GET.get('limit', self.limit)), self.max_limit))
+        except ValueError:
+            limit = self.limit
+        rows = self.model.objects.filter(
+            prefix_match('label', slugify(request.GET.get('q', ''))), user=request.user,
+            ).order_by('label').values('pk', 'name', 'label')[:limit]
+        return JsonResponse({'results': [
+            {'id': row['pk'], 'name': row['name'], 'label': row['label']} for row in rows]})
+
+
+class ProductStockApi(LoginRequiredMixin, View):
+    #read-only stock figures for one product (by URL) or many (?products=a,b)
+    raise_exception = True
+    max_batch = 200
+    stock_fields = [
+        'available', 'purchase_orders_total', 'customer_orders_total',
+        'recent_inventory', 'recent_par_stock', 'stock_error',
+    ]
+
+    def get_labels(self):
+        if 'product' in self.kwargs:
+            return [self.kwargs['product']]
+        labels = self.request.GET.get('products')
+        if labels:
+            return sorted({label.strip() for label in labels.split(',') if label.strip()})
+        return None
+
+    def get_queryset(self, labels):
+        products = Product.objects.filter(user=self.request.user)
+        if labels is not None:
+            products = products.filter(label__in=labels)
+        #sorted in Python, products are few and this keeps the sort out of SQL
+        return products.order_by()
+
+    def get_etag(self, products):
+        #the versions alone decide whether anything changed, so a matching
+        #If-None-Match is answered from this one query
+        versions = sorted(products.values_list(
+            'pk', Coalesce(F('stock_balance__version'), Value(0))))
+        return quote_etag(hashlib.md5(repr(versions).encode()).hexdigest()), versions
+
+    def get(self, request, *args, **kwargs):
+        labels = self.get_labels()
+        if labels is not None and len(labels) > self.max_batch:
+            return JsonResponse({'error': f'at most {self.max_batch} products per request'}, status=400)
+        products = self.get_queryset(labels)
+        etag, versions = self.get_etag(products)
+        if 'product' in kwargs and not versions:
+            raise Http404
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            summaries = sorted(
+                [self.summarize(product) for product in with_stock_balances(products)],
+                key=lambda summary: summary['label'])
+            if 'product' in kwargs:
+                data = summaries[0]
+            else:
+                data = {'products': summaries}
+                if labels is not None:
+                    found = {summary['label'] for summary in summaries}
+                    data['missing'] = [label for label in labels if label not in found]
+            response = JsonResponse(data)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def summarize(self, product):
+        summary = {'label': product.label, 'name': product.name}
+        summary.update({field: getattr(product, field) for field in self.stock_fields})
+        return summary
+
+
+class Metrics(LoginRequiredMixin, UserPassesTestMixin, View):
+    #request metrics of this process in Prometheus text format
+    raise_exception = True
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(registry.prometheus(), content_type='text/plain; version=0.0.4')
+
+
+class ProfileDownload(LoginRequiredMixin, UserPassesTestMixin, View):
+    #files saved by RequestProfilingMiddleware, from the private profile storage
+    raise_exception = True
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        name = kwargs['name']
+        if not name.endswith(PROFILE_SUFFIXES) or not profile_storage.exists(name):
+            raise Http404
+        return FileResponse(profile_storage.open(name), as_attachment=True, filename=name)
+
+
+class Search(LoginRequiredMixin, View):
+    #the user's orders, customers and products matching every word of ?q=
+    template_name = 'inventory/search.html'
+    limit = 50
+
+    def get(self, request, *args, **kwargs):
+        query = request.GET.get('q', '').strip()
+        return render(request, self.template_name, {
+            'query': query,
+            'results': search(request.user, query, self.limit) if query else [],
+            'limit': self.limit,
+        })
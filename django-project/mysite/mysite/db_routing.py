@@ -0,0 +1,126 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Read replica routing. Safe requests (GET, HEAD, OPTIONS) read from the
+# 'replica' database, everything else and every write uses the primary. After
+# a request writes, the client reads from the primary for REPLICA_STICKY_SECONDS
+# so it sees its own changes before they reach the replica. Management
+# commands and other code outside a request always use the primary, and so
+# does anything run under primary_reads().
+
+REPLICA = 'replica'
+STICKY_COOKIE = 'db_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+#a session missing on a lagging replica would log the user out
+PRIMARY_APPS = {'sessions'}
+
+_routing = ContextVar('db_routing', default=None)
+
+
+class RequestRouting:
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+@contextmanager
+def primary_reads():
+    #for reads whose results outlive the request, such as cached page data: a
+    #lagging replica would leave them stale until the next change
+    routing = _routing.get()
+    if routing is None or not routing.use_replica:
+        yield
+        return
+    pinned = RequestRouting(False)
+    token = _routing.set(pinned)
+    try:
+        yield
+    finally:
+        _routing.reset(token)
+        if pinned.wrote:
+            routing.wrote = True
+            routing.use_replica = False
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or not routing.use_replica or model._meta.app_label in PRIMARY_APPS:
+            return DEFAULT_DB_ALIAS
+        #reads inside a transaction must see its writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            #the rest of the request reads what it wrote
+            routing.wrote = True
+            routing.use_replica = False
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        #the replica holds the same rows as the primary
+        return {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA}
+
+
+class DatabaseRoutingMiddleware:
+    #checks persistent connections before each request and, when a replica
+    #is configured, picks the database the request reads from
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.replica = REPLICA in settings.DATABASES
+        self.sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+
+    def __call__(self, request):
+        check_connections()
+        if not self.replica:
+            return self.get_response(request)
+
+        routing = RequestRouting(
+            request.method in SAFE_METHODS and not self.is_sticky(request))
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        if response.streaming:
+            response.streaming_content = self.stream(response.streaming_content, routing)
+        if routing.wrote or request.method not in SAFE_METHODS:
+            response.set_cookie(
+                STICKY_COOKIE, str(time.time() + self.sticky_seconds),
+                max_age=self.sticky_seconds, httponly=True, samesite='Lax')
+        return response
+
+    def is_sticky(self, request):
+        try:
+            return float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def stream(self, content, routing):
+        #streaming bodies (exports) run their queries after the middleware
+        #has returned, so each chunk is produced under the request's routing
+        iterator = iter(content)
+        while True:
+            token = _routing.set(routing)
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                _routing.reset(token)
+            yield chunk
+
+
+def check_connections():
+    #a persistent connection may have been dropped by the server while idle
+    #(MySQL wait_timeout, Cloud SQL maintenance); close it here so the
+    #request opens a fresh one instead of failing on its first query
+    for connection in connections.all():
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
@@ -13,14 +13,23 @@ https://docs.djangoproject.com/en/3.1/ref/settings/
 from pathlib import Path
 import os
 import json
-from google.oauth2 import service_account
-
-with open('private_config.json') as config_file:
-    config = json.load(config_file)
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Local profile: SQLite, files on local disk and no Google credentials, for
+# development and tests. private_config.json is optional with it.
+LOCAL_PROFILE = bool(
+    os.getenv('DJANGO_LOCAL_PROFILE') or os.getenv('TRAMPOLINE_CI') or os.getenv('LOCAL_SQLITE_REPLICA'))
+
+config_path = os.path.join(BASE_DIR, 'private_config.json')
+if LOCAL_PROFILE and not os.path.exists(config_path):
+    config = {'SECRET_KEY': 'local-profile-only-not-secret'}
+else:
+    with open(config_path) as config_file:
+        config = json.load(config_file)
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/3.1/howto/deployment/checklist/
@@ -54,6 +63,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'inventory.middleware.QueryMetricsMiddleware',
+    'mysite.db_routing.DatabaseRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,15 +72,22 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'inventory.middleware.RequestProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'mysite.urls'
 
+# Compiled templates are kept for the life of the process in production;
+# development reads them from disk on every render so edits show up.
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -77,6 +95,8 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            'loaders': TEMPLATE_LOADERS if DEBUG else [
+                ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)],
         },
     },
 ]
@@ -89,13 +109,6 @@ WSGI_APPLICATION = 'mysite.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
-# Install PyMySQL as mysqlclient/MySQLdb to use Django's mysqlclient adapter
-# See https://docs.djangoproject.com/en/2.1/ref/databases/#mysql-db-api-drivers
-# for more information
-import pymysql  # noqa: 402
-pymysql.version_info = (1, 4, 6, 'final', 0)  # change mysqlclient version
-pymysql.install_as_MySQLdb()
-
 # [START db_setup]
 if os.getenv('GAE_APPLICATION', None): 
     # Running on production App Engine, so connect to Google Cloud SQL using
@@ -109,6 +122,9 @@ if os.getenv('GAE_APPLICATION', None):
             'NAME': f"{config['PRODUCTION-DATABASE']}",
         }
     }
+    if config.get('REPLICA-CONNECTION-NAME'):
+        DATABASES['replica'] = dict(
+            DATABASES['default'], HOST=f"/cloudsql/{config['REPLICA-CONNECTION-NAME']}")
 elif MIGRATE_PRODUCTION_DB:
     # Running locally in order to migrate production database 
     DATABASES = {
@@ -121,6 +137,23 @@ elif MIGRATE_PRODUCTION_DB:
             'PASSWORD': f"{config['YOUR-PASSWORD']}",
         }
     }
+elif LOCAL_PROFILE:
+    # Use a sqlite3 database for the local profile and when testing in CI systems
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'db.sqlite3')
+        }
+    }
+    # A second SQLite file standing in for a read replica, for working on the
+    # database routing locally. Nothing replicates between them: run migrate
+    # and migrate --database replica, then copy db.sqlite3 over
+    # db_replica.sqlite3 whenever the replica should catch up.
+    if os.getenv('LOCAL_SQLITE_REPLICA', None):
+        DATABASES['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'db_replica.sqlite3'),
+        }
 else:
     # Running locally so connect to either a local MySQL instance or connect to
     # Cloud SQL via the proxy. To start the proxy via command line:
@@ -140,15 +173,87 @@ else:
     }
 # [END db_setup]
 
-# Use a in-memory sqlite3 database when testing in CI systems
-if os.getenv('TRAMPOLINE_CI', None):
-    DATABASES = {
+# Install PyMySQL as mysqlclient/MySQLdb to use Django's mysqlclient adapter
+# See https://docs.djangoproject.com/en/2.1/ref/databases/#mysql-db-api-drivers
+# for more information
+if any(database['ENGINE'] == 'django.db.backends.mysql' for database in DATABASES.values()):
+    import pymysql  # noqa: 402
+    pymysql.version_info = (1, 4, 6, 'final', 0)  # change mysqlclient version
+    pymysql.install_as_MySQLdb()
+
+# Reads from safe requests go to the replica when one is configured, see
+# mysite/db_routing.py. Tests run the replica as a mirror of the default
+# database. Connections are kept open between requests and checked before
+# each request by DatabaseRoutingMiddleware.
+if 'replica' in DATABASES:
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_ROUTERS = ['mysite.db_routing.PrimaryReplicaRouter']
+REPLICA_STICKY_SECONDS = int(config.get('REPLICA_STICKY_SECONDS', 10))
+for database in DATABASES.values():
+    database.setdefault('CONN_MAX_AGE', int(config.get('CONN_MAX_AGE', 60)))
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+# Cached inventory pages are invalidated by version counters kept in the
+# cache, so every instance must share one cache to see the same counters.
+# Local memory is only safe for a single process (development and tests), so
+# App Engine refuses to start without CACHE_LOCATION.
+if os.getenv('GAE_APPLICATION') and not config.get('CACHE_LOCATION'):
+    raise ImproperlyConfigured(
+        'CACHE_LOCATION must point at a memcached server shared by every '
+        'instance; per-process caches would keep serving stale pages')
+if config.get('CACHE_LOCATION'):
+    CACHES = {
         'default': {
-            'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': os.path.join(BASE_DIR, 'db.sqlite3')
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': config['CACHE_LOCATION'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         }
     }
 
+# Serve the dashboard and product order pages from async views. asgi.py turns
+# this on; the views also work under WSGI but gain less there.
+INVENTORY_ASYNC_VIEWS = os.getenv('INVENTORY_ASYNC_VIEWS') == '1'
+
+# Logging
+# https://docs.djangoproject.com/en/3.2/topics/logging/
+
+# One JSON line per request from inventory.middleware.QueryMetricsMiddleware.
+# App Engine turns JSON lines on stdout into structured log entries. The local
+# profile (development and tests) leaves them out unless REQUEST_LOG is set;
+# the metrics view has the same figures.
+REQUEST_LOG = not LOCAL_PROFILE or bool(os.getenv('REQUEST_LOG'))
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'stdout': {
+            'class': 'logging.StreamHandler',
+            'stream': 'ext://sys.stdout',
+            'formatter': 'message',
+        },
+        'null': {
+            'class': 'logging.NullHandler',
+        },
+    },
+    'loggers': {
+        'inventory.requests': {
+            'handlers': ['stdout'] if REQUEST_LOG else ['null'],
+            'level': 'INFO' if REQUEST_LOG else 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -191,12 +296,42 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/3.1/howto/static-files/
 
-GS_CREDENTIALS = service_account.Credentials.from_service_account_file(
-    os.path.join(BASE_DIR, 'storage_credentials.json'))
-
-DEFAULT_FILE_STORAGE = 'storages.backends.gcloud.GoogleCloudStorage'
-GS_BUCKET_NAME = config['GS_BUCKET_NAME']
-STATICFILES_STORAGE = 'storages.backends.gcloud.GoogleCloudStorage'
+# The bucket storage and its service account credentials are only created
+# when a file or static URL is first needed, see mysite/storage.py. The local
+# profile keeps files under STATIC_ROOT and MEDIA_ROOT instead.
+# STATIC_MANIFEST switches static files to content-hashed names with gzip and
+# brotli copies and immutable caching (mysite/staticfiles.py); collectstatic
+# must run before a deploy or test run with it turned on.
+STATIC_MANIFEST = bool(os.getenv('STATIC_MANIFEST') or config.get('STATIC_MANIFEST'))
+if LOCAL_PROFILE:
+    DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
+    if STATIC_MANIFEST:
+        STATICFILES_STORAGE = 'mysite.staticfiles.CompressedManifestStaticFilesStorage'
+    else:
+        STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+else:
+    DEFAULT_FILE_STORAGE = 'mysite.storage.LazyGoogleCloudStorage'
+    if STATIC_MANIFEST:
+        STATICFILES_STORAGE = 'mysite.storage.ManifestGoogleCloudStorage'
+    else:
+        STATICFILES_STORAGE = 'mysite.storage.LazyGoogleCloudStorage'
+    GS_BUCKET_NAME = config['GS_BUCKET_NAME']
+    GS_CREDENTIALS_FILE = os.path.join(BASE_DIR, 'storage_credentials.json')
+
+# Request profiles (inventory/profiling.py) name views, paths and users, so
+# they never go to the public media storage; staff download them through the
+# profile_download view. GS_PRIVATE_BUCKET_NAME should name a bucket without
+# public access; without it they go under private/ in the main bucket with a
+# private ACL, which only holds while that bucket uses fine-grained access.
+if LOCAL_PROFILE:
+    PROFILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
+    PROFILE_STORAGE_OPTIONS = {'location': os.path.join(BASE_DIR, 'profiles')}
+else:
+    PROFILE_STORAGE = 'mysite.storage.PrivateGoogleCloudStorage'
+    PROFILE_STORAGE_OPTIONS = {
+        'bucket_name': config.get('GS_PRIVATE_BUCKET_NAME', GS_BUCKET_NAME),
+        'location': 'private/profiles',
+    }
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 STATIC_URL = '/static/'
@@ -213,5 +348,5 @@ EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
-EMAIL_HOST_USER = config['ALERTS_EMAIL']
-EMAIL_HOST_PASSWORD = config['PRODUCTION_APP_PASSWORD']
\ No newline at end of file
+EMAIL_HOST_USER = config.get('ALERTS_EMAIL', '')
+EMAIL_HOST_PASSWORD = config.get('PRODUCTION_APP_PASSWORD', '')
\ No newline at end of file
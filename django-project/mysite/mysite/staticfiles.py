@@ -0,0 +1,123 @@
+import gzip
+import mimetypes
+import os
+import re
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.http import FileResponse
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.views.static import serve
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Hashed, precompressed static files. collectstatic writes content-hashed
+# copies and a manifest, then a gzip and (with the Brotli package) a brotli
+# copy of every hashed text asset. The file behind a hashed URL never
+# changes, so it is served with a one year immutable Cache-Control and
+# repeat visits do not ask for it again. Turned on by STATIC_MANIFEST; run
+# collectstatic before deploying with it, templates cannot resolve names
+# missing from the manifest.
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.map', '.txt', '.html', '.xml', '.ico')
+#ManifestFilesMixin inserts the first 12 hex digits of the MD5
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^/]+$')
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+def cache_control(name):
+    #only a hashed name promises that its content never changes; the
+    #manifest and unhashed files must be fetched again after a deploy
+    return IMMUTABLE if HASHED_NAME.search(name) else None
+
+
+def gzip_bytes(data):
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_bytes(data):
+    return brotli.compress(data, quality=11)
+
+
+class PrecompressedMixin:
+    #only keep a variant that saves at least this fraction of the original
+    min_saving = 0.05
+    compressors = [('gz', gzip_bytes)] + ([('br', brotli_bytes)] if brotli else [])
+    #files put in place by hand instead of collected, such as the favicon in
+    #the bucket, have no manifest entry and keep their name; any other
+    #missing entry raises, so a stale manifest fails loudly instead of
+    #serving unhashed files
+    unhashed_names = {'images/favicon.ico'}
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            if name.endswith(COMPRESSIBLE):
+                yield from self.precompress(name)
+
+    def stored_name(self, name):
+        if name in self.unhashed_names:
+            return name
+        return super().stored_name(name)
+
+    def precompress(self, name):
+        data = None
+        for suffix, compress in self.compressors:
+            variant = f'{name}.{suffix}'
+            #a hashed name means an existing variant already has this content
+            if self.exists(variant):
+                yield name, variant, True
+                continue
+            if data is None:
+                with self.open(name) as original:
+                    data = original.read()
+            compressed = compress(data)
+            if len(compressed) <= len(data) * (1 - self.min_saving):
+                self._save(variant, ContentFile(compressed))
+                yield name, variant, True
+
+
+class CompressedManifestStaticFilesStorage(PrecompressedMixin, ManifestStaticFilesStorage):
+    #the variants sit next to the originals in STATIC_ROOT for a web server
+    #with precompressed file support, or serve_precompressed, to pick from
+    pass
+
+
+def accepted_encodings(request):
+    accepted = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def serve_precompressed(request, path):
+    #serves STATIC_ROOT the way production should: the smallest variant the
+    #client accepts and far-future headers on hashed names. Mounted by
+    #mysite.urls for the local profile; use runserver --nostatic, or the
+    #staticfiles handler answers first from the unhashed source files.
+    accepted = accepted_encodings(request)
+    response = None
+    for encoding, suffix in ENCODINGS:
+        if encoding not in accepted:
+            continue
+        full_path = safe_join(settings.STATIC_ROOT, path + suffix)
+        if os.path.isfile(full_path):
+            content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+            response['Content-Encoding'] = encoding
+            break
+    if response is None:
+        response = serve(request, path, document_root=settings.STATIC_ROOT)
+    patch_vary_headers(response, ['Accept-Encoding'])
+    if HASHED_NAME.search(path):
+        response['Cache-Control'] = IMMUTABLE
+    return response
@@ -0,0 +1,76 @@
+import mimetypes
+from functools import lru_cache
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestFilesMixin
+from storages.backends.gcloud import GoogleCloudStorage
+from storages.utils import clean_name
+from .staticfiles import PrecompressedMixin, cache_control, gzip_bytes
+
+# Google Cloud Storage with credentials loaded on first use. Reading and
+# parsing the service account key used to happen in settings.py, so every
+# process paid for it before serving anything, including management commands
+# that never touch the bucket. This module itself is only imported when
+# default_storage or staticfiles_storage is first used.
+
+
+@lru_cache(maxsize=None)
+def service_account_credentials():
+    from google.oauth2 import service_account
+    return service_account.Credentials.from_service_account_file(settings.GS_CREDENTIALS_FILE)
+
+
+class LazyGoogleCloudStorage(GoogleCloudStorage):
+    @property
+    def client(self):
+        if self._client is None and self.credentials is None:
+            self.credentials = service_account_credentials()
+        return super().client
+
+
+class PrivateGoogleCloudStorage(LazyGoogleCloudStorage):
+    #staff-only files such as request profiles; objects are never public and
+    #are read back through views that check the user
+    def get_default_settings(self):
+        return dict(super().get_default_settings(), default_acl='private', querystring_auth=True)
+
+
+# Hashed static files in the bucket (see mysite.staticfiles). The bucket
+# cannot choose an encoding per request, so the manifest points text assets
+# at their gzip copy, uploaded with Content-Encoding: gzip; Cloud Storage
+# decompresses it for the rare client that does not accept gzip. Hashed
+# names are uploaded with an immutable Cache-Control; the manifest and the
+# unhashed originals keep the bucket's default so deploys are picked up.
+
+
+class ManifestGoogleCloudStorage(PrecompressedMixin, ManifestFilesMixin, LazyGoogleCloudStorage):
+    #the bucket serves no encoding negotiation, so brotli copies would be unused
+    compressors = [('gz', gzip_bytes)]
+
+    def get_default_settings(self):
+        #public, unsigned URLs: a signed URL changes on every render and
+        #defeats the browser cache
+        return dict(super().get_default_settings(), default_acl='publicRead')
+
+    def post_process(self, paths, dry_run=False, **options):
+        gzipped = {}
+        for original, processed, done in super().post_process(paths, dry_run=dry_run, **options):
+            if done is True and processed.endswith('.gz'):
+                gzipped[original] = processed
+            yield original, processed, done
+        if gzipped:
+            self.hashed_files = {
+                name: gzipped.get(hashed, hashed) for name, hashed in self.hashed_files.items()}
+            self.save_manifest()
+
+    def _save(self, name, content):
+        name = clean_name(name)
+        original = name[:-len('.gz')] if name.endswith('.gz') else name
+        blob = self.bucket.blob(self._normalize_name(name))
+        blob.cache_control = cache_control(name)
+        if original != name:
+            blob.content_encoding = 'gzip'
+        blob.upload_from_file(
+            content, rewind=True, size=content.size,
+            content_type=mimetypes.guess_type(original)[0],
+            predefined_acl=self.default_acl)
+        return name
@@ -14,9 +14,10 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 from django.conf import settings
 from django.conf.urls.static import static
+from mysite.staticfiles import serve_precompressed
 
 urlpatterns = [
     path('', include('inventory.urls')),
@@ -27,4 +28,8 @@ urlpatterns = [
 
 #static file access must be reconfigured for production
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+#hashed, precompressed static files from STATIC_ROOT when testing locally
+if settings.LOCAL_PROFILE and settings.STATIC_MANIFEST:
+    urlpatterns += [re_path(r'^%s(?P<path>.+)$' % settings.STATIC_URL.lstrip('/'), serve_precompressed)]
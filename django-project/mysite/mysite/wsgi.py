@@ -9,7 +9,12 @@ https://docs.djangoproject.com/en/3.1/howto/deployment/wsgi/
 
 import os
 
-from django.core.wsgi import get_wsgi_application
+# Django 3.2 imports distutils.version at startup, and setuptools' distutils
+# shim would load all of setuptools and pkg_resources for it (~200 ms of
+# cold start). The standard library copy is enough.
+os.environ.setdefault('SETUPTOOLS_USE_DISTUTILS', 'stdlib')
+
+from django.core.wsgi import get_wsgi_application  # noqa: E402
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
 
@@ -0,0 +1,94 @@
+from calendar import monthrange
+from django.db.models import Count, F, FloatField, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncQuarter, TruncWeek
+from inventory.models import CustomerOrder, PurchaseOrder
+from .models import MonthlySales, MonthlyPurchases
+
+# Order reports grouped by period and optionally by product or customer. The
+# date truncation, grouping and totals all happen in one GROUP BY query, so
+# only the report rows leave the database. Monthly and quarterly reports over
+# whole months read the monthly rollups instead of the orders, so their cost
+# follows the number of months rather than the number of orders.
+
+PERIODS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'quarter': TruncQuarter,
+}
+
+ROLLUP_PERIODS = {
+    'month': F,
+    'quarter': TruncQuarter,
+}
+
+SOURCES = {
+    'sales': (CustomerOrder, F('quantity'), MonthlySales),
+    'purchases': (PurchaseOrder, F('runs') * F('run_quantity'), MonthlyPurchases),
+}
+
+GROUPS = {
+    '': (),
+    'product': ('product__label', 'product__name'),
+    'customer': ('customer__label', 'customer__name'),
+}
+
+
+def _whole_months(start, end):
+    return ((start is None or start.day == 1) and
+            (end is None or end.day == monthrange(end.year, end.month)[1]))
+
+
+def report_orders(user, source, start=None, end=None):
+    model, quantity, rollup = SOURCES[source]
+    orders = model.objects.filter(user=user)
+    if start:
+        orders = orders.filter(date__gte=start)
+    if end:
+        orders = orders.filter(date__lte=end)
+    return orders
+
+
+def report_rollups(user, source, start=None, end=None):
+    model, quantity, rollup = SOURCES[source]
+    months = rollup.objects.filter(user=user)
+    if start:
+        months = months.filter(month__gte=start)
+    if end:
+        months = months.filter(month__lte=end)
+    return months
+
+
+def order_report(user, source, period, group='', start=None, end=None):
+    model, quantity, rollup = SOURCES[source]
+    fields = GROUPS[group]
+    if period in ROLLUP_PERIODS and _whole_months(start, end):
+        rows = report_rollups(user, source, start, end).annotate(
+            period=ROLLUP_PERIODS[period]('month'))
+        orders, quantity = Sum('order_count'), F('quantity')
+    else:
+        rows = report_orders(user, source, start, end).annotate(
+            period=PERIODS[period]('date'))
+        orders = Count('pk')
+    return (rows.values('period', *fields)
+        .annotate(orders=orders, total=Sum(quantity, output_field=FloatField()))
+        .order_by('period', *fields))
+
+
+def report_totals(user, source, start=None, end=None):
+    model, quantity, rollup = SOURCES[source]
+    if _whole_months(start, end):
+        return report_rollups(user, source, start, end).aggregate(
+            orders=Sum('order_count'), total=Sum('quantity', output_field=FloatField()))
+    return report_orders(user, source, start, end).aggregate(
+        orders=Count('pk'), total=Sum(quantity, output_field=FloatField()))
+
+
+def period_label(period, day):
+    if period == 'week':
+        return f'week of {day:%Y-%m-%d}'
+    if period == 'month':
+        return f'{day:%b %Y}'
+    if period == 'quarter':
+        return f'Q{(day.month - 1) // 3 + 1} {day.year}'
+    return f'{day:%Y-%m-%d}'
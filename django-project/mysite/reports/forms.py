@@ -0,0 +1,32 @@
+from django import forms
+
+class ReportForm(forms.Form):
+    SOURCES = [
+        ('sales', 'Sales (Customer Orders)'),
+        ('purchases', 'Purchases (Purchase Orders)'),
+    ]
+    GROUPS = [
+        ('product', 'Product'),
+        ('customer', 'Customer'),
+        ('', 'Period only'),
+    ]
+    PERIODS = [
+        ('day', 'Day'),
+        ('week', 'Week'),
+        ('month', 'Month'),
+        ('quarter', 'Quarter'),
+    ]
+    source = forms.ChoiceField(choices=SOURCES)
+    group = forms.ChoiceField(choices=GROUPS, required=False)
+    period = forms.ChoiceField(choices=PERIODS, initial='month')
+    start_date = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    end_date = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('source') == 'purchases' and cleaned_data.get('group') == 'customer':
+            self.add_error('group', 'Purchase orders have no customer')
+        start, end = cleaned_data.get('start_date'), cleaned_data.get('end_date')
+        if start and end and start > end:
+            self.add_error('end_date', 'The end date is before the start date')
+        return cleaned_data
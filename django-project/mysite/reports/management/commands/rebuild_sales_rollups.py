@@ -0,0 +1,21 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from reports.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the monthly sales and purchase rollups from order history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', help='only rebuild the rollups of this username')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['user']:
+            users = users.filter(username=options['user'])
+
+        counts = rebuild_rollups(users, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Rebuilt rollups: ' + ', '.join(
+            f'{count} {model._meta.verbose_name_plural}' for model, count in counts.items())))
@@ -0,0 +1,86 @@
+# Generated by Django 3.2.4 on 2021-06-16 20:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, F, FloatField, Sum
+from django.db.models.functions import TruncMonth
+
+
+def build_rollups(apps, schema_editor):
+    #same as reports.rollups.rebuild_rollups, against the historical models
+    sources = [
+        ('CustomerOrder', 'MonthlySales', ['product', 'customer'], F('quantity')),
+        ('PurchaseOrder', 'MonthlyPurchases', ['product'], F('runs') * F('run_quantity')),
+    ]
+    for order_name, rollup_name, names, quantity in sources:
+        order_model = apps.get_model('inventory', order_name)
+        model = apps.get_model('reports', rollup_name)
+        rows = (order_model.objects.filter(user__isnull=False)
+            .annotate(month=TruncMonth('date'))
+            .values('user', *names, 'month')
+            .annotate(total=Sum(quantity, output_field=FloatField()), count=Count('pk'))
+            .order_by())
+        model.objects.bulk_create((
+            model(user_id=row['user'], month=row['month'], quantity=row['total'],
+                  order_count=row['count'], **{f'{name}_id': row[name] for name in names})
+            for row in rows.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('inventory', '0019_productstockbalance_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('order_count', models.IntegerField(default=0)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory.customer')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory.product')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'monthly sales',
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlyPurchases',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('quantity', models.FloatField(default=0)),
+                ('order_count', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory.product')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'monthly purchases',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='monthlysales',
+            index=models.Index(fields=['user', 'month'], name='ms_user_month_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='monthlysales',
+            constraint=models.UniqueConstraint(fields=('product', 'customer', 'month'), name='unique_monthly_sales'),
+        ),
+        migrations.AddIndex(
+            model_name='monthlypurchases',
+            index=models.Index(fields=['user', 'month'], name='mp_user_month_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='monthlypurchases',
+            constraint=models.UniqueConstraint(fields=('product', 'month'), name='unique_monthly_purchases'),
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,48 @@
 from django.db import models
+from django.contrib.auth.models import User
+from inventory.models import Product, Customer
 
-# Create your models here.
+class MonthlySales(models.Model):
+    #customer order quantity and count per product, customer and month, kept
+    #current by signals (see reports.rollups)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
+    month = models.DateField()
+    quantity = models.IntegerField(default=0)
+    order_count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'monthly sales'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product', 'customer', 'month'], name='unique_monthly_sales'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'month'], name='ms_user_month_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id}/{self.customer_id} {self.month:%b %Y}: {self.quantity}'
+
+
+class MonthlyPurchases(models.Model):
+    #purchase order quantity and count per product and month
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    month = models.DateField()
+    quantity = models.FloatField(default=0)
+    order_count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'monthly purchases'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product', 'month'], name='unique_monthly_purchases'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'month'], name='mp_user_month_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id} {self.month:%b %Y}: {self.quantity}'
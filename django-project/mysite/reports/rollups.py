@@ -0,0 +1,92 @@
+from collections import defaultdict
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, FloatField, Sum
+from django.db.models.functions import TruncMonth
+from inventory.models import CustomerOrder, PurchaseOrder
+from .models import MonthlySales, MonthlyPurchases
+
+# Maintenance of the monthly rollups. Order changes are collected as
+# (quantity, count) deltas per rollup row, so an uploaded file of thousands
+# of orders costs one write per product, customer and month it touches. Each
+# row is changed by an UPDATE of F() expressions and only created when the
+# update finds nothing, inside a savepoint: two first orders of a month may
+# both get there, and the one that loses the insert adds to the winner's row.
+# Rows whose count drops to zero are deleted.
+
+ROLLUPS = {
+    CustomerOrder: (MonthlySales, ('product_id', 'customer_id'), F('quantity')),
+    PurchaseOrder: (MonthlyPurchases, ('product_id',), F('runs') * F('run_quantity')),
+}
+
+
+def _order_quantity(order):
+    return order.total if isinstance(order, PurchaseOrder) else order.quantity
+
+
+def collect_deltas(orders, sign, deltas=None):
+    #{(order model, key): [user id, quantity, count]} where the key is the
+    #rollup's key fields followed by the month
+    if deltas is None:
+        deltas = defaultdict(lambda: [None, 0, 0])
+    for order in orders:
+        if order.user_id is None:
+            #products without an owner never appear in a report
+            continue
+        model, fields, quantity = ROLLUPS[type(order)]
+        key = tuple(getattr(order, field) for field in fields) + (order.date.replace(day=1),)
+        change = deltas[type(order), key]
+        change[0] = order.user_id
+        change[1] += sign * _order_quantity(order)
+        change[2] += sign
+    return deltas
+
+
+def _add_to_row(model, lookup, quantity_delta, count_delta):
+    return model.objects.filter(**lookup).update(
+        quantity=F('quantity') + quantity_delta, order_count=F('order_count') + count_delta)
+
+
+def apply_rollup_deltas(deltas):
+    with transaction.atomic():
+        for (order_model, key), (user_id, quantity_delta, count_delta) in deltas.items():
+            if not (quantity_delta or count_delta):
+                continue
+            model, fields, quantity = ROLLUPS[order_model]
+            lookup = dict(zip(fields + ('month',), key))
+            if _add_to_row(model, lookup, quantity_delta, count_delta):
+                if count_delta < 0:
+                    model.objects.filter(order_count__lte=0, **lookup).delete()
+                continue
+            if count_delta <= 0:
+                #no row to take the removal from, so there is nothing to
+                #undo; a row made from it would hold negative figures
+                continue
+            try:
+                with transaction.atomic():
+                    model.objects.create(
+                        user_id=user_id, quantity=quantity_delta, order_count=count_delta, **lookup)
+            except IntegrityError:
+                #a concurrent first order of the month created the row
+                #since the update, so add to that one
+                _add_to_row(model, lookup, quantity_delta, count_delta)
+
+
+def rebuild_rollups(users, batch_size=1000):
+    #recompute the rollups of the given users from their orders in one
+    #GROUP BY query per order model
+    counts = {}
+    with transaction.atomic():
+        for order_model, (model, fields, quantity) in ROLLUPS.items():
+            model.objects.filter(user__in=users).delete()
+            names = [field[:-len('_id')] for field in fields]
+            rows = (order_model.objects.filter(user__in=users)
+                .annotate(month=TruncMonth('date'))
+                .values('user', *names, 'month')
+                .annotate(total=Sum(quantity, output_field=FloatField()), count=Count('pk'))
+                .order_by())
+            created = model.objects.bulk_create((
+                model(user_id=row['user'], month=row['month'], quantity=row['total'],
+                      order_count=row['count'], **{f'{name}_id': row[name] for name in names})
+                for row in rows.iterator()), batch_size=batch_size)
+            counts[model] = len(created)
+    return counts
@@ -0,0 +1,27 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from inventory.models import CustomerOrder, PurchaseOrder
+from inventory.signals import orders_bulk_created
+from .rollups import apply_rollup_deltas, collect_deltas
+
+
+@receiver(post_save, sender=CustomerOrder)
+@receiver(post_save, sender=PurchaseOrder)
+def add_order_to_rollups(sender, instance, **kwargs):
+    #_previous_movement is stored by inventory's pre_save receiver
+    previous = getattr(instance, '_previous_movement', None)
+    deltas = collect_deltas([instance], 1)
+    if previous is not None:
+        collect_deltas([previous], -1, deltas)
+    apply_rollup_deltas(deltas)
+
+
+@receiver(post_delete, sender=CustomerOrder)
+@receiver(post_delete, sender=PurchaseOrder)
+def remove_order_from_rollups(sender, instance, **kwargs):
+    apply_rollup_deltas(collect_deltas([instance], -1))
+
+
+@receiver(orders_bulk_created)
+def add_bulk_orders_to_rollups(sender, orders, **kwargs):
+    apply_rollup_deltas(collect_deltas(orders, 1))
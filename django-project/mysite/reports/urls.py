@@ -4,5 +4,5 @@ from . import views
 app_name = 'reports'
 
 urlpatterns = [
-    path('', views.index, name='index'),
-]
\ No newline at end of file
+    path('', views.Index.as_view(), name='index'),
+]
@@ -1,4 +1,40 @@
-from django.shortcuts import render
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.views.generic import ListView
+from .engine import order_report, period_label, report_totals
+from .forms import ReportForm
 
-def index(request):
-    return render(request, 'reports/index.html')
+
+class Index(LoginRequiredMixin, ListView):
+    template_name = 'reports/index.html'
+    paginate_by = 100
+
+    def get_form(self):
+        if not hasattr(self, 'form'):
+            self.form = ReportForm(self.request.GET or None)
+        return self.form
+
+    def get_queryset(self):
+        form = self.get_form()
+        if not form.is_valid():
+            return []
+        data = form.cleaned_data
+        return order_report(
+            self.request.user, data['source'], data['period'], data['group'],
+            data['start_date'], data['end_date'])
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        form = self.get_form()
+        context['form'] = form
+        if form.is_valid():
+            data = form.cleaned_data
+            context['period'] = dict(ReportForm.PERIODS)[data['period']]
+            context['group'] = data['group']
+            context['totals'] = report_totals(
+                self.request.user, data['source'], data['start_date'], data['end_date'])
+            for row in context['object_list']:
+                row['label'] = period_label(data['period'], row['period'])
+            params = self.request.GET.copy()
+            params.pop('page', None)
+            context['querystring'] = params.urlencode()
+        return context
@@ -0,0 +1,93 @@
+import hashlib
+import logging
+import os
+from io import BytesIO
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+# Company logo renditions. An uploaded logo is stored under a name derived
+# from its content hash, so uploading the same image again (by anyone) reuses
+# the stored file, and the resized renditions are written once per image
+# under hashed names that never change. Saving a new logo only records it:
+# a profile with a logo and no renditions is pending, and App Engine cron
+# (cron.yaml) calls the build_pending_logos view every few minutes to build
+# them, so the request that uploads a logo does no image work and a build
+# that fails or is cut short is retried by the next run. Until then the
+# original logo is shown. `manage.py build_logo_renditions` does the same
+# from the command line.
+
+RENDITION_WIDTHS = {
+    'logo_large': 300,
+    'logo_small': 64,
+}
+RENDITION_DIR = 'company_logos/renditions'
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(file):
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def hashed_name(digest, original_name):
+    extension = os.path.splitext(original_name)[1].lower() or '.png'
+    return f'{digest[:32]}{extension}'
+
+
+def rendition_name(digest, width):
+    return f'{RENDITION_DIR}/{digest[:32]}-{width}.png'
+
+
+def _resized(image, width):
+    if image.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P'):
+        image = image.convert('RGBA')
+    if image.width <= width:
+        return image
+    return image.resize((width, max(1, round(image.height * width / image.width))))
+
+
+def build_renditions(logo_name):
+    #hash the stored logo, write any missing renditions and point every
+    #profile using this file at them
+    from PIL import Image
+    from .models import Profile
+    with default_storage.open(logo_name, 'rb') as logo_file:
+        data = logo_file.read()
+    digest = hashlib.sha256(data).hexdigest()
+    names = {}
+    image = None
+    for field, width in RENDITION_WIDTHS.items():
+        name = rendition_name(digest, width)
+        if not default_storage.exists(name):
+            if image is None:
+                image = Image.open(BytesIO(data))
+                image.load()
+            buffer = BytesIO()
+            _resized(image, width).save(buffer, 'png')
+            name = default_storage.save(name, ContentFile(buffer.getvalue()))
+        names[field] = name
+    Profile.objects.filter(company_logo=logo_name).update(logo_hash=digest, **names)
+    return names
+
+
+def pending_logos():
+    from .models import Profile
+    return sorted(set(Profile.objects.exclude(company_logo=Profile.DEFAULT_LOGO).filter(
+        logo_large='').values_list('company_logo', flat=True)))
+
+
+def build_logo_renditions(logos):
+    #[(logo, error)] for the logos that could not be built; the others have
+    #their renditions
+    failures = []
+    for logo in logos:
+        try:
+            build_renditions(logo)
+        except (OSError, ValueError) as error:
+            logger.exception('Could not build renditions of %s', logo)
+            failures.append((logo, error))
+    return failures
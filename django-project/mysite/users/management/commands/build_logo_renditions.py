@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from users.logos import build_logo_renditions, pending_logos
+from users.models import Profile
+
+
+class Command(BaseCommand):
+    #what the build_pending_logos cron view runs, for local use and for
+    #rebuilding every logo
+    help = ('Hash company logos and build their resized renditions, for logos '
+            'uploaded since the last run or whose renditions failed')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true', help='rebuild logos that already have renditions')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            logos = sorted(set(Profile.objects.exclude(
+                company_logo=Profile.DEFAULT_LOGO).values_list('company_logo', flat=True)))
+        else:
+            logos = pending_logos()
+        failures = build_logo_renditions(logos)
+        for logo, error in failures:
+            self.stderr.write(f'{logo}: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Built renditions for {len(logos) - len(failures)} logos, {len(failures)} failed'))
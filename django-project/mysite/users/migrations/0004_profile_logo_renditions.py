@@ -0,0 +1,28 @@
+# Generated by Django 3.2.4 on 2021-06-17 18:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_profile_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='logo_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='logo_large',
+            field=models.ImageField(blank=True, editable=False, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='logo_small',
+            field=models.ImageField(blank=True, editable=False, upload_to=''),
+        ),
+    ]
@@ -1,27 +1,67 @@
 from django.db import models
 from django.contrib.auth.models import User
-from PIL import Image
-from django.core.files.storage import default_storage as storage
+from .logos import RENDITION_WIDTHS, content_hash, hashed_name
 
 
 class Profile(models.Model):
+    DEFAULT_LOGO = 'default.png'
+
     user = models.OneToOneField(User, on_delete=models.CASCADE)
-    company_logo = models.ImageField(default='default.png', upload_to='company_logos')
+    company_logo = models.ImageField(default=DEFAULT_LOGO, upload_to='company_logos')
+    #sha256 of the logo and its resized copies, filled in by users.logos
+    logo_hash = models.CharField(max_length=64, blank=True, editable=False)
+    logo_large = models.ImageField(blank=True, editable=False)
+    logo_small = models.ImageField(blank=True, editable=False)
 
     def __str__(self):
         return f'{self.user.username} Profile'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        #the stored logo name, to tell whether a save changes the logo
+        instance._loaded_logo = instance.__dict__.get('company_logo')
+        return instance
+
+    @property
+    def large_logo_url(self):
+        return (self.logo_large or self.company_logo).url
+
+    @property
+    def small_logo_url(self):
+        return (self.logo_small or self.company_logo).url
+
     def save(self, *args, **kwargs):
+        logo = self.company_logo
+        changed = not logo._committed or logo.name != getattr(self, '_loaded_logo', None)
+        if changed:
+            self.prepare_logo()
+        #a new logo without renditions is left for users.logos to build
         super().save(*args, **kwargs)
+        self._loaded_logo = self.company_logo.name
 
-        img = Image.open(self.company_logo)
-
-        MAX_WIDTH = 300 
+    def prepare_logo(self):
+        logo = self.company_logo
+        digest = content_hash(logo) if not logo._committed else ''
+        if digest and digest == self.logo_hash:
+            #the same image uploaded again
+            self.company_logo = self._loaded_logo
+            return
 
-        if img.width > MAX_WIDTH:
-            resize_ratio = MAX_WIDTH / img.width
-            output_size = (int(img.width*resize_ratio), int(img.height*resize_ratio))
-            img = img.resize(output_size)
-            file_handler = storage.open(self.company_logo.name, "w")
-            img.save(file_handler, 'png')
-            file_handler.close()            
+        self.logo_hash = digest
+        for field in RENDITION_WIDTHS:
+            setattr(self, field, '')
+        if not digest:
+            return
+        name = logo.field.generate_filename(self, hashed_name(digest, logo.name))
+        if logo.storage.exists(name):
+            #stored before, possibly for another user: skip the upload and
+            #reuse renditions that are already built
+            self.company_logo = name
+            built = Profile.objects.filter(logo_hash=digest).exclude(
+                logo_large='').values(*RENDITION_WIDTHS).first()
+            if built:
+                for field, value in built.items():
+                    setattr(self, field, value)
+        else:
+            logo.name = hashed_name(digest, logo.name)
@@ -5,13 +5,7 @@ from .models import Profile
 
 @receiver(post_save, sender=User)
 def create_profile(sender, instance, created, **kwargs):
-    #create a new profile every time a new user is created
+    #create a new profile every time a new user is created; later user saves
+    #(such as the last_login update on every login) leave the profile alone
     if created:
         Profile.objects.create(user=instance)
-
-
-@receiver(post_save, sender=User)
-def save_profile(sender, instance, **kwargs):
-    #save the profile every time a user is saved
-    instance.profile.save()
-
@@ -1,3 +1,111 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from PIL import Image
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from .models import Profile
 
-# Create your tests here.
+
+def png(color, size=(1000, 500)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'png')
+    return SimpleUploadedFile('logo.png', buffer.getvalue(), content_type='image/png')
+
+
+class LogoTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.media_root = media_root
+        self.alice = User.objects.create_user('alice', password='pw').profile
+        self.bob = User.objects.create_user('bob', password='pw').profile
+
+    def upload(self, profile, logo):
+        profile.company_logo = logo
+        profile.save()
+        return profile
+
+    def run_cron(self, **headers):
+        return self.client.get(reverse('users:build_pending_logos'), **headers)
+
+    def built(self, profile):
+        self.assertEqual(self.run_cron(HTTP_X_APPENGINE_CRON='true').status_code, 200)
+        profile.refresh_from_db()
+        return profile
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(path, name), self.media_root)
+            for path, dirs, names in os.walk(self.media_root) for name in names)
+
+    def test_saving_leaves_renditions_to_cron(self):
+        profile = self.upload(self.alice, png('red'))
+        self.assertEqual(profile.logo_large.name, '')
+        self.assertEqual(profile.large_logo_url, profile.company_logo.url)
+        self.assertEqual(len(self.stored_files()), 1)
+
+        profile = self.built(profile)
+        self.assertEqual(profile.logo_large.name, f'company_logos/renditions/{profile.logo_hash[:32]}-300.png')
+        self.assertEqual(Image.open(profile.logo_large.path).size, (300, 150))
+        self.assertEqual(Image.open(profile.logo_small.path).size, (64, 32))
+        self.assertEqual(profile.small_logo_url, f'/media/{profile.logo_small.name}')
+        self.assertEqual(self.run_cron(HTTP_X_APPENGINE_CRON='true').content, b'Built renditions for 0 logos, 0 failed')
+
+    def test_cron_view_needs_the_cron_header(self):
+        self.upload(self.alice, png('red'))
+        self.assertEqual(self.run_cron().status_code, 403)
+        self.assertEqual(self.run_cron(HTTP_X_APPENGINE_CRON='false').status_code, 403)
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.logo_large.name, '')
+
+    def test_same_image_is_stored_once(self):
+        self.built(self.upload(self.alice, png('red')))
+        stored = self.stored_files()
+        self.assertEqual(len(stored), 3)
+        profile = self.upload(self.bob, png('red'))
+        self.assertEqual(self.stored_files(), stored)
+        self.assertEqual(profile.company_logo.name, self.alice.company_logo.name)
+        #the renditions already built are reused without waiting for cron
+        self.assertEqual(profile.logo_large.name, self.alice.logo_large.name)
+
+    def test_small_logos_are_not_enlarged(self):
+        profile = self.built(self.upload(self.alice, png('blue', (40, 20))))
+        self.assertEqual(Image.open(profile.logo_large.path).size, (40, 20))
+
+    def test_saves_without_a_new_logo_leave_it_alone(self):
+        self.built(self.upload(self.alice, png('red')))
+        stored = self.stored_files()
+        Profile.objects.get(pk=self.alice.pk).save()
+        self.upload(self.alice, png('red'))
+        self.assertEqual(self.stored_files(), stored)
+        self.alice.refresh_from_db()
+        self.assertTrue(self.alice.logo_large)
+
+    def test_unreadable_logo_keeps_the_original_and_is_retried(self):
+        bad = SimpleUploadedFile('logo.png', b'not an image', content_type='image/png')
+        profile = self.upload(self.alice, bad)
+        self.upload(self.bob, png('red'))
+        with self.assertLogs('users.logos', 'ERROR'):
+            response = self.run_cron(HTTP_X_APPENGINE_CRON='true')
+        self.assertEqual(response.content, b'Built renditions for 1 logos, 1 failed')
+        profile.refresh_from_db()
+        self.assertEqual(profile.logo_large.name, '')
+        self.assertEqual(profile.large_logo_url, profile.company_logo.url)
+
+    def test_command_builds_missing_renditions(self):
+        self.built(self.upload(self.alice, png('red')))
+        Profile.objects.filter(pk=self.alice.pk).update(logo_hash='', logo_large='', logo_small='')
+        out = StringIO()
+        call_command('build_logo_renditions', stdout=out)
+        self.alice.refresh_from_db()
+        self.assertTrue(self.alice.logo_large)
+        self.assertTrue(self.alice.logo_hash)
+        self.assertIn('Built renditions for 1 logos, 0 failed', out.getvalue())
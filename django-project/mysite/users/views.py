@@ -1,7 +1,9 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, HttpResponseForbidden
 from .forms import UserRegisterForm, UserUpdateForm, ProfileUpdateForm
+from .logos import build_logo_renditions, pending_logos
 
 def register(request):
     if request.method == 'POST':
@@ -33,4 +35,15 @@ def profile(request):
         'u_form': u_form,
         'p_form': p_form
     }
-    return render(request, 'users/profile.html', context=context)
\ No newline at end of file
+    return render(request, 'users/profile.html', context=context)
+
+def build_pending_logos(request):
+    #run by App Engine cron, see cron.yaml; App Engine removes the
+    #X-Appengine-Cron header from outside requests, so only cron gets through
+    if request.headers.get('X-Appengine-Cron') != 'true':
+        return HttpResponseForbidden()
+    logos = pending_logos()
+    failures = build_logo_renditions(logos)
+    return HttpResponse(
+        f'Built renditions for {len(logos) - len(failures)} logos, {len(failures)} failed',
+        content_type='text/plain')